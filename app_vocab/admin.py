@@ -3,7 +3,9 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
-from .models import Word, UserWord, UserProfile
+from django.db.models import Count, Q
+from .models import Word, UserWord, UserProfile, ImportJob
+from .search_service import words_containing
 
 
 # Регистрируем модель Word
@@ -17,6 +19,13 @@ class WordAdmin(admin.ModelAdmin):
     list_filter = ('difficulty_level', 'date_added')
     fields = ('original', 'transcription', 'translation', 'example_sentence', 'difficulty_level')
 
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по индексу FTS5/pg_trgm вместо icontains по всей таблице
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return queryset.filter(words_containing(search_term)), False
+
 
 # Регистрируем модель UserWord
 @admin.register(UserWord)
@@ -27,7 +36,21 @@ class UserWordAdmin(admin.ModelAdmin):
     list_display = ('user', 'word', 'repetition', 'interval', 'next_review', 'get_knowledge_level')
     search_fields = ('user__username', 'word__original', 'word__translation')
     list_filter = ('repetition', 'next_review')
-    readonly_fields = ('last_reviewed', 'correct_answers', 'wrong_answers')
+    readonly_fields = ('last_reviewed', 'correct_answers', 'wrong_answers', 'word_original', 'word_translation')
+
+    def save_model(self, request, obj, form, change):
+        # Другое слово - обновляем его копию для сортировки словаря
+        if 'word' in form.changed_data:
+            obj.word_original = ''
+            obj.copy_word_fields()
+        super().save_model(request, obj, form, change)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = words_containing(search_term, prefix='word__') | Q(user__username__icontains=search_term)
+        return queryset.filter(condition), False
 
     def get_knowledge_level(self, obj):
         return obj.get_knowledge_level()
@@ -35,6 +58,18 @@ class UserWordAdmin(admin.ModelAdmin):
     get_knowledge_level.short_description = 'Уровень знания'
 
 
+# Регистрируем модель ImportJob
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    """
+    Фоновые задачи импорта слов.
+    """
+    list_display = ('original_name', 'user', 'status', 'rows_processed', 'total_rows',
+                    'imported_count', 'duplicate_count', 'error_count', 'created_at')
+    list_filter = ('status', 'created_at')
+    readonly_fields = ('rows_processed', 'imported_count', 'duplicate_count', 'error_count')
+
+
 # Регистрируем модель UserProfile как inline для User
 class UserProfileInline(admin.StackedInline):
     model = UserProfile
@@ -49,6 +84,12 @@ class CustomUserAdmin(UserAdmin):
     inlines = (UserProfileInline,)
     list_display = ('username', 'email', 'first_name', 'last_name', 'get_telegram_id', 'get_words_count')
 
+    def get_queryset(self, request):
+        # Профиль и число слов - в запросе списка, а не отдельными запросами на каждую строку
+        return super().get_queryset(request).select_related('userprofile').annotate(
+            words_count=Count('userword')
+        )
+
     def get_telegram_id(self, obj):
         if hasattr(obj, 'userprofile'):
             return obj.userprofile.telegram_id
@@ -57,9 +98,10 @@ class CustomUserAdmin(UserAdmin):
     get_telegram_id.short_description = 'Telegram ID'
 
     def get_words_count(self, obj):
-        return UserWord.objects.filter(user=obj).count()
+        return obj.words_count
 
     get_words_count.short_description = 'Количество слов'
+    get_words_count.admin_order_field = 'words_count'
 
 
 # Перерегистрируем User с новой админкой
@@ -0,0 +1,336 @@
+# app_vocab/anki_service.py
+
+import datetime
+import hashlib
+import html
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import uuid
+import zipfile
+
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from .export_service import iter_user_words, user_word_to_dict
+
+
+# Сколько заметок читаем/пишем за один раз
+APKG_CHUNK_SIZE = 5000
+
+# Имена файла коллекции внутри .apkg (collection.anki21b сжат zstd и не поддерживается)
+COLLECTION_NAMES = ('collection.anki21', 'collection.anki2')
+
+FIELD_SEPARATOR = '\x1f'
+
+# Типы карточек Anki
+CARD_NEW = 0
+CARD_LEARNING = 1
+CARD_REVIEW = 2
+CARD_RELEARNING = 3
+
+ANKI_SCHEMA = """
+CREATE TABLE col (
+    id integer primary key, crt integer not null, mod integer not null,
+    scm integer not null, ver integer not null, dty integer not null,
+    usn integer not null, ls integer not null, conf text not null,
+    models text not null, decks text not null, dconf text not null, tags text not null
+);
+CREATE TABLE notes (
+    id integer primary key, guid text not null, mid integer not null,
+    mod integer not null, usn integer not null, tags text not null,
+    flds text not null, sfld integer not null, csum integer not null,
+    flags integer not null, data text not null
+);
+CREATE TABLE cards (
+    id integer primary key, nid integer not null, did integer not null,
+    ord integer not null, mod integer not null, usn integer not null,
+    type integer not null, queue integer not null, due integer not null,
+    ivl integer not null, factor integer not null, reps integer not null,
+    lapses integer not null, left integer not null, odue integer not null,
+    odid integer not null, flags integer not null, data text not null
+);
+CREATE TABLE revlog (
+    id integer primary key, cid integer not null, usn integer not null,
+    ease integer not null, ivl integer not null, lastIvl integer not null,
+    factor integer not null, time integer not null, type integer not null
+);
+CREATE TABLE graves (usn integer not null, oid integer not null, type integer not null);
+CREATE INDEX ix_notes_usn on notes (usn);
+CREATE INDEX ix_cards_usn on cards (usn);
+CREATE INDEX ix_revlog_usn on revlog (usn);
+CREATE INDEX ix_cards_nid on cards (nid);
+CREATE INDEX ix_cards_sched on cards (did, queue, due);
+CREATE INDEX ix_revlog_cid on revlog (cid);
+CREATE INDEX ix_notes_csum on notes (csum);
+"""
+
+
+# ===== ИМПОРТ =====
+
+def clean_field(value, max_length=100):
+    """Убирает HTML-разметку Anki из поля заметки"""
+    return html.unescape(strip_tags(value or '')).strip()[:max_length]
+
+
+def card_to_progress(card_type, due, ivl, factor, reps, lapses, collection_created):
+    """
+    Переводит расписание карточки Anki в поля SM-2 модели UserWord.
+    Anki не хранит число успешных повторений подряд, поэтому repetition
+    оценивается как reps - lapses.
+    """
+    now = timezone.now()
+
+    if card_type == CARD_REVIEW:
+        # due - номер дня от создания коллекции
+        next_review = datetime.datetime.fromtimestamp(
+            collection_created + due * 86400, tz=datetime.timezone.utc
+        )
+        repetition = max(1, reps - lapses)
+        interval = max(ivl, 1)
+    elif card_type in (CARD_LEARNING, CARD_RELEARNING):
+        # due - время в секундах
+        next_review = datetime.datetime.fromtimestamp(due, tz=datetime.timezone.utc)
+        repetition = 0
+        interval = 0
+    else:
+        next_review = now
+        repetition = 0
+        interval = 0
+
+    return {
+        'interval': interval,
+        'repetition': repetition,
+        'ease_factor': max(1.3, factor / 1000) if factor else 2.5,
+        'next_review': next_review,
+        'last_reviewed': now if reps else None,
+        'correct_answers': max(0, reps - lapses),
+        'wrong_answers': lapses,
+    }
+
+
+def iter_apkg_rows(apkg_file, chunk_size=APKG_CHUNK_SIZE):
+    """
+    Потоково читает колоду Anki (.apkg).
+
+    Коллекция распаковывается во временный файл, затем заметки читаются
+    курсором по chunk_size строк - память не зависит от размера колоды.
+    Для каждой заметки возвращает поля слова с прогрессом SM-2 или None.
+    """
+    with zipfile.ZipFile(apkg_file) as archive:
+        names = set(archive.namelist())
+        collection_name = next((name for name in COLLECTION_NAMES if name in names), None)
+        if collection_name is None:
+            raise ValueError('В архиве нет коллекции Anki (collection.anki2)')
+
+        fd, collection_path = tempfile.mkstemp(suffix='.anki2')
+        with os.fdopen(fd, 'wb') as destination, archive.open(collection_name) as source:
+            shutil.copyfileobj(source, destination)
+
+    connection = sqlite3.connect(collection_path)
+    try:
+        collection_created = connection.execute('SELECT crt FROM col').fetchone()[0]
+
+        # Первая карточка каждой заметки (по ord) несет расписание
+        cursor = connection.execute("""
+            SELECT n.flds, c.type, c.due, c.ivl, c.factor, c.reps, c.lapses
+            FROM notes n
+            LEFT JOIN cards c ON c.id = (
+                SELECT id FROM cards WHERE nid = n.id ORDER BY ord LIMIT 1
+            )
+            ORDER BY n.id
+        """)
+
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+
+            for flds, card_type, due, ivl, factor, reps, lapses in rows:
+                fields = flds.split(FIELD_SEPARATOR)
+                original = clean_field(fields[0])
+                translation = clean_field(fields[1]) if len(fields) > 1 else ''
+                if not original or not translation:
+                    yield None
+                    continue
+
+                data = {
+                    'original': original,
+                    'translation': translation,
+                    'transcription': clean_field(fields[2]) if len(fields) > 2 else '',
+                    'example_sentence': '',
+                    'difficulty_level': 0,
+                    'progress': {},
+                }
+                if card_type is not None:
+                    data['progress'] = card_to_progress(
+                        card_type, due, ivl, factor, reps or 0, lapses or 0, collection_created
+                    )
+                yield data
+    finally:
+        connection.close()
+        os.remove(collection_path)
+
+
+# ===== ЭКСПОРТ =====
+
+def field_checksum(value):
+    """Контрольная сумма первого поля, как ее считает Anki"""
+    return int(hashlib.sha1(value.encode('utf-8')).hexdigest()[:8], 16)
+
+
+def build_collection_meta(model_id, deck_id, deck_name, now):
+    """Модель заметок "Front/Back" и колода для таблицы col"""
+    model = {
+        'id': model_id,
+        'name': 'Vocabulary Trainer',
+        'type': 0,
+        'mod': now,
+        'usn': -1,
+        'sortf': 0,
+        'did': deck_id,
+        'tmpls': [{
+            'name': 'Card 1',
+            'ord': 0,
+            'qfmt': '{{Front}}',
+            'afmt': '{{FrontSide}}<hr id=answer>{{Back}}<br>{{Transcription}}',
+            'did': None,
+            'bqfmt': '',
+            'bafmt': '',
+        }],
+        'flds': [
+            {'name': name, 'ord': ord_, 'sticky': False, 'rtl': False,
+             'font': 'Arial', 'size': 20, 'media': []}
+            for ord_, name in enumerate(['Front', 'Back', 'Transcription'])
+        ],
+        'css': '.card { font-family: arial; font-size: 20px; text-align: center; }',
+        'latexPre': '',
+        'latexPost': '',
+        'tags': [],
+        'vers': [],
+        'req': [[0, 'any', [0]]],
+    }
+
+    def deck(deck_id_, name):
+        return {
+            'id': deck_id_, 'name': name, 'mod': now, 'usn': -1, 'desc': '',
+            'dyn': 0, 'conf': 1, 'collapsed': False, 'extendNew': 10, 'extendRev': 50,
+            'newToday': [0, 0], 'revToday': [0, 0], 'lrnToday': [0, 0], 'timeToday': [0, 0],
+        }
+
+    decks = {'1': deck(1, 'Default'), str(deck_id): deck(deck_id, deck_name)}
+    dconf = {'1': {'id': 1, 'name': 'Default', 'mod': now, 'usn': -1, 'maxTaken': 60,
+                   'autoplay': True, 'timer': 0, 'replayq': True, 'dyn': False,
+                   'new': {'delays': [1, 10], 'ints': [1, 4, 7], 'initialFactor': 2500,
+                           'order': 1, 'perDay': 20},
+                   'rev': {'perDay': 200, 'ease4': 1.3, 'fuzz': 0.05, 'maxIvl': 36500,
+                           'hardFactor': 1.2},
+                   'lapse': {'delays': [10], 'mult': 0, 'minInt': 1, 'leechFails': 8,
+                             'leechAction': 0}}}
+
+    return {str(model_id): model}, decks, dconf
+
+
+def word_to_card(data, collection_created):
+    """Переводит прогресс SM-2 (словарь user_word_to_dict) в расписание карточки Anki"""
+    repetition = data.get('repetition') or 0
+    if not repetition:
+        return CARD_NEW, 0, 0, 0, data.get('correct_answers', 0) + data.get('wrong_answers', 0)
+
+    next_review = data.get('next_review')
+    if isinstance(next_review, str):
+        next_review = datetime.datetime.fromisoformat(next_review)
+    due_timestamp = next_review.timestamp() if next_review else time.time()
+    due = max(0, int((due_timestamp - collection_created) // 86400))
+
+    return (
+        CARD_REVIEW,
+        due,
+        max(1, data.get('interval') or 1),
+        int((data.get('ease_factor') or 2.5) * 1000),
+        data.get('correct_answers', 0) + data.get('wrong_answers', 0),
+    )
+
+
+def write_apkg(rows, apkg_file, deck_name='Vocabulary Trainer', chunk_size=APKG_CHUNK_SIZE):
+    """
+    Записывает слова (словари в формате user_word_to_dict) в колоду Anki.
+    apkg_file - путь или открытый на запись двоичный файл.
+    Строки пишутся пачками через executemany, в памяти держится одна пачка.
+    Возвращает количество заметок.
+    """
+    now = int(time.time())
+    # Коллекция "создана" в полночь UTC сегодняшнего дня
+    collection_created = now - now % 86400
+    model_id = now * 1000
+    deck_id = now * 1000 + 1
+
+    fd, collection_path = tempfile.mkstemp(suffix='.anki2')
+    os.close(fd)
+
+    count = 0
+    connection = sqlite3.connect(collection_path)
+    try:
+        connection.executescript(ANKI_SCHEMA)
+        models, decks, dconf = build_collection_meta(model_id, deck_id, deck_name, now)
+        connection.execute(
+            'INSERT INTO col VALUES (1, ?, ?, ?, 11, 0, 0, 0, ?, ?, ?, ?, ?)',
+            (collection_created, now * 1000, now * 1000, json.dumps({'nextPos': 1}),
+             json.dumps(models), json.dumps(decks), json.dumps(dconf), json.dumps({}))
+        )
+
+        notes, cards = [], []
+        base_id = now * 1000
+
+        def flush():
+            connection.executemany('INSERT INTO notes VALUES (?,?,?,?,?,?,?,?,?,?,?)', notes)
+            connection.executemany('INSERT INTO cards VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)', cards)
+            notes.clear()
+            cards.clear()
+
+        for data in rows:
+            count += 1
+            note_id = base_id + count
+            original = data['original']
+            fields = FIELD_SEPARATOR.join([
+                html.escape(original), html.escape(data['translation']),
+                html.escape(data.get('transcription') or ''),
+            ])
+            notes.append((
+                note_id, uuid.uuid4().hex[:10], model_id, now, -1, '', fields,
+                original, field_checksum(original), 0, '',
+            ))
+
+            card_type, due, ivl, factor, reps = word_to_card(data, collection_created)
+            if card_type == CARD_NEW:
+                due = count  # позиция в очереди новых карточек
+            cards.append((
+                note_id, note_id, deck_id, 0, now, -1, card_type, card_type, due,
+                ivl, factor, reps, data.get('wrong_answers', 0), 0, 0, 0, 0, '',
+            ))
+
+            if len(notes) >= chunk_size:
+                flush()
+
+        flush()
+        connection.commit()
+    finally:
+        connection.close()
+
+    try:
+        with zipfile.ZipFile(apkg_file, 'w', zipfile.ZIP_DEFLATED) as archive:
+            archive.write(collection_path, 'collection.anki2')
+            archive.writestr('media', '{}')
+    finally:
+        os.remove(collection_path)
+
+    return count
+
+
+def export_user_apkg(user, apkg_file):
+    """Экспортирует словарь пользователя с расписанием повторений в .apkg"""
+    rows = (user_word_to_dict(user_word) for user_word in iter_user_words(user))
+    return write_apkg(rows, apkg_file, deck_name=f'Vocabulary Trainer - {user.username}')
@@ -0,0 +1,133 @@
+# app_vocab/api_views.py
+
+# JSON API тренажера и игр (версия 1, адреса /api/v1/...). Страницы тренажера, теста
+# и игры рендерятся один раз, дальше работают только через API: ответы - короткие
+# JSON по id карточек, без шаблонов и статистики.
+import json
+from functools import wraps
+
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import condition, require_GET, require_POST
+
+from .cache_service import user_cache_version
+from .services import get_cached_user_profile
+from .trainer_service import (
+    ANSWER_QUALITY,
+    TRAINER_CARDS_LIMIT,
+    answer_card,
+    check_quiz_answer,
+    get_trainer_cards,
+    matching_board,
+    next_due_at,
+    next_quiz_question,
+)
+
+
+def api_login_required(view):
+    """Как login_required, но вместо перенаправления на страницу входа - 401 в JSON"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'error': 'Authentication required'}, status=401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def read_json(request):
+    """Тело запроса как словарь или None, если это не JSON-объект"""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def read_int(data, name):
+    value = data.get(name)
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def cards_due_at(request):
+    # Нужно и для ETag, и для ключа кэша карточек - считаем один раз на запрос
+    if not hasattr(request, 'cards_due_at'):
+        request.cards_due_at = next_due_at(request.user)
+    return request.cards_due_at
+
+
+def cards_etag(request):
+    # Карточки меняются с версией кэша пользователя и когда подходит срок следующего слова
+    limit = request.GET.get('limit', '')
+    return f'"cards-{user_cache_version(request.user.id)}-{cards_due_at(request)}-{limit}"'
+
+
+@api_login_required
+@require_GET
+@condition(etag_func=cards_etag)
+def cards(request):
+    """Карточки на сегодня. Повторный запрос без изменений получает 304 по ETag"""
+    limit = request.GET.get('limit', '')
+    limit = min(int(limit), TRAINER_CARDS_LIMIT) if limit.isdigit() and int(limit) > 0 else TRAINER_CARDS_LIMIT
+    response = JsonResponse({'cards': get_trainer_cards(request.user, limit, cards_due_at(request))})
+    # Ответ личный: браузер хранит его, но каждый раз сверяет ETag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@api_login_required
+@require_POST
+def answer(request, user_word_id):
+    """Ответ на карточку: {"action": "know" | "dont_know"} или {"quality": 0-5}"""
+    data = read_json(request)
+    if data is None:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    quality = ANSWER_QUALITY.get(data.get('action'), read_int(data, 'quality'))
+    if quality is None or not 0 <= quality <= 5:
+        return JsonResponse({'error': 'Invalid answer'}, status=400)
+
+    progress = answer_card(request.user, user_word_id, quality)
+    if progress is None:
+        return JsonResponse({'error': 'Word not found'}, status=404)
+    return JsonResponse(progress)
+
+
+@api_login_required
+@require_GET
+@never_cache
+def quiz_question(request):
+    """Следующий вопрос теста с выбором"""
+    if not get_cached_user_profile(request.user).enable_multiple_choice:
+        return JsonResponse({'error': 'Multiple choice test is disabled'}, status=403)
+    question = next_quiz_question(request.user)
+    if question is None:
+        return JsonResponse({'error': 'Not enough words'}, status=404)
+    return JsonResponse(question)
+
+
+@api_login_required
+@require_POST
+def quiz_answer(request):
+    """Проверка ответа: {"card": id карточки, "option": id выбранного слова}"""
+    data = read_json(request)
+    card, option = (read_int(data, 'card'), read_int(data, 'option')) if data is not None else (None, None)
+    if card is None or option is None:
+        return JsonResponse({'error': 'Missing answer data'}, status=400)
+
+    result = check_quiz_answer(request.user, card, option)
+    if result is None:
+        return JsonResponse({'error': 'Word not found'}, status=404)
+    return JsonResponse(result)
+
+
+@api_login_required
+@require_GET
+@never_cache
+def matching_game_board(request):
+    """Новая раскладка игры «Сопоставление»"""
+    if not get_cached_user_profile(request.user).enable_matching:
+        return JsonResponse({'error': 'Matching game is disabled'}, status=403)
+    board = matching_board(request.user)
+    if board is None:
+        return JsonResponse({'error': 'Not enough words'}, status=404)
+    return JsonResponse(board)
@@ -0,0 +1,112 @@
+# app_vocab/autocomplete_service.py
+import bisect
+import os
+import threading
+from collections import OrderedDict
+
+from .cache_service import user_cache_version
+from .db_router import replica_reads
+
+
+# Для скольких пользователей держим словарь в памяти процесса
+AUTOCOMPLETE_CACHE_USERS = int(os.getenv('AUTOCOMPLETE_CACHE_USERS', 500))
+# Сколько подсказок возвращаем
+AUTOCOMPLETE_LIMIT = 10
+
+
+class DeckIndex:
+    """
+    Слова словаря пользователя, отсортированные без учета регистра.
+    Слова с нужным началом идут подряд - их находит bisect.
+    """
+
+    def __init__(self, rows):
+        entries = sorted((original.casefold(), original, translation) for original, translation in rows)
+        self.keys = [key for key, original, translation in entries]
+        self.entries = [(original, translation) for key, original, translation in entries]
+        self.originals = {original for original, translation in self.entries}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def complete(self, prefix, limit=AUTOCOMPLETE_LIMIT):
+        prefix = prefix.casefold()
+        start = bisect.bisect_left(self.keys, prefix)
+        end = bisect.bisect_left(self.keys, prefix + '\U0010ffff', lo=start)
+        return self.entries[start:min(end, start + limit)]
+
+    def contains(self, original):
+        """Слово уже есть в словаре (то же сравнение, что в add_word)"""
+        return original in self.originals
+
+
+def load_deck_index(user_id):
+    from .models import UserWord
+
+    with replica_reads(user_id):
+        rows = UserWord.objects.filter(user_id=user_id).values_list('word__original', 'word__translation')
+        return DeckIndex(rows)
+
+
+class DeckIndexCache:
+    """
+    Словари пользователей в памяти процесса: строятся при первом запросе,
+    вытесняются давно неиспользуемые. Запись помечена версией кэша пользователя
+    (cache_service): любое изменение словаря меняет версию, и словарь строится заново.
+    """
+
+    def __init__(self, max_users=AUTOCOMPLETE_CACHE_USERS):
+        self.max_users = max_users
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, user_id):
+        version = user_cache_version(user_id)
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(user_id)
+                self.metrics['hits'] += 1
+                return entry[1]
+            self.metrics['misses'] += 1
+
+        # Версию взяли до чтения базы: если словарь изменится во время построения,
+        # следующий запрос увидит новую версию и построит его заново
+        index = load_deck_index(user_id)
+        with self.lock:
+            self.entries[user_id] = (version, index)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_users:
+                self.entries.popitem(last=False)
+                self.metrics['evictions'] += 1
+        return index
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.metrics, users=len(self.entries))
+        requests = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / requests if requests else 0.0
+        return stats
+
+
+deck_indexes = DeckIndexCache()
+
+
+def autocomplete(user_id, text, limit=AUTOCOMPLETE_LIMIT):
+    """Слова словаря, начинающиеся с text, и есть ли text в словаре целиком"""
+    text = text.strip()
+    if not text:
+        return {'exists': False, 'suggestions': []}
+    index = deck_indexes.get(user_id)
+    return {
+        'exists': index.contains(text),
+        'suggestions': [
+            {'original': original, 'translation': translation}
+            for original, translation in index.complete(text, limit)
+        ],
+    }
@@ -3,13 +3,20 @@ import logging
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command
+from aiogram.filters.callback_data import CallbackData
 from aiogram.fsm.state import State, StatesGroup
 from aiogram.fsm.context import FSMContext
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, BotCommand
+from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from aiogram.types import BufferedInputFile
 import random
 
+from . import bot_db
+from .bot_metrics import setup_metrics
+from .send_queue import SendQueueMiddleware, send_queue
+from .fsm_storage import create_fsm_storage
+
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 
@@ -18,7 +25,12 @@ load_dotenv()
 
 # Инициализация бота
 bot = Bot(token=os.getenv('TELEGRAM_BOT_TOKEN'))
-dp = Dispatcher()
+# Сообщения в чаты идут через очередь с учетом лимитов Telegram (app_vocab/send_queue.py)
+bot.session.middleware(SendQueueMiddleware(send_queue))
+# Состояния хранятся вне процесса: переживают перезапуск и общие для воркеров webhook
+dp = Dispatcher(storage=create_fsm_storage())
+# Время обработчиков, база, запросы ORM и Bot API (см. app_vocab/bot_metrics.py)
+setup_metrics(dp)
 
 
 # ===== СОСТОЯНИЯ FSM =====
@@ -36,6 +48,28 @@ class CardStates(StatesGroup):
     rating_difficulty = State()
 
 
+# ===== ДАННЫЕ INLINE-КНОПОК =====
+class DeckPage(CallbackData, prefix='deck'):
+    """Страница словаря: ключ (ts, id) слова, от которого листаем"""
+    mode: str       # words - просмотр, delete - удаление
+    direction: str  # next / prev / from (см. bot_db.get_deck_page)
+    ts: int
+    id: int
+
+
+class DeckDelete(CallbackData, prefix='deckdel'):
+    """Удаление слова из словаря; ts/id - первое слово текущей страницы"""
+    user_word_id: int
+    ts: int
+    id: int
+
+
+LINK_REQUIRED_TEXT = (
+    "❌ <b>Сначала привяжите аккаунт</b>\n\n"
+    "Используйте /link чтобы привязать Telegram к веб-профилю."
+)
+
+
 # ===== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ =====
 async def set_bot_commands():
     """Устанавливает меню команд в боте"""
@@ -88,11 +122,83 @@ async def clear_previous_state(state: FSMContext):
     return False
 
 
-async def show_next_card(message: types.Message, state: FSMContext, cards: list, current_index: int):
+async def require_profile(message: types.Message):
+    """Профиль пользователя; если аккаунт не привязан - подсказывает /link и возвращает None"""
+    profile = await bot_db.get_profile(message.from_user.id)
+    if not profile:
+        await message.answer(LINK_REQUIRED_TEXT, parse_mode='HTML')
+    return profile
+
+
+def render_deck_page(mode: str, user_words: list, has_prev: bool, has_next: bool):
+    """Текст и inline-клавиатура страницы словаря"""
+    rows = []
+    if mode == 'delete':
+        text = "🗑️<b>Удаление слов</b>\n\nВыберите слово для удаления:"
+        ts, first_id = bot_db.deck_cursor(user_words[0])
+        for user_word in user_words:
+            rows.append([InlineKeyboardButton(
+                text=f"❌ {user_word.word.original} - {user_word.word.translation}",
+                callback_data=DeckDelete(user_word_id=user_word.id, ts=ts, id=first_id).pack()
+            )])
+    else:
+        text = "📚 <b>Ваши слова:</b>\n\n" + "\n".join(
+            [f"• {user_word.word.original} - {user_word.word.translation}" for user_word in user_words]
+        )
+
+    navigation = []
+    if has_prev:
+        ts, first_id = bot_db.deck_cursor(user_words[0])
+        navigation.append(InlineKeyboardButton(
+            text="⬅️ Назад",
+            callback_data=DeckPage(mode=mode, direction='prev', ts=ts, id=first_id).pack()
+        ))
+    if has_next:
+        ts, last_id = bot_db.deck_cursor(user_words[-1])
+        navigation.append(InlineKeyboardButton(
+            text="Вперед ➡️",
+            callback_data=DeckPage(mode=mode, direction='next', ts=ts, id=last_id).pack()
+        ))
+    if navigation:
+        rows.append(navigation)
+
+    return text, InlineKeyboardMarkup(inline_keyboard=rows) if rows else None
+
+
+async def get_card_word(card_ids: list, index: int):
+    """Слово карточки по id из состояния (None, если слово удалено)"""
+    if index >= len(card_ids):
+        return None
+    return await bot_db.get_word(card_ids[index])
+
+
+async def send_word_audio(message: types.Message, word_text: str, caption: str):
+    """Озвучивает слово и отправляет аудио. Возвращает False, если озвучить не удалось."""
+    filepath = await bot_db.synthesize_speech(word_text)
+    if not filepath:
+        return False
+
+    # Подпись не ждем - очередь отправит ее перед аудио
+    await send_queue.post(message.answer(caption, parse_mode='HTML'))
+    await message.answer_audio(
+        audio=types.FSInputFile(filepath, filename=f"{word_text}.mp3"),
+        title=word_text,
+        performer="Vocabulary Trainer"
+    )
+    return True
+
+
+async def show_next_card(message: types.Message, state: FSMContext, card_ids: list, current_index: int):
     """Показывает следующую карточку"""
     next_index = current_index + 1
+    word = await get_card_word(card_ids, next_index)
+
+    # Пропускаем слова, удаленные во время просмотра
+    while word is None and next_index < len(card_ids):
+        next_index += 1
+        word = await get_card_word(card_ids, next_index)
 
-    if next_index >= len(cards):
+    if word is None:
         await message.answer(
             "🎉 <b>Все карточки просмотрены!</b>\n\nОтличная работа! 🏆",
             reply_markup=get_main_keyboard(),
@@ -101,8 +207,7 @@ async def show_next_card(message: types.Message, state: FSMContext, cards: list,
         await state.clear()
         return
 
-    card = cards[next_index]
-    remaining = len(cards) - next_index - 1
+    remaining = len(card_ids) - next_index - 1
 
     keyboard = [
         [KeyboardButton(text="🔄 Показать перевод")],
@@ -118,17 +223,14 @@ async def show_next_card(message: types.Message, state: FSMContext, cards: list,
     )
 
     await message.answer(
-        f"📖 <b>Карточка {next_index + 1}/{len(cards)}</b>\n\n"
-        f"<i>{card['word']}</i>\n\n"
+        f"📖 <b>Карточка {next_index + 1}/{len(card_ids)}</b>\n\n"
+        f"<i>{word.original}</i>\n\n"
         f"Осталось карточек: {remaining}",
         reply_markup=reply_markup,
         parse_mode='HTML'
     )
 
-    await state.update_data(
-        current_index=next_index,
-        translation=card['translation']
-    )
+    await state.update_data(current_index=next_index)
     await state.set_state(CardStates.viewing_card)
 
 
@@ -180,26 +282,44 @@ async def cmd_cancel(message: types.Message, state: FSMContext):
 @dp.message(Command("words"))
 @dp.message(F.text == "📚 Мои слова")
 async def cmd_words(message: types.Message, state: FSMContext):
-    """Показывает все слова пользователя"""
+    """Показывает слова пользователя постранично"""
     await clear_previous_state(state)
 
-    from .models import Word
-    from asgiref.sync import sync_to_async
+    profile = await require_profile(message)
+    if not profile:
+        return
+
+    user_words, has_prev, has_next = await bot_db.get_deck_page(profile.user_id)
 
-    @sync_to_async
-    def get_words_async():
-        return list(Word.objects.all()[:10])
+    if not user_words:
+        await message.answer("📝 У вас пока нет добавленных слов.\nИспользуйте /add чтобы добавить первое слово!")
+        return
 
-    words = await get_words_async()
+    text, reply_markup = render_deck_page('words', user_words, has_prev, has_next)
+    await message.answer(text, reply_markup=reply_markup, parse_mode='HTML')
 
-    if words:
-        response = "📚 <b>Ваши слова:</b>\n\n" + "\n".join(
-            [f"• {word.original} - {word.translation}" for word in words]
-        )
-    else:
-        response = "📝 У вас пока нет добавленных слов.\nИспользуйте /add чтобы добавить первое слово!"
 
-    await message.answer(response, parse_mode='HTML')
+@dp.callback_query(DeckPage.filter())
+async def handle_deck_page(callback: types.CallbackQuery, callback_data: DeckPage):
+    """Листает словарь (просмотр или удаление) без OFFSET - от ключа слова на краю страницы"""
+    profile = await bot_db.get_profile(callback.from_user.id)
+    if not profile:
+        await callback.answer("Сначала привяжите аккаунт через /link", show_alert=True)
+        return
+
+    user_words, has_prev, has_next = await bot_db.get_deck_page(
+        profile.user_id, cursor=(callback_data.ts, callback_data.id), direction=callback_data.direction
+    )
+    if not user_words:
+        # Слова на краю страницы удалены - начинаем сначала
+        user_words, has_prev, has_next = await bot_db.get_deck_page(profile.user_id)
+
+    if user_words:
+        text, reply_markup = render_deck_page(callback_data.mode, user_words, has_prev, has_next)
+        await callback.message.edit_text(text, reply_markup=reply_markup, parse_mode='HTML')
+    else:
+        await callback.message.edit_text("📝 В вашем словаре больше нет слов.")
+    await callback.answer()
 
 
 
@@ -209,8 +329,14 @@ async def cmd_words(message: types.Message, state: FSMContext):
 async def cmd_add(message: types.Message, state: FSMContext):
     """Начинает процесс добавления слова"""
     await clear_previous_state(state)
+
+    profile = await require_profile(message)
+    if not profile:
+        return
+
     await message.answer("📝 Введите иностранное слово:")
     await state.set_state(AddWord.waiting_original)
+    await state.update_data(user_id=profile.user_id)
 
 
 @dp.message(AddWord.waiting_original)
@@ -237,23 +363,8 @@ async def process_translation(message: types.Message, state: FSMContext):
 
     user_data = await state.get_data()
 
-    from .models import Word
-    from asgiref.sync import sync_to_async
-
-    @sync_to_async
-    def save_word_async():
-        # ПРОВЕРЯЕМ ДУБЛИКАТЫ
-        if Word.objects.filter(original=user_data['original']).exists():
-            return None, "duplicate"
-
-        word = Word(
-            original=user_data['original'],
-            translation=message.text
-        )
-        word.save()
-        return word, "success"
-
-    word, result = await save_word_async()
+    # ПРОВЕРЯЕМ ДУБЛИКАТЫ
+    word, result = await bot_db.add_word_to_deck(user_data['user_id'], user_data['original'], message.text)
 
     if result == "duplicate":
         await message.answer(
@@ -275,66 +386,63 @@ async def process_translation(message: types.Message, state: FSMContext):
 # ===== УДАЛЕНИЕ СЛОВ =====
 @dp.message(Command("delete"))
 async def cmd_delete(message: types.Message, state: FSMContext):
-    """Начинает процесс удаления слова"""
+    """Показывает слова пользователя с кнопками удаления"""
     await clear_previous_state(state)
 
-    from .models import Word
-    from asgiref.sync import sync_to_async
-
-    @sync_to_async
-    def get_words_async():
-        return list(Word.objects.all()[:10])
+    profile = await require_profile(message)
+    if not profile:
+        return
 
-    words = await get_words_async()
+    user_words, has_prev, has_next = await bot_db.get_deck_page(profile.user_id)
 
-    if not words:
+    if not user_words:
         await message.answer("📝 У вас пока нет добавленных слов.")
         return
 
-    # Создаем клавиатуру со словами для удаления
-    keyboard = []
-    for word in words:
-        keyboard.append([KeyboardButton(text=f"❌ {word.original} - {word.translation}")])
+    text, reply_markup = render_deck_page('delete', user_words, has_prev, has_next)
+    await message.answer(text, reply_markup=reply_markup, parse_mode='HTML')
 
-    # унифицируем с "⏹️ Отмена"
-    keyboard.append([KeyboardButton(text="⏪ Отмена")])
 
+@dp.callback_query(DeckDelete.filter())
+async def handle_deck_delete(callback: types.CallbackQuery, callback_data: DeckDelete):
+    """Убирает слово из словаря пользователя и обновляет текущую страницу"""
+    profile = await bot_db.get_profile(callback.from_user.id)
+    if not profile:
+        await callback.answer("Сначала привяжите аккаунт через /link", show_alert=True)
+        return
 
-    reply_markup = ReplyKeyboardMarkup(
-        keyboard=keyboard,
-        resize_keyboard=True,
-        one_time_keyboard=False
-    )
+    deleted_word = await bot_db.remove_from_deck(profile.user_id, user_word_id=callback_data.user_word_id)
 
-    await message.answer(
-        "🗑️<b>Удаление слов</b>\n\n"
-        "Выберите слово для удаления:",
-        reply_markup=reply_markup,
-        parse_mode='HTML'
+    user_words, has_prev, has_next = await bot_db.get_deck_page(
+        profile.user_id, cursor=(callback_data.ts, callback_data.id), direction='from'
     )
+    if not user_words:
+        user_words, has_prev, has_next = await bot_db.get_deck_page(profile.user_id)
+
+    if user_words:
+        text, reply_markup = render_deck_page('delete', user_words, has_prev, has_next)
+        await callback.message.edit_text(text, reply_markup=reply_markup, parse_mode='HTML')
+    else:
+        await callback.message.edit_text("📝 В вашем словаре больше нет слов.")
 
-    await state.update_data(words_for_deletion=words)
+    if deleted_word:
+        await callback.answer(f"✅ Слово '{deleted_word}' удалено из вашего словаря")
+    else:
+        await callback.answer("Слово уже удалено")
 
 
+# Кнопки удаления из старой reply-клавиатуры
 @dp.message(F.text.startswith("❌"))
 async def handle_word_deletion(message: types.Message, state: FSMContext):
     """Обрабатывает удаление выбранного слова"""
-    from .models import Word
-    from asgiref.sync import sync_to_async
+    profile = await require_profile(message)
+    if not profile:
+        return
 
     # Извлекаем оригинал слова из текста кнопки
-    word_text = message.text.replace("❌ ", "").split(" - ")[0]
+    deleted_word = message.text.replace("❌ ", "").split(" - ")[0]
 
-    @sync_to_async
-    def delete_word_async():
-        try:
-            word = Word.objects.get(original=word_text)
-            word.delete()
-            return True, word_text
-        except Word.DoesNotExist:
-            return False, word_text
-
-    success, deleted_word = await delete_word_async()
+    success = await bot_db.remove_from_deck(profile.user_id, original=deleted_word)
 
     if success:
         await message.answer(
@@ -378,9 +486,11 @@ async def cmd_quiz(message: types.Message, state: FSMContext):
     """Запуск интерактивного теста"""
     await clear_previous_state(state)
 
-    from .services import get_quiz_question_async
+    profile = await require_profile(message)
+    if not profile:
+        return
 
-    question_data = await get_quiz_question_async()
+    question_data = await bot_db.get_quiz_question(profile.user_id)
 
     if not question_data:
         await message.answer(
@@ -410,6 +520,7 @@ async def cmd_quiz(message: types.Message, state: FSMContext):
 
     await state.set_state(QuizStates.waiting_for_answer)
     await state.update_data(
+        user_id=profile.user_id,
         correct_answer=question_data['correct_answer'],
         question_type=question_data['type'],
         score=0,
@@ -425,8 +536,6 @@ async def handle_quiz_answer(message: types.Message, state: FSMContext):
         await cmd_cancel(message, state)
         return
 
-    from .services import get_quiz_question_async
-
     user_data = await state.get_data()
     correct_answer = user_data.get('correct_answer')
     user_answer = message.text
@@ -441,7 +550,7 @@ async def handle_quiz_answer(message: types.Message, state: FSMContext):
         response = f"❌ <b>Неправильно</b>\nПравильный ответ: <code>{correct_answer}</code>"
 
     await state.update_data(score=current_score)
-    next_question = await get_quiz_question_async()
+    next_question = await bot_db.get_quiz_question(user_data['user_id'])
 
     if next_question:
         keyboard = []
@@ -491,12 +600,14 @@ async def handle_quiz_answer(message: types.Message, state: FSMContext):
 @dp.message(Command("cards"))
 @dp.message(F.text == "📖 Карточки")
 async def cmd_cards(message: types.Message, state: FSMContext):
-    """Показывает карточки для повторения"""
+    """Показывает карточки для повторения: сначала слова, которые пора повторить"""
     await clear_previous_state(state)
 
-    from .services import get_review_cards_async
+    profile = await require_profile(message)
+    if not profile:
+        return
 
-    cards = await get_review_cards_async()
+    cards = await bot_db.get_review_cards(profile.user_id)
 
     if not cards:
         await message.answer(
@@ -530,11 +641,11 @@ async def cmd_cards(message: types.Message, state: FSMContext):
         parse_mode='HTML'
     )
 
+    # В состоянии только id слов и позиция - сами слова читаются из базы
     await state.set_state(CardStates.viewing_card)
     await state.update_data(
-        cards=cards,
-        current_index=0,
-        translation=card['translation']
+        card_ids=[card['id'] for card in cards],
+        current_index=0
     )
 
 
@@ -548,10 +659,9 @@ async def handle_card_action(message: types.Message, state: FSMContext):
 
 
     user_data = await state.get_data()
-    cards = user_data.get('cards', [])
+    card_ids = user_data.get('card_ids', [])
     current_index = user_data.get('current_index', 0)
-    translation = user_data.get('translation', '')
-    current_card = cards[current_index] if current_index < len(cards) else None
+    current_card = await get_card_word(card_ids, current_index)
 
     if not current_card:
         await message.answer("❌ Ошибка: карточка не найдена")
@@ -572,7 +682,7 @@ async def handle_card_action(message: types.Message, state: FSMContext):
         )
 
         await message.answer(
-            f"📖 <b>Перевод:</b>\n\n<code>{translation}</code>\n\n"
+            f"📖 <b>Перевод:</b>\n\n<code>{current_card.translation}</code>\n\n"
             f"<i>Оцените сложность слова:</i>",
             reply_markup=reply_markup,
             parse_mode='HTML'
@@ -581,45 +691,16 @@ async def handle_card_action(message: types.Message, state: FSMContext):
         await state.set_state(CardStates.rating_difficulty)
 
     elif message.text == "⏩ Следующая карточка":
-        await show_next_card(message, state, cards, current_index)
+        await show_next_card(message, state, card_ids, current_index)
 
 
     # ===== ОЗВУЧКА СЛОВА ТЕКУЩЕЙ КАРТОЧКИ =====
 
     elif message.text == "🔊 Озвучить слово":
         # Озвучка слова из текущей карточки
-        import os
-        from django.conf import settings
-
-        # Используем слово из карточки, а не ищем в базе
-        word_text = current_card['word']
-
-        # Генерируем аудио через TTS сервис
-        from .tts_service import text_to_speech
-        from asgiref.sync import sync_to_async
-
-        @sync_to_async
-        def generate_audio_async():
-            return text_to_speech(word_text, lang='en')
-
-        tts_result = await generate_audio_async()
-
-        if tts_result and 'url' in tts_result:
-            audio_url = tts_result['url']
-            filename = audio_url.replace('/media/audio/', '')
-            filepath = os.path.join(settings.MEDIA_ROOT, 'audio', filename)
-
-            if os.path.exists(filepath):
-                with open(filepath, 'rb') as audio_file:
-                    await message.answer(f"🔊 <b>{word_text}</b>", parse_mode='HTML')
-                    await message.answer_audio(
-                        audio=types.BufferedInputFile(audio_file.read(), filename=f"{word_text}.mp3"),
-                        title=word_text,
-                        performer="Vocabulary Trainer"
-                    )
-            else:
-                await message.answer("❌ Аудиофайл не найден")
-        else:
+        word_text = current_card.original
+
+        if not await send_word_audio(message, word_text, f"🔊 <b>{word_text}</b>"):
             await message.answer("❌ Не удалось озвучить слово")
 
 
@@ -627,7 +708,7 @@ async def handle_card_action(message: types.Message, state: FSMContext):
 async def handle_difficulty_rating(message: types.Message, state: FSMContext):
     """Обрабатывает оценку сложности слова"""
     user_data = await state.get_data()
-    cards = user_data.get('cards', [])
+    card_ids = user_data.get('card_ids', [])
     current_index = user_data.get('current_index', 0)
 
     difficulty_emojis = {
@@ -638,16 +719,18 @@ async def handle_difficulty_rating(message: types.Message, state: FSMContext):
 
     if message.text in difficulty_emojis:
         difficulty = difficulty_emojis[message.text]
-        current_card = cards[current_index]
-        print(f"Пользователь оценил слово '{current_card['word']}' как '{difficulty}'")
+        current_card = await get_card_word(card_ids, current_index)
+        if current_card:
+            print(f"Пользователь оценил слово '{current_card.original}' как '{difficulty}'")
 
-        await message.answer(
-            f"📊 Оценка сохранена: <b>{difficulty}</b>\n"
-            f"Слово: <code>{current_card['word']}</code>",
-            parse_mode='HTML'
-        )
+            # Очередь склеит оценку со следующей карточкой в одно сообщение
+            await send_queue.post(message.answer(
+                f"📊 Оценка сохранена: <b>{difficulty}</b>\n"
+                f"Слово: <code>{current_card.original}</code>",
+                parse_mode='HTML'
+            ))
 
-    await show_next_card(message, state, cards, current_index)
+    await show_next_card(message, state, card_ids, current_index)
 
 
 # ===== СТАТИСТИКА И ОЗВУЧКА =====
@@ -658,38 +741,23 @@ async def cmd_stats(message: types.Message, state: FSMContext):
     """Показывает статистику"""
     await clear_previous_state(state)
 
-    from .models import Word
-    from datetime import datetime, timedelta
-    from asgiref.sync import sync_to_async
-
-    @sync_to_async
-    def get_stats_async():
-        total_words = Word.objects.count()
-        today = datetime.now().date()
-        words_today = Word.objects.filter(date_added__date=today).count()
-
-        # Статистика за последние 7 дней
-        last_7_days = []
-        for i in range(7):
-            date = today - timedelta(days=i)
-            count = Word.objects.filter(date_added__date=date).count()
-            last_7_days.append({'date': date, 'count': count})
-
-        return total_words, words_today, last_7_days
+    profile = await require_profile(message)
+    if not profile:
+        return
 
-    total_words, words_today, last_7_days = await get_stats_async()
+    stats = await bot_db.get_deck_stats(profile.user_id)
 
     # Формируем расширенную статистику
     response = f"📊 <b>Ваша статистика:</b>\n\n"
-    response += f"• 📚 Всего слов: <b>{total_words}</b>\n"
-    response += f"• 🆕 Новые: <b>{words_today}</b>\n"
-    response += f"• 📖 В процессе: <b>0</b>\n"  # Можно добавить логику прогресса
-    response += f"• ✅ Изучено: <b>0</b>\n"  # Можно добавить логику изучения
-    response += f"• 🎯 На сегодня: <b>{total_words}</b>\n\n"
+    response += f"• 📚 Всего слов: <b>{stats['total']}</b>\n"
+    response += f"• 🆕 Новые: <b>{stats['added_today']}</b>\n"
+    response += f"• 📖 В процессе: <b>{stats['learning']}</b>\n"
+    response += f"• ✅ Изучено: <b>{stats['learned']}</b>\n"
+    response += f"• 🎯 На сегодня: <b>{stats['due']}</b>\n\n"
 
     # Активность за неделю
     response += "<b>Активность за неделю:</b>\n"
-    for day in last_7_days[:3]:  # Показываем последние 3 дня
+    for day in stats['last_days'][:3]:  # Показываем последние 3 дня
         emoji = "🔥" if day['count'] > 0 else "⚪"
         response += f"{emoji} {day['date'].strftime('%d.%m')}: {day['count']} слов\n"
 
@@ -718,49 +786,16 @@ async def cmd_say(message: types.Message, state: FSMContext):
         )
         return
 
-    word_text = ' '.join(parts[1:])  # Берем все после "/say"
-
-    from .models import Word
-    from asgiref.sync import sync_to_async
+    profile = await require_profile(message)
+    if not profile:
+        return
 
-    @sync_to_async
-    def find_word_async():
-        try:
-            # Ищем слово в базе
-            return Word.objects.get(original=word_text)
-        except Word.DoesNotExist:
-            try:
-                # Ищем по переводу
-                return Word.objects.get(translation=word_text)
-            except Word.DoesNotExist:
-                return None
+    word_text = ' '.join(parts[1:])  # Берем все после "/say"
 
-    word = await find_word_async()
+    word = await bot_db.find_word(profile.user_id, word_text)
 
     if word:
-        audio_url = word.get_audio_url()
-
-        if audio_url:
-            # Открываем файл и отправляем как файл
-            import os
-            from django.conf import settings
-
-            # Получаем полный путь к файлу
-            filename = audio_url.replace('/media/audio/', '')
-            filepath = os.path.join(settings.MEDIA_ROOT, 'audio', filename)
-
-            if os.path.exists(filepath):
-                # Отправляем файл напрямую
-                with open(filepath, 'rb') as audio_file:
-                    await message.answer(f"🔊 <b>{word.original}</b>", parse_mode='HTML')
-                    await message.answer_audio(
-                        audio=types.BufferedInputFile(audio_file.read(), filename=f"{word.original}.mp3"),
-                        title=word.original,
-                        performer="Vocabulary Trainer"
-                    )
-            else:
-                await message.answer(f"❌ Аудиофайл для '{word.original}' не найден")
-        else:
+        if not await send_word_audio(message, word.original, f"🔊 <b>{word.original}</b>"):
             await message.answer(f"❌ Не удалось сгенерировать аудио для '{word.original}'")
     else:
         await message.answer(f"❌ Слово '<code>{word_text}</code>' не найдено в вашем словаре", parse_mode='HTML')
@@ -770,149 +805,61 @@ async def cmd_say(message: types.Message, state: FSMContext):
 @dp.message(Command("audio"))
 @dp.message(F.text == "🔊 Озвучка")
 async def cmd_audio(message: types.Message, state: FSMContext):
-    """Озвучка нескольких случайных слов"""
+    """Озвучка последних добавленных слов пользователя"""
     await clear_previous_state(state)
 
-    from .models import Word
-    from asgiref.sync import sync_to_async
-
-    @sync_to_async
-    def get_words_async():
-        return list(Word.objects.all()[:3])
+    profile = await require_profile(message)
+    if not profile:
+        return
 
-    words = await get_words_async()
+    user_words, _, _ = await bot_db.get_deck_page(profile.user_id, page_size=3)
 
-    if not words:
+    if not user_words:
         await message.answer("❌ Нет слов для озвучки")
         return
 
-    for word in words:
-        audio_url = word.get_audio_url()
-
-        if audio_url:
-            import os
-            from django.conf import settings
-
-            filename = audio_url.replace('/media/audio/', '')
-            filepath = os.path.join(settings.MEDIA_ROOT, 'audio', filename)
-
-            if os.path.exists(filepath):
-                with open(filepath, 'rb') as audio_file:
-                    await message.answer(f"🔊 <b>{word.original}</b> - {word.translation}", parse_mode='HTML')
-                    await message.answer_audio(
-                        audio=types.BufferedInputFile(audio_file.read(), filename=f"{word.original}.mp3"),
-                        title=word.original,
-                        performer="Vocabulary Trainer"
-                    )
-            else:
-                await message.answer(f"❌ Аудиофайл для '{word.original}' не найден")
-        else:
+    for word in (user_word.word for user_word in user_words):
+        if not await send_word_audio(message, word.original, f"🔊 <b>{word.original}</b> - {word.translation}"):
             await message.answer(f"❌ Не удалось сгенерировать аудио для '{word.original}'")
 
 
 # ===== НАПОМИНАНИЯ =====
 
-@dp.message(Command("remind"))
-async def cmd_remind(message: types.Message, state: FSMContext):
-    """Ручной запуск напоминания о повторении слов"""
-    await clear_previous_state(state)
-
-    from .models import UserProfile, Word
-    from asgiref.sync import sync_to_async
-    import random
-
-    @sync_to_async
-    def get_reminder_data():
-        try:
-            profile = UserProfile.objects.get(telegram_id=message.from_user.id)
-            # Берем 3 случайных слова для повторения
-            words = list(Word.objects.all())
-            if len(words) > 3:
-                words = random.sample(words, 3)
-            return profile, words
-        except UserProfile.DoesNotExist:
-            return None, []
+async def send_reminder_digest(message: types.Message):
+    """Отправляет пользователю сводку слов, которые пора повторить"""
+    from .reminder_service import format_reminder
 
-    profile, words = await get_reminder_data()
+    profile, digest = await bot_db.get_reminder_digest(message.from_user.id)
 
     if not profile:
-        await message.answer(
-            "❌ <b>Сначала привяжите аккаунт</b>\n\n"
-            "Используйте /link чтобы привязать Telegram к веб-профилю.",
-            parse_mode='HTML'
-        )
+        await message.answer(LINK_REQUIRED_TEXT, parse_mode='HTML')
         return
 
-    if not words:
+    if not digest:
         await message.answer(
             "📝 <b>Нет слов для повторения</b>\n\n"
-            "Добавьте слова через /add чтобы получать напоминания.",
+            "Все слова повторены вовремя. Добавьте новые через /add или загляните позже.",
             parse_mode='HTML'
         )
         return
 
-    # Формируем сообщение с словами для повторения
-    words_list = "\n".join([f"• {word.original} - {word.translation}" for word in words])
+    await message.answer(format_reminder(digest), parse_mode='HTML')
 
-    await message.answer(
-        f"🔔 <b>Пора повторить слова!</b>\n\n"
-        f"{words_list}\n\n"
-        f"💡 <i>Используйте /quiz для теста или /cards для карточек</i>",
-        parse_mode='HTML'
-    )
+
+@dp.message(Command("remind"))
+async def cmd_remind(message: types.Message, state: FSMContext):
+    """Ручной запуск напоминания о повторении слов"""
+    await clear_previous_state(state)
+    await send_reminder_digest(message)
 
 
 @dp.message(F.text == "🔔 Напомнить")
 async def handle_remind_button(message: types.Message, state: FSMContext):
     """Обрабатывает кнопку напоминаний из основного меню"""
     await cmd_reminders(message, state)
+    await send_reminder_digest(message)
 
 
-
-    from .models import UserProfile, Word
-    from asgiref.sync import sync_to_async
-    import random
-
-    @sync_to_async
-    def get_reminder_data():
-        try:
-            profile = UserProfile.objects.get(telegram_id=message.from_user.id)
-            # Берем 3 случайных слова для повторения
-            words = list(Word.objects.all())
-            if len(words) > 3:
-                words = random.sample(words, 3)
-            return profile, words
-        except UserProfile.DoesNotExist:
-            return None, []
-
-    profile, words = await get_reminder_data()
-
-    if not profile:
-        await message.answer(
-            "❌ <b>Сначала привяжите аккаунт</b>\n\n"
-            "Используйте /link чтобы привязать Telegram к веб-профилю.",
-            parse_mode='HTML'
-        )
-        return
-
-    if not words:
-        await message.answer(
-            "📝 <b>Нет слов для повторения</b>\n\n"
-            "Добавьте слова через /add чтобы получать напоминания.",
-            parse_mode='HTML'
-        )
-        return
-
-    # Формируем сообщение со словами для повторения
-    words_list = "\n".join([f"• {word.original} - {word.translation}" for word in words])
-
-    await message.answer(
-        f"🔔 <b>Пора повторить слова!</b>\n\n"
-        f"{words_list}\n\n"
-        f"💡 <i>Используйте /quiz для теста или /cards для карточек</i>",
-        parse_mode='HTML'
-    )
-
 # ===== УПРАВЛЕНИЕ НАПОМИНАНИЯМИ =====
 
 @dp.message(Command("reminders"))
@@ -920,24 +867,10 @@ async def cmd_reminders(message: types.Message, state: FSMContext):
     """Управление настройками напоминаний"""
     await clear_previous_state(state)
 
-    from .models import UserProfile
-    from asgiref.sync import sync_to_async
-
-    @sync_to_async
-    def get_profile_async():
-        try:
-            return UserProfile.objects.get(telegram_id=message.from_user.id)
-        except UserProfile.DoesNotExist:
-            return None
-
-    profile = await get_profile_async()
+    profile = await bot_db.get_profile(message.from_user.id)
 
     if not profile:
-        await message.answer(
-            "❌ <b>Сначала привяжите аккаунт</b>\n\n"
-            "Используйте /link чтобы привязать Telegram к веб-профилю.",
-            parse_mode='HTML'
-        )
+        await message.answer(LINK_REQUIRED_TEXT, parse_mode='HTML')
         return
 
     keyboard = [
@@ -980,17 +913,7 @@ async def handle_back_to_menu(message: types.Message, state: FSMContext):
 @dp.message(F.text == "⚙️ Настройки напоминаний")
 async def handle_reminder_settings(message: types.Message, state: FSMContext):
     """Настройка параметров напоминаний"""
-    from .models import UserProfile
-    from asgiref.sync import sync_to_async
-
-    @sync_to_async
-    def get_profile_async():
-        try:
-            return UserProfile.objects.get(telegram_id=message.from_user.id)
-        except UserProfile.DoesNotExist:
-            return None
-
-    profile = await get_profile_async()
+    profile = await bot_db.get_profile(message.from_user.id)
 
     if not profile:
         await message.answer("❌ Сначала привяжите аккаунт через /link")
@@ -1021,23 +944,10 @@ async def handle_reminder_settings(message: types.Message, state: FSMContext):
 @dp.message(F.text.contains("слов/день"))
 async def handle_limit_change(message: types.Message):
     """Обрабатывает изменение лимита слов"""
-    from .models import UserProfile
-    from asgiref.sync import sync_to_async
-
     # Извлекаем число из текста (например: "10 слов/день" -> 10)
     new_limit = int(message.text.split()[0])
 
-    @sync_to_async
-    def update_limit_async():
-        try:
-            profile = UserProfile.objects.get(telegram_id=message.from_user.id)
-            profile.daily_review_limit = new_limit
-            profile.save()
-            return True
-        except UserProfile.DoesNotExist:
-            return False
-
-    success = await update_limit_async()
+    success = await bot_db.update_review_limit(message.from_user.id, new_limit)
 
     if success:
         await message.answer(
@@ -1068,44 +978,7 @@ async def cmd_link(message: types.Message, state: FSMContext):
     """Привязка Telegram аккаунта к веб-пользователю"""
     await clear_previous_state(state)
 
-    from django.contrib.auth.models import User
-    from .models import UserProfile
-    from asgiref.sync import sync_to_async
-    from django.db import IntegrityError
-
-    @sync_to_async
-    def link_account_async():
-        try:
-            # Пытаемся найти существующий профиль по telegram_id
-            try:
-                profile = UserProfile.objects.get(telegram_id=message.from_user.id)
-                # Профиль уже существует - обновляем username
-                profile.telegram_username = message.from_user.username
-                profile.save()
-                return False, profile  # created = False
-            except UserProfile.DoesNotExist:
-                # Создаем новый профиль
-                # Берем первого пользователя или создаем нового
-                user = User.objects.first()
-                if not user:
-                    user = User.objects.create_user('telegram_user', '', 'password')
-
-                profile = UserProfile.objects.create(
-                    user=user,
-                    telegram_id=message.from_user.id,
-                    telegram_username=message.from_user.username
-                )
-                return True, profile  # created = True
-
-        except IntegrityError:
-            # Если возникла ошибка уникальности, находим и обновляем существующий профиль
-            profile = UserProfile.objects.get(user=User.objects.first())
-            profile.telegram_id = message.from_user.id
-            profile.telegram_username = message.from_user.username
-            profile.save()
-            return False, profile
-
-    created, profile = await link_account_async()
+    created, profile = await bot_db.link_account(message.from_user.id, message.from_user.username)
 
     if created:
         response = (
@@ -1127,37 +1000,16 @@ async def cmd_profile(message: types.Message, state: FSMContext):
     """Показывает информацию о привязанном профиле"""
     await clear_previous_state(state)
 
-    from .models import UserProfile
-    from asgiref.sync import sync_to_async
-
-    @sync_to_async
-    def get_profile_async():
-        try:
-            return UserProfile.objects.get(telegram_id=message.from_user.id)
-        except UserProfile.DoesNotExist:
-            return None
-
-    profile = await get_profile_async()
+    profile = await bot_db.get_profile(message.from_user.id)
 
     if profile:
-        # Получаем данные пользователя через асинхронную обертку
-        @sync_to_async
-        def get_user_data():
-            return {
-                'username': profile.user.username,
-                'telegram_id': profile.telegram_id,
-                'telegram_username': profile.telegram_username,
-                'daily_review_limit': profile.daily_review_limit
-            }
-
-        user_data = await get_user_data()
-
+        # Пользователь уже загружен вместе с профилем (select_related)
         response = (
             "👤 <b>Ваш профиль</b>\n\n"
-            f"• Веб-пользователь: <code>{user_data['username']}</code>\n"
-            f"• Telegram ID: <code>{user_data['telegram_id']}</code>\n"
-            f"• Username: @{user_data['telegram_username'] or 'не указан'}\n"
-            f"• Лимит повторений: <b>{user_data['daily_review_limit']}</b> слов/день\n\n"
+            f"• Веб-пользователь: <code>{profile.user.username}</code>\n"
+            f"• Telegram ID: <code>{profile.telegram_id}</code>\n"
+            f"• Username: @{profile.telegram_username or 'не указан'}\n"
+            f"• Лимит повторений: <b>{profile.daily_review_limit}</b> слов/день\n\n"
             f"Аккаунт успешно привязан! 🎯"
         )
     else:
@@ -1182,18 +1034,8 @@ async def handle_profile_button(message: types.Message, state: FSMContext):
 @dp.message(Command("cleanup"))
 async def cmd_cleanup(message: types.Message):
     """Очистка базы от ошибочных слов (временная команда)"""
-    from .models import Word
-    from asgiref.sync import sync_to_async
-
-    @sync_to_async
-    def cleanup_words():
-        # Удаляем слова, которые являются командами
-        words_to_delete = Word.objects.filter(original__in=["steamship", "/cancel"])
-        count = words_to_delete.count()
-        words_to_delete.delete()
-        return count
-
-    deleted_count = await cleanup_words()
+    # Удаляем слова, которые являются командами
+    deleted_count = await bot_db.delete_words(["steamship", "/cancel"])
 
     await message.answer(
         f"🧹 <b>Очистка завершена!</b>\n\n"
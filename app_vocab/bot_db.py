@@ -0,0 +1,484 @@
+# app_vocab/bot_db.py
+import asyncio
+import datetime
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import DatabaseError, IntegrityError, connection
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .bot_metrics import current_update
+
+
+# Сколько потоков обращаются к базе одновременно
+BOT_DB_POOL_SIZE = int(os.getenv('BOT_DB_POOL_SIZE', 4))
+# Префикс имени потоков пула (по нему тест проверяет, где выполняются запросы)
+BOT_DB_THREAD_PREFIX = 'bot-db'
+
+# Кэш профилей: сколько секунд профиль считается актуальным и сколько профилей храним
+PROFILE_CACHE_TTL = int(os.getenv('BOT_PROFILE_CACHE_TTL', 60))
+PROFILE_CACHE_SIZE = int(os.getenv('BOT_PROFILE_CACHE_SIZE', 10000))
+
+# Слов на странице словаря в боте
+DECK_PAGE_SIZE = 10
+
+
+class DatabaseThreadPool:
+    """
+    Пул потоков ограниченного размера для запросов бота к базе.
+    Каждый поток держит свое соединение и переиспользует его между задачами.
+    Метрики: сколько задач ждет свободного потока, сколько ждали и выполнялись.
+    """
+
+    def __init__(self, size=BOT_DB_POOL_SIZE, thread_name_prefix=BOT_DB_THREAD_PREFIX):
+        self.size = size
+        self.thread_name_prefix = thread_name_prefix
+        self.executor = None
+        self.lock = threading.Lock()
+        self.metrics = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'queued': 0,
+            'max_queued': 0,
+            'wait_time': 0.0,
+            'run_time': 0.0,
+        }
+
+    def get_executor(self):
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix=self.thread_name_prefix)
+        return self.executor
+
+    def call(self, func, args, kwargs, submitted_at, queries=None):
+        """Выполняется в потоке пула; если передан список queries, в него считаются запросы"""
+        started = time.monotonic()
+        with self.lock:
+            self.metrics['queued'] -= 1
+            self.metrics['wait_time'] += started - submitted_at
+
+        try:
+            if queries is None:
+                return func(*args, **kwargs)
+            with connection.execute_wrapper(functools.partial(count_query, queries)):
+                return func(*args, **kwargs)
+        except DatabaseError:
+            # Соединение могло оборваться - следующая задача в этом потоке откроет новое
+            if connection.connection is not None and not connection.is_usable():
+                connection.close()
+            with self.lock:
+                self.metrics['failed'] += 1
+            raise
+        finally:
+            with self.lock:
+                self.metrics['completed'] += 1
+                self.metrics['run_time'] += time.monotonic() - started
+
+    async def run(self, func, *args, **kwargs):
+        """Выполняет синхронную функцию в пуле и возвращает ее результат"""
+        with self.lock:
+            self.metrics['submitted'] += 1
+            self.metrics['queued'] += 1
+            self.metrics['max_queued'] = max(self.metrics['max_queued'], self.metrics['queued'])
+
+        loop = asyncio.get_running_loop()
+        update = current_update.get()
+        if update is None:
+            return await loop.run_in_executor(
+                self.get_executor(),
+                functools.partial(self.call, func, args, kwargs, time.monotonic()),
+            )
+
+        # Обращение из обработчика обновления - учитываем его время и запросы
+        queries = []
+        started = time.monotonic()
+        try:
+            return await loop.run_in_executor(
+                self.get_executor(),
+                functools.partial(self.call, func, args, kwargs, started, queries),
+            )
+        finally:
+            update.record_db(time.monotonic() - started, len(queries))
+
+    def stats(self):
+        """Снимок метрик пула"""
+        with self.lock:
+            stats = dict(self.metrics)
+        completed = stats['completed'] or 1
+        stats['avg_wait_ms'] = stats['wait_time'] / completed * 1000
+        stats['avg_run_ms'] = stats['run_time'] / completed * 1000
+        return stats
+
+    def shutdown(self):
+        """Останавливает потоки пула (их соединения закрываются вместе с потоками)"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+def count_query(queries, execute, sql, params, many, context):
+    queries.append(sql)
+    return execute(sql, params, many, context)
+
+
+db_pool = DatabaseThreadPool()
+
+
+def db_task(func):
+    """Превращает синхронную функцию с запросами ORM в корутину, выполняемую в пуле бота"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await db_pool.run(func, *args, **kwargs)
+    return wrapper
+
+
+class ProfileCache:
+    """
+    Кэш профилей по Telegram ID (TTL + вытеснение давно неиспользуемых).
+    Кэшируется и отсутствие профиля, чтобы непривязанные пользователи не
+    ходили в базу на каждое сообщение. Сохранения профиля сбрасывают запись
+    (сигнал в signals.py); изменения из другого процесса видны не позже TTL.
+    Профили из кэша общие для всех обработчиков - изменять их нельзя.
+    """
+
+    def __init__(self, ttl=PROFILE_CACHE_TTL, max_size=PROFILE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        # Запись из кэша сбрасывается из потоков пула, а читается из цикла событий
+        self.lock = threading.Lock()
+        self.metrics = {'hits': 0, 'misses': 0, 'invalidations': 0, 'evictions': 0}
+
+    def get(self, telegram_id):
+        """Возвращает (найдено, профиль)"""
+        key = str(telegram_id)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                self.metrics['misses'] += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.metrics['hits'] += 1
+            return True, entry[0]
+
+    def set(self, telegram_id, profile):
+        with self.lock:
+            self.entries[str(telegram_id)] = (profile, time.monotonic() + self.ttl)
+            self.entries.move_to_end(str(telegram_id))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.metrics['evictions'] += 1
+
+    def invalidate(self, telegram_id=None, profile_id=None):
+        """Сбрасывает запись по Telegram ID и все записи этого профиля (если сменился Telegram ID)"""
+        with self.lock:
+            keys = set()
+            if telegram_id is not None:
+                keys.add(str(telegram_id))
+            if profile_id is not None:
+                keys.update(
+                    key for key, (profile, expires_at) in self.entries.items()
+                    if profile is not None and profile.pk == profile_id
+                )
+            for key in keys:
+                if self.entries.pop(key, None) is not None:
+                    self.metrics['invalidations'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.metrics, size=len(self.entries))
+        requests = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / requests if requests else 0.0
+        return stats
+
+
+profile_cache = ProfileCache()
+
+
+# ===== ПРОФИЛИ =====
+# Все запросы ORM бота - только через функции ниже
+
+@db_task
+def load_profile(telegram_id):
+    """Профиль по Telegram ID вместе с пользователем - всегда из базы"""
+    from .models import UserProfile
+    return UserProfile.objects.select_related('user').filter(telegram_id=telegram_id).first()
+
+
+async def get_profile(telegram_id):
+    """Профиль по Telegram ID вместе с пользователем (None, если не привязан) - через кэш"""
+    found, profile = profile_cache.get(telegram_id)
+    if not found:
+        profile = await load_profile(telegram_id)
+        profile_cache.set(telegram_id, profile)
+    return profile
+
+
+@db_task
+def update_review_limit(telegram_id, new_limit):
+    """Меняет дневной лимит повторений. Возвращает False, если профиль не найден."""
+    from .models import UserProfile
+    from .cache_service import invalidate_user_cache
+
+    # update() не вызывает сигналов - сбрасываем кэши сами
+    profiles = UserProfile.objects.filter(telegram_id=telegram_id)
+    updated = profiles.update(daily_review_limit=new_limit)
+    profile_cache.invalidate(telegram_id)
+    for user_id in profiles.values_list('user_id', flat=True):
+        invalidate_user_cache(user_id)
+    return updated > 0
+
+
+@db_task
+def link_account(telegram_id, telegram_username):
+    """
+    Привязывает Telegram аккаунт к веб-пользователю.
+    Возвращает (created, profile).
+    """
+    from django.contrib.auth.models import User
+    from .models import UserProfile
+
+    # Кэш сбрасывается сигналом post_save профиля, а для непривязанного
+    # пользователя в кэше может лежать "профиля нет" - сбрасываем явно
+    profile_cache.invalidate(telegram_id)
+
+    try:
+        # Пытаемся найти существующий профиль по telegram_id
+        try:
+            profile = UserProfile.objects.get(telegram_id=telegram_id)
+            # Профиль уже существует - обновляем username
+            profile.telegram_username = telegram_username
+            profile.save()
+            return False, profile  # created = False
+        except UserProfile.DoesNotExist:
+            # Создаем новый профиль
+            # Берем первого пользователя или создаем нового
+            user = User.objects.first()
+            if not user:
+                user = User.objects.create_user('telegram_user', '', 'password')
+
+            profile = UserProfile.objects.create(
+                user=user,
+                telegram_id=telegram_id,
+                telegram_username=telegram_username
+            )
+            return True, profile  # created = True
+
+    except IntegrityError:
+        # Если возникла ошибка уникальности, находим и обновляем существующий профиль
+        profile = UserProfile.objects.get(user=User.objects.first())
+        profile.telegram_id = telegram_id
+        profile.telegram_username = telegram_username
+        profile.save()
+        return False, profile
+
+
+# ===== СЛОВАРЬ ПОЛЬЗОВАТЕЛЯ =====
+# Страницы словаря листаются по ключу (date_added, id) последнего показанного
+# слова, а не по OFFSET: любая страница стоит столько же, сколько первая.
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def deck_cursor(user_word):
+    """Ключ слова в словаре для callback data: (микросекунды date_added, id)"""
+    return (user_word.date_added - EPOCH) // datetime.timedelta(microseconds=1), user_word.id
+
+
+def cursor_filter(cursor, newer, inclusive=False):
+    """Условие "слово новее/старше ключа cursor" в порядке (date_added, id)"""
+    micros, pk = cursor
+    date_added = EPOCH + datetime.timedelta(microseconds=micros)
+    if newer:
+        return Q(date_added__gt=date_added) | Q(date_added=date_added, id__gt=pk)
+    if inclusive:
+        return Q(date_added__lt=date_added) | Q(date_added=date_added, id__lte=pk)
+    return Q(date_added__lt=date_added) | Q(date_added=date_added, id__lt=pk)
+
+
+@db_task
+def get_deck_page(user_id, cursor=None, direction='next', page_size=DECK_PAGE_SIZE):
+    """
+    Страница словаря пользователя, новые слова первыми.
+    direction: next - слова старше cursor, prev - новее cursor,
+    from - начиная с cursor включительно (обновить текущую страницу).
+    Возвращает (user_words, has_prev, has_next).
+    """
+    from .models import UserWord
+    from .db_router import read_database
+
+    deck = UserWord.objects.using(read_database(user_id)).filter(user_id=user_id)
+    page = deck.select_related('word')
+
+    if cursor is None:
+        user_words = list(page.order_by('-date_added', '-id')[:page_size])
+    elif direction == 'prev':
+        user_words = list(page.filter(cursor_filter(cursor, newer=True)).order_by('date_added', 'id')[:page_size])
+        user_words.reverse()
+    else:
+        user_words = list(
+            page.filter(cursor_filter(cursor, newer=False, inclusive=direction == 'from'))
+            .order_by('-date_added', '-id')[:page_size]
+        )
+
+    if not user_words:
+        return [], False, False
+
+    has_prev = deck.filter(cursor_filter(deck_cursor(user_words[0]), newer=True)).exists()
+    has_next = deck.filter(cursor_filter(deck_cursor(user_words[-1]), newer=False)).exists()
+    return user_words, has_prev, has_next
+
+
+@db_task
+def add_word_to_deck(user_id, original, translation):
+    """
+    Добавляет слово в словарь пользователя - как add_word на сайте, своей записью Word
+    с переводом пользователя. Возвращает (word, "success") или (None, "duplicate").
+    """
+    from .models import Word, UserWord
+
+    if UserWord.objects.filter(user_id=user_id, word__original__iexact=original).exists():
+        return None, "duplicate"
+
+    word = Word.objects.create(original=original, translation=translation)
+    UserWord.objects.create(user_id=user_id, word=word)
+    return word, "success"
+
+
+@db_task
+def remove_from_deck(user_id, user_word_id=None, original=None):
+    """
+    Убирает слово из словаря пользователя (по id записи или по написанию).
+    Общее слово остается для других пользователей. Возвращает написание или None.
+    """
+    from .models import UserWord
+
+    user_words = UserWord.objects.filter(user_id=user_id).select_related('word')
+    if user_word_id is not None:
+        user_word = user_words.filter(id=user_word_id).first()
+    else:
+        user_word = user_words.filter(word__original=original).first()
+
+    if user_word is None:
+        return None
+    user_word.delete()
+    return user_word.word.original
+
+
+@db_task
+def get_deck_stats(user_id, days=7):
+    """Статистика словаря пользователя и добавленные слова по дням - двумя запросами"""
+    from .models import UserWord
+    from .db_router import read_database
+
+    today = timezone.localdate()
+    deck = UserWord.objects.using(read_database(user_id)).filter(user_id=user_id)
+
+    stats = deck.aggregate(
+        total=Count('id'),
+        added_today=Count('id', filter=Q(date_added__date=today)),
+        # Те же границы, что в get_user_statistics
+        learning=Count('id', filter=Q(repetition__range=[1, 3])),
+        learned=Count('id', filter=Q(repetition__gte=4)),
+        due=Count('id', filter=Q(next_review__lte=timezone.now())),
+    )
+
+    since = today - datetime.timedelta(days=days - 1)
+    per_day = dict(
+        deck.filter(date_added__date__gte=since)
+        .annotate(day=TruncDate('date_added'))
+        .values('day')
+        .annotate(count=Count('id'))
+        .values_list('day', 'count')
+    )
+    stats['last_days'] = [
+        {'date': day, 'count': per_day.get(day, 0)}
+        for day in (today - datetime.timedelta(days=i) for i in range(days))
+    ]
+    return stats
+
+
+# ===== СЛОВА =====
+
+@db_task
+def get_word(word_id):
+    """Слово по id (None, если удалено)"""
+    from .models import Word
+    return Word.objects.filter(id=word_id).first()
+
+
+@db_task
+def find_word(user_id, text):
+    """Слово словаря пользователя по написанию или по переводу: точное совпадение, иначе самое похожее"""
+    from .search_service import search_words
+    words = search_words(text, limit=1, user_id=user_id)
+    return words[0] if words else None
+
+
+@db_task
+def delete_words(originals):
+    """Удаляет слова по списку написаний, возвращает количество удаленных"""
+    from .models import Word
+
+    words_to_delete = Word.objects.filter(original__in=originals)
+    count = words_to_delete.count()
+    words_to_delete.delete()
+    return count
+
+
+# ===== ТЕСТЫ, КАРТОЧКИ, НАПОМИНАНИЯ =====
+
+@db_task
+def get_quiz_question(user_id):
+    from .services import get_quiz_question
+    return get_quiz_question(user_id)
+
+
+@db_task
+def get_review_cards(user_id):
+    from .services import get_review_cards
+    return get_review_cards(user_id)
+
+
+@db_task
+def get_user_digest(user_id):
+    from .reminder_service import build_reminder_digests
+    return build_reminder_digests([user_id]).get(user_id)
+
+
+async def get_reminder_digest(telegram_id):
+    """Профиль и сводка слов к повторению (None вместо профиля, если не привязан)"""
+    profile = await get_profile(telegram_id)
+    if profile is None:
+        return None, None
+    return profile, await get_user_digest(profile.user_id)
+
+
+# ===== ОЗВУЧКА =====
+
+async def synthesize_speech(text, lang='en'):
+    """
+    Путь к mp3 с озвучкой текста (None при ошибке).
+    gTTS ходит в сеть, поэтому выполняется в отдельном потоке, но не в пуле базы,
+    чтобы медленная озвучка не задерживала запросы других пользователей.
+    """
+    from django.conf import settings
+    from .tts_service import atext_to_speech
+
+    tts_result = await atext_to_speech(text, lang=lang)
+    if not tts_result or 'url' not in tts_result:
+        return None
+
+    filename = tts_result['url'].replace('/media/audio/', '')
+    filepath = os.path.join(settings.MEDIA_ROOT, 'audio', filename)
+    return filepath if os.path.exists(filepath) else None
@@ -0,0 +1,237 @@
+# app_vocab/bot_metrics.py
+import asyncio
+import bisect
+import contextvars
+import json
+import logging
+import os
+import time
+import weakref
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+
+
+logger = logging.getLogger('app_vocab.bot_metrics')
+
+# Обновление дольше этого времени попадает в журнал как медленное, мс
+LATENCY_BUDGET_MS = int(os.getenv('BOT_LATENCY_BUDGET_MS', 500))
+# Как часто писать сводку метрик в журнал, сек (0 - не писать)
+METRICS_LOG_INTERVAL = int(os.getenv('BOT_METRICS_LOG_INTERVAL', 60))
+
+# Границы корзин гистограмм
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Метрики обрабатываемого обновления (у каждой задачи asyncio свое значение)
+current_update = contextvars.ContextVar('current_update', default=None)
+
+
+class UpdateMetrics:
+    """Что потрачено на одно обновление: база, запросы ORM, Bot API"""
+
+    def __init__(self, update_id):
+        self.update_id = update_id
+        self.handler = 'unhandled'
+        self.db_time = 0.0
+        self.db_calls = 0
+        self.queries = 0
+        self.api_time = 0.0
+        self.api_calls = 0
+
+    def record_db(self, elapsed, queries):
+        self.db_time += elapsed
+        self.db_calls += 1
+        self.queries += queries
+
+    def record_api(self, elapsed):
+        self.api_time += elapsed
+        self.api_calls += 1
+
+
+class Histogram:
+    """Гистограмма с метками в формате Prometheus (кумулятивные корзины)"""
+
+    def __init__(self, name, description, buckets, label):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.label = label
+        self.series = {}
+
+    def observe(self, label_value, value):
+        series = self.series.get(label_value)
+        if series is None:
+            series = self.series[label_value] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0}
+        series['counts'][bisect.bisect_left(self.buckets, value)] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+    def quantile(self, label_value, q):
+        """Оценка квантиля сверху - граница корзины, в которую он попадает"""
+        series = self.series[label_value]
+        rank = q * series['count']
+        cumulative = 0
+        for bound, count in zip(self.buckets, series['counts']):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float('inf')
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        for label_value, series in sorted(self.series.items()):
+            labels = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, series['counts']):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series["count"]}')
+            lines.append(f'{self.name}_sum{{{labels}}} {series["sum"]:.6f}')
+            lines.append(f'{self.name}_count{{{labels}}} {series["count"]}')
+        return lines
+
+
+class BotMetrics:
+    """Метрики обработчиков бота в памяти процесса"""
+
+    def __init__(self, budget_ms=LATENCY_BUDGET_MS):
+        self.budget = budget_ms / 1000
+        self.update_seconds = Histogram(
+            'bot_update_seconds', 'Время обработки обновления', SECONDS_BUCKETS, 'handler')
+        self.db_seconds = Histogram(
+            'bot_update_db_seconds', 'Время в пуле базы за обновление (ожидание и запросы)', SECONDS_BUCKETS, 'handler')
+        self.queries = Histogram(
+            'bot_update_queries', 'Запросов ORM за обновление', QUERY_BUCKETS, 'handler')
+        self.api_seconds = Histogram(
+            'bot_telegram_api_seconds', 'Время запроса к Bot API', SECONDS_BUCKETS, 'method')
+        self.slow_updates = {}
+
+    def record_update(self, update, elapsed):
+        self.update_seconds.observe(update.handler, elapsed)
+        self.db_seconds.observe(update.handler, update.db_time)
+        self.queries.observe(update.handler, update.queries)
+
+        if elapsed > self.budget:
+            self.slow_updates[update.handler] = self.slow_updates.get(update.handler, 0) + 1
+            logger.warning(
+                'Медленное обновление %s (%s): %.0f мс при бюджете %.0f мс; '
+                'база %.0f мс (%d обращений, %d запросов), Bot API %.0f мс (%d вызовов)',
+                update.update_id, update.handler, elapsed * 1000, self.budget * 1000,
+                update.db_time * 1000, update.db_calls, update.queries,
+                update.api_time * 1000, update.api_calls,
+            )
+
+    def render_prometheus(self):
+        """Все метрики в текстовом формате Prometheus"""
+        lines = []
+        for histogram in (self.update_seconds, self.db_seconds, self.queries, self.api_seconds):
+            lines += histogram.render()
+        lines += ['# HELP bot_slow_updates_total Обновлений дольше бюджета', '# TYPE bot_slow_updates_total counter']
+        lines += [f'bot_slow_updates_total{{handler="{handler}"}} {count}'
+                  for handler, count in sorted(self.slow_updates.items())]
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Сводка по обработчикам: количество, p50/p95, средние база/запросы, медленные"""
+        handlers = {}
+        for handler, series in self.update_seconds.series.items():
+            count = series['count']
+            handlers[handler] = {
+                'count': count,
+                'p50_ms': self.update_seconds.quantile(handler, 0.5) * 1000,
+                'p95_ms': self.update_seconds.quantile(handler, 0.95) * 1000,
+                'avg_ms': round(series['sum'] / count * 1000, 1),
+                'avg_db_ms': round(self.db_seconds.series[handler]['sum'] / count * 1000, 1),
+                'avg_queries': round(self.queries.series[handler]['sum'] / count, 1),
+                'slow': self.slow_updates.get(handler, 0),
+            }
+        return handlers
+
+
+metrics = BotMetrics()
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Внешний middleware диспетчера: замеряет обработку каждого обновления.
+    Время в пуле базы и запросы ORM добавляет bot_db, время Bot API - ApiMetricsMiddleware.
+    """
+
+    def __init__(self, registry=metrics):
+        self.registry = registry
+        self.api_middleware = ApiMetricsMiddleware(registry)
+        self.instrumented_sessions = weakref.WeakSet()
+
+    async def __call__(self, handler, event, data):
+        # Сессию бота подключаем при первом обновлении - так замеряются и тестовые боты
+        session = data['bot'].session
+        if session not in self.instrumented_sessions:
+            session.middleware(self.api_middleware)
+            self.instrumented_sessions.add(session)
+
+        update = UpdateMetrics(event.update_id)
+        token = current_update.set(update)
+        started = time.monotonic()
+        try:
+            return await handler(event, data)
+        finally:
+            current_update.reset(token)
+            self.registry.record_update(update, time.monotonic() - started)
+
+
+class HandlerNameMiddleware(BaseMiddleware):
+    """Внутренний middleware: запоминает, какой обработчик выбран для обновления"""
+
+    async def __call__(self, handler, event, data):
+        update = current_update.get()
+        if update is not None:
+            update.handler = data['handler'].callback.__name__
+        return await handler(event, data)
+
+
+class ApiMetricsMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: время каждого запроса к Bot API"""
+
+    def __init__(self, registry=metrics):
+        self.registry = registry
+
+    async def __call__(self, make_request, bot, method):
+        started = time.monotonic()
+        try:
+            return await make_request(bot, method)
+        finally:
+            elapsed = time.monotonic() - started
+            self.registry.api_seconds.observe(type(method).__name__, elapsed)
+            update = current_update.get()
+            if update is not None:
+                update.record_api(elapsed)
+
+
+async def log_metrics(registry=metrics, interval=METRICS_LOG_INTERVAL):
+    """Периодически пишет сводку метрик в журнал одной строкой JSON"""
+    while True:
+        await asyncio.sleep(interval)
+        summary = registry.summary()
+        if summary:
+            logger.info('Метрики бота (pid %s): %s', os.getpid(), json.dumps(summary, ensure_ascii=False))
+
+
+def setup_metrics(dispatcher, registry=metrics):
+    """Подключает замеры к диспетчеру и фоновую сводку в журнал на время его работы"""
+    dispatcher.update.outer_middleware(UpdateMetricsMiddleware(registry))
+    for observer in (dispatcher.message, dispatcher.callback_query):
+        observer.middleware(HandlerNameMiddleware())
+
+    tasks = []
+
+    async def start_logging():
+        if METRICS_LOG_INTERVAL:
+            tasks.append(asyncio.create_task(log_metrics(registry)))
+
+    async def stop_logging():
+        while tasks:
+            tasks.pop().cancel()
+
+    dispatcher.startup.register(start_logging)
+    dispatcher.shutdown.register(stop_logging)
@@ -0,0 +1,96 @@
+# app_vocab/cache_service.py
+import os
+import threading
+import uuid
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+# Сколько секунд живут данные пользователя в кэше, если он ничего не менял.
+# Ограничивает и устаревание того, что зависит от времени (слова на сегодня).
+USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 300))
+
+
+def version_key(user_id):
+    return f'user-version:{user_id}'
+
+
+def new_version():
+    """
+    Новая версия данных пользователя - случайная, а не следующее число:
+    incr файлового кэша - это чтение и запись, и два процесса могли бы
+    получить одну версию. Случайная версия не совпадает ни с одной прежней,
+    в том числе если старая версия вытеснена из кэша.
+    """
+    return uuid.uuid4().hex
+
+
+def user_cache_version(user_id):
+    """Текущая версия данных пользователя"""
+    key = version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_cache(user_id):
+    """Все закэшированные данные пользователя устаревают (новая версия ключей)"""
+    cache.set(version_key(user_id), new_version(), None)
+
+
+def invalidate_user_cache(user_id):
+    """
+    Сбрасывает кэш пользователя после фиксации транзакции - иначе параллельный
+    запрос успел бы закэшировать под новой версией еще старые данные.
+    """
+    if user_id is not None:
+        transaction.on_commit(lambda: bump_user_cache(user_id))
+
+
+class CacheMetrics:
+    """Попадания и промахи кэша по видам данных (в памяти процесса)"""
+
+    def __init__(self):
+        self.hits = Counter()
+        self.misses = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, name, hit):
+        with self.lock:
+            (self.hits if hit else self.misses)[name] += 1
+
+    def stats(self):
+        with self.lock:
+            names = self.hits.keys() | self.misses.keys()
+            stats = {}
+            for name in sorted(names):
+                requests = self.hits[name] + self.misses[name]
+                stats[name] = {
+                    'hits': self.hits[name],
+                    'misses': self.misses[name],
+                    'hit_rate': self.hits[name] / requests,
+                }
+        return stats
+
+
+cache_metrics = CacheMetrics()
+
+
+def cached_for_user(user_id, name, compute, *parts, timeout=USER_CACHE_TTL):
+    """
+    Значение compute() из кэша по ключу пользователя. Ключ включает версию
+    пользователя, поэтому любое изменение его словаря или профиля делает
+    старые записи недоступными - удалять их не нужно, они истекут сами.
+    """
+    key = ':'.join(str(part) for part in ('user', user_id, name, *parts))
+    version = user_cache_version(user_id)
+    value = cache.get(key, version=version)
+    cache_metrics.record(name, value is not None)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout, version=version)
+    return value
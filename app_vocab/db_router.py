@@ -0,0 +1,77 @@
+# app_vocab/db_router.py
+import contextlib
+import contextvars
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+
+# Имя базы-реплики в settings.DATABASES (задается DATABASE_REPLICA_URL)
+REPLICA_ALIAS = 'replica'
+# Сколько секунд после своей записи пользователь читает с основной базы.
+# Должно быть больше отставания реплики.
+REPLICA_PIN_SECONDS = int(os.getenv('DATABASE_REPLICA_PIN_SECONDS', 10))
+
+# База для чтения в текущем блоке replica_reads (None - решает Django)
+read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def pin_user(user_id):
+    """
+    Пользователь только что изменил свои данные - его чтения идут в основную базу.
+    Отметка хранится в кэше Django - он общий для сайта и бота
+    (с репликой locmem:// запрещен в settings.py).
+    """
+    if user_id is not None and replica_configured():
+        cache.set(pin_key(user_id), True, REPLICA_PIN_SECONDS)
+
+
+def read_database(user_id=None):
+    """База для чтения данных пользователя: реплика, если она есть и пользователь ничего не менял"""
+    if not replica_configured():
+        return DEFAULT_DB_ALIAS
+    if user_id is not None and cache.get(pin_key(user_id)):
+        return DEFAULT_DB_ALIAS
+    return REPLICA_ALIAS
+
+
+@contextlib.contextmanager
+def replica_reads(user_id=None):
+    """Запросы на чтение внутри блока идут на реплику (см. read_database)"""
+    token = read_alias.set(read_database(user_id))
+    try:
+        yield
+    finally:
+        read_alias.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Записи - всегда в основную базу. Чтения - в основную, кроме блоков replica_reads:
+    их используют только страницы и команды бота, которые ничего не пишут
+    (словарь, статистика, экспорт).
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика содержит те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Реплика получает схему вместе с данными из основной базы
+        return db != REPLICA_ALIAS
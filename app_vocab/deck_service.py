@@ -0,0 +1,127 @@
+# app_vocab/deck_service.py
+
+import base64
+import binascii
+import json
+import operator
+import os
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Q
+
+from .models import UserWord
+from .db_router import replica_reads
+from .search_service import words_containing
+
+
+# Слов на странице "Мой словарь" по умолчанию и допустимые варианты (?size=)
+MY_WORDS_PAGE_SIZE = int(os.getenv('MY_WORDS_PAGE_SIZE', 50))
+PAGE_SIZES = (20, 50, 100, 200)
+
+
+class DeckSort:
+    """
+    Порядок слов словаря с ключом (значение, id) для постраничного вывода.
+    Для каждого порядка есть составной индекс (см. UserWord.Meta).
+    """
+
+    def __init__(self, field, pk_field, model_field, descending=False):
+        self.field = field
+        self.pk_field = pk_field
+        self.model_field = model_field
+        self.descending = descending
+        self.get_value = operator.attrgetter(field.replace('__', '.'))
+        self.get_pk = operator.attrgetter(pk_field.replace('__', '.'))
+
+    def order_by(self, backwards=False):
+        sign = '-' if self.descending != backwards else ''
+        return [sign + self.field, sign + self.pk_field]
+
+    def after(self, cursor, backwards=False):
+        """Условие "слово идет после ключа cursor" (backwards - "до ключа")"""
+        value, pk = cursor
+        lookup = 'lt' if self.descending != backwards else 'gt'
+        return (Q(**{f'{self.field}__{lookup}': value})
+                | Q(**{self.field: value, f'{self.pk_field}__{lookup}': pk}))
+
+    def encode(self, user_word):
+        """Ключ слова для ссылки на соседнюю страницу"""
+        value = self.get_value(user_word)
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        data = json.dumps([value, self.get_pk(user_word)], ensure_ascii=False).encode()
+        return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+    def decode(self, token):
+        """Ключ из ссылки или None, если он испорчен"""
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            return self.model_field.to_python(value), int(pk)
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return None
+
+
+# Слово и перевод сортируем по их копии в UserWord: у каждого порядка есть индекс
+# (user, значение, id), и страница не сортирует весь словарь пользователя
+DECK_SORTS = {
+    'date_added': DeckSort('date_added', 'id', UserWord._meta.get_field('date_added'), descending=True),
+    'original': DeckSort('word_original', 'id', UserWord._meta.get_field('word_original')),
+    'translation': DeckSort('word_translation', 'id', UserWord._meta.get_field('word_translation')),
+    'level': DeckSort('repetition', 'id', UserWord._meta.get_field('repetition')),
+    'next_review': DeckSort('next_review', 'id', UserWord._meta.get_field('next_review')),
+}
+
+
+class DeckPage:
+    def __init__(self, user_words, next_token=None, prev_token=None):
+        self.user_words = user_words
+        self.next_token = next_token
+        self.prev_token = prev_token
+
+
+def get_my_words_page(user, sort='date_added', after=None, before=None, query='', page_size=MY_WORDS_PAGE_SIZE):
+    """
+    Страница словаря пользователя по ключу (значение сортировки, id):
+    after - слова после ключа из ссылки "дальше", before - до ключа из ссылки "назад".
+    Запрашивается на одно слово больше страницы - так видно, есть ли следующая.
+    query ищет по слову, переводу и транскрипции (см. search_service).
+    """
+    deck_sort = DECK_SORTS[sort]
+    token = before or after
+    cursor = deck_sort.decode(token) if token else None
+    # С испорченным ключом показываем первую страницу
+    backwards = bool(before) and cursor is not None
+
+    with replica_reads(user.id):
+        user_words = UserWord.objects.filter(user=user).select_related('word')
+        if query:
+            user_words = user_words.filter(words_containing(query, prefix='word__'))
+        if cursor is not None:
+            user_words = user_words.filter(deck_sort.after(cursor, backwards))
+        user_words = list(user_words.order_by(*deck_sort.order_by(backwards))[:page_size + 1])
+
+    has_more = len(user_words) > page_size
+    user_words = user_words[:page_size]
+    if backwards:
+        user_words.reverse()
+    if not user_words:
+        return DeckPage([])
+
+    has_next = has_more if not backwards else True
+    has_prev = has_more if backwards else cursor is not None
+    return DeckPage(
+        user_words,
+        next_token=deck_sort.encode(user_words[-1]) if has_next else None,
+        prev_token=deck_sort.encode(user_words[0]) if has_prev else None,
+    )
+
+
+def get_my_words_stats(user):
+    """Количество слов пользователя по этапам изучения - одним запросом"""
+    with replica_reads(user.id):
+        return UserWord.objects.filter(user=user).aggregate(
+            total=Count('id'),
+            new=Count('id', filter=Q(repetition=0)),
+            learning=Count('id', filter=Q(repetition__range=[1, 3])),
+            learned=Count('id', filter=Q(repetition__gte=4)),
+        )
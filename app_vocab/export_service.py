@@ -0,0 +1,82 @@
+# app_vocab/export_service.py
+
+import csv
+import json
+
+from .models import UserWord
+from .db_router import read_database
+
+
+# Сколько строк забираем из базы за один раз при потоковом экспорте
+EXPORT_CHUNK_SIZE = 2000
+
+CSV_HEADER = ['Слово', 'Транскрипция', 'Перевод', 'Уровень сложности', 'Дата добавления']
+
+
+class Echo:
+    """Псевдо-буфер для csv.writer: возвращает строку вместо записи в память"""
+
+    def write(self, value):
+        return value
+
+
+def iter_user_words(user, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Итерирует слова пользователя вместе с прогрессом.
+    .iterator() не кэширует QuerySet, поэтому в памяти держится только одна пачка.
+    Читаем с реплики, если она есть: экспорт ничего не пишет.
+    """
+    return (
+        UserWord.objects
+        .using(read_database(user.id))
+        .filter(user=user)
+        .select_related('word')
+        .order_by('id')
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def stream_csv(user):
+    """Генерирует CSV файл словаря построчно"""
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+
+    for user_word in iter_user_words(user):
+        word = user_word.word
+        yield writer.writerow([
+            word.original,
+            word.transcription or '',
+            word.translation,
+            word.get_difficulty_level_display(),
+            word.date_added.strftime('%Y-%m-%d') if word.date_added else ''
+        ])
+
+
+def user_word_to_dict(user_word):
+    """Слово и состояние SM-2 в виде словаря для JSONL"""
+    word = user_word.word
+    return {
+        'original': word.original,
+        'transcription': word.transcription,
+        'translation': word.translation,
+        'example_sentence': word.example_sentence,
+        'difficulty_level': word.difficulty_level,
+        'date_added': word.date_added.isoformat() if word.date_added else None,
+        # Прогресс SM-2
+        'interval': user_word.interval,
+        'repetition': user_word.repetition,
+        'ease_factor': user_word.ease_factor,
+        'next_review': user_word.next_review.isoformat() if user_word.next_review else None,
+        'last_reviewed': user_word.last_reviewed.isoformat() if user_word.last_reviewed else None,
+        'correct_answers': user_word.correct_answers,
+        'wrong_answers': user_word.wrong_answers,
+    }
+
+
+def stream_jsonl(user):
+    """
+    Генерирует JSONL файл словаря: одна строка - одно слово с прогрессом SM-2.
+    Такой файл можно импортировать без потери расписания повторений.
+    """
+    for user_word in iter_user_words(user):
+        yield json.dumps(user_word_to_dict(user_word), ensure_ascii=False) + '\n'
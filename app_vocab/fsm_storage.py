@@ -0,0 +1,184 @@
+# app_vocab/fsm_storage.py
+import datetime
+import json
+import os
+import time
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder
+from aiogram.fsm.storage.memory import MemoryStorage
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .models import BotSession
+from .bot_db import db_task
+
+
+# Хранилище состояний: db (по умолчанию), redis, fakeredis (для тестов) или memory
+FSM_STORAGE = os.getenv('BOT_FSM_STORAGE', 'db')
+# Сессия без активности дольше этого времени завершается, сек
+FSM_SESSION_TTL = int(os.getenv('BOT_FSM_TTL', 24 * 60 * 60))
+# Как часто удаляем просроченные сессии из базы, сек
+FSM_CLEANUP_INTERVAL = 600
+# Предельный размер данных одной сессии (JSON), байт
+FSM_MAX_DATA_SIZE = 4096
+
+
+def state_name(state):
+    """Название состояния для хранения (State или строка)"""
+    return state.state if isinstance(state, State) else state
+
+
+def dump_data(data):
+    """Сериализует данные сессии и проверяет их размер"""
+    payload = json.dumps(dict(data), ensure_ascii=False, separators=(',', ':'))
+    if len(payload.encode('utf-8')) > FSM_MAX_DATA_SIZE:
+        raise ValueError(
+            f'Данные FSM больше {FSM_MAX_DATA_SIZE} байт - храните id записей, а не сами записи'
+        )
+    return payload
+
+
+class DatabaseStorage(BaseStorage):
+    """
+    Хранилище FSM в таблице BotSession (по умолчанию SQLite).
+    Пустые сессии удаляются сразу, просроченные - периодически.
+    """
+
+    def __init__(self, ttl=FSM_SESSION_TTL, key_builder=None):
+        self.ttl = ttl
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self.last_cleanup = 0.0
+
+    def expired_before(self):
+        return timezone.now() - datetime.timedelta(seconds=self.ttl)
+
+    @db_task
+    def load(self, key):
+        return BotSession.objects.filter(
+            key=self.key_builder.build(key),
+            updated_at__gt=self.expired_before(),
+        ).first()
+
+    @db_task
+    def save(self, key, **fields):
+        storage_key = self.key_builder.build(key)
+        session = BotSession.objects.filter(key=storage_key, updated_at__gt=self.expired_before()).first()
+        state = fields.get('state', session.state if session else None)
+        data = fields.get('data', session.data if session else '{}')
+
+        if state is None and data == '{}':
+            BotSession.objects.filter(key=storage_key).delete()
+        else:
+            BotSession.objects.update_or_create(key=storage_key, defaults={'state': state, 'data': data})
+
+        self.cleanup()
+
+    def cleanup(self):
+        """Удаляет просроченные сессии (не чаще раза в FSM_CLEANUP_INTERVAL)"""
+        now = time.monotonic()
+        if now - self.last_cleanup < FSM_CLEANUP_INTERVAL:
+            return
+        self.last_cleanup = now
+        BotSession.objects.filter(updated_at__lte=self.expired_before()).delete()
+
+    async def set_state(self, key, state=None):
+        await self.save(key, state=state_name(state))
+
+    async def get_state(self, key):
+        session = await self.load(key)
+        return session.state if session else None
+
+    async def set_data(self, key, data):
+        await self.save(key, data=dump_data(data))
+
+    async def get_data(self, key):
+        session = await self.load(key)
+        return json.loads(session.data) if session else {}
+
+    async def close(self):
+        pass
+
+
+class KeyValueStorage(BaseStorage):
+    """
+    Хранилище FSM в Redis-совместимом клиенте (нужны async get, set с ex, delete).
+    Состояние и данные лежат одной записью, срок жизни продлевается при каждой записи.
+    """
+
+    def __init__(self, client, ttl=FSM_SESSION_TTL, key_builder=None):
+        self.client = client
+        self.ttl = ttl
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+
+    async def load(self, key):
+        value = await self.client.get(self.key_builder.build(key))
+        if value is None:
+            return {'state': None, 'data': '{}'}
+        return json.loads(value)
+
+    async def save(self, key, session):
+        storage_key = self.key_builder.build(key)
+        if session['state'] is None and session['data'] == '{}':
+            await self.client.delete(storage_key)
+        else:
+            await self.client.set(storage_key, json.dumps(session, ensure_ascii=False), ex=self.ttl)
+
+    async def set_state(self, key, state=None):
+        session = await self.load(key)
+        session['state'] = state_name(state)
+        await self.save(key, session)
+
+    async def get_state(self, key):
+        return (await self.load(key))['state']
+
+    async def set_data(self, key, data):
+        session = await self.load(key)
+        session['data'] = dump_data(data)
+        await self.save(key, session)
+
+    async def get_data(self, key):
+        return json.loads((await self.load(key))['data'])
+
+    async def close(self):
+        await self.client.aclose()
+
+
+class FakeRedis:
+    """Redis в памяти процесса с поддержкой срока жизни ключей - для тестов и бенчмарков"""
+
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        value, expires_at = self.values.get(key, (None, None))
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = (value, time.monotonic() + ex if ex else None)
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+    async def aclose(self):
+        pass
+
+
+def create_fsm_storage(backend=FSM_STORAGE):
+    """Хранилище FSM по настройке BOT_FSM_STORAGE"""
+    if backend == 'db':
+        return DatabaseStorage()
+    if backend == 'memory':
+        return MemoryStorage()
+    if backend == 'redis':
+        try:
+            from redis.asyncio import Redis
+        except ImportError:
+            raise ImproperlyConfigured('Для BOT_FSM_STORAGE=redis установите пакет redis')
+        return KeyValueStorage(Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0')))
+    if backend == 'fakeredis':
+        return KeyValueStorage(FakeRedis())
+    raise ImproperlyConfigured(f'Неизвестное хранилище FSM: {backend}')
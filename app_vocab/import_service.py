@@ -0,0 +1,325 @@
+# app_vocab/import_service.py
+
+import codecs
+import csv
+import datetime
+import itertools
+import json
+import os
+import sqlite3
+import uuid
+import zipfile
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Word, UserWord, ImportJob, DeckChange
+from .anki_service import iter_apkg_rows
+
+
+# Сколько строк файла обрабатываем за одну транзакцию
+IMPORT_CHUNK_SIZE = 1000
+
+# Поддерживаемые форматы импорта
+IMPORT_EXTENSIONS = ('.csv', '.jsonl', '.apkg')
+
+
+def iter_csv_rows(csv_file, encoding='utf-8-sig'):
+    """
+    Потоково читает загруженный CSV файл построчно.
+    Файл не читается в память целиком: строки декодируются по мере чтения.
+    Для каждой строки возвращает поля слова или None, если строка ошибочная.
+    """
+    lines = codecs.iterdecode(csv_file, encoding)
+    return map(parse_csv_row, csv.DictReader(lines))
+
+
+def iter_jsonl_rows(jsonl_file, encoding='utf-8-sig'):
+    """
+    Потоково читает файл JSONL (формат экспорта с прогрессом SM-2).
+    Для каждой строки возвращает поля слова или None, если строка ошибочная.
+    """
+    lines = codecs.iterdecode(jsonl_file, encoding)
+    return (parse_jsonl_row(line) for line in lines if line.strip())
+
+
+def iter_import_rows(import_file, file_name):
+    """Выбирает формат чтения по расширению файла"""
+    file_name = file_name.lower()
+    if file_name.endswith('.jsonl'):
+        return iter_jsonl_rows(import_file)
+    if file_name.endswith('.apkg'):
+        return iter_apkg_rows(import_file)
+    return iter_csv_rows(import_file)
+
+
+def parse_csv_row(row):
+    """
+    Извлекает поля слова из строки CSV.
+    Возвращает None, если обязательные поля не заполнены.
+    """
+    original = (row.get('Слово') or '').strip()
+    translation = (row.get('Перевод') or '').strip()
+
+    if not original or not translation:
+        return None
+
+    return {
+        'original': original,
+        'translation': translation,
+        'transcription': (row.get('Транскрипция') or '').strip(),
+    }
+
+
+def parse_jsonl_row(line):
+    """
+    Извлекает поля слова и прогресс SM-2 из строки JSONL.
+    Возвращает None, если строка не разбирается или не заполнены обязательные поля.
+    """
+    try:
+        row = json.loads(line)
+        original = (row.get('original') or '').strip()
+        translation = (row.get('translation') or '').strip()
+        if not original or not translation:
+            return None
+
+        data = {
+            'original': original,
+            'translation': translation,
+            'transcription': (row.get('transcription') or '').strip(),
+            'example_sentence': row.get('example_sentence') or '',
+            'difficulty_level': int(row.get('difficulty_level') or 0),
+            'progress': {},
+        }
+
+        # Состояние SM-2 переносим как есть
+        for field in ('interval', 'repetition', 'correct_answers', 'wrong_answers'):
+            if row.get(field) is not None:
+                data['progress'][field] = int(row[field])
+        if row.get('ease_factor') is not None:
+            data['progress']['ease_factor'] = float(row['ease_factor'])
+        for field in ('next_review', 'last_reviewed'):
+            if row.get(field):
+                value = parse_datetime(row[field])
+                if value is None:
+                    # Дата не разбирается - строка ошибочная, как и неполная строка CSV
+                    return None
+                data['progress'][field] = value
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+    return data
+
+
+def import_chunk(user, rows):
+    """
+    Импортирует одну пачку строк в словарь пользователя.
+    rows - результат iter_csv_rows/iter_jsonl_rows (None - ошибочная строка).
+
+    Дубликаты внутри пачки отсекаются через множество, дубликаты со словарем
+    пользователя - одним запросом на всю пачку. Вставка идет через bulk_create
+    в одной транзакции.
+    """
+    stats = {'imported': 0, 'duplicates': 0, 'skipped': 0}
+
+    parsed = []
+    seen = set()
+    for data in rows:
+        if data is None:
+            stats['skipped'] += 1
+            continue
+        if data['original'] in seen:
+            stats['duplicates'] += 1
+            continue
+        seen.add(data['original'])
+        parsed.append(data)
+
+    if not parsed:
+        return stats
+
+    with transaction.atomic():
+        # Один запрос на проверку всех слов пачки
+        existing = set(
+            Word.objects.filter(
+                userword__user=user,
+                original__in=seen,
+            ).values_list('original', flat=True)
+        )
+
+        parsed = [data for data in parsed if data['original'] not in existing]
+        words = [
+            Word(
+                original=data['original'],
+                translation=data['translation'],
+                transcription=data['transcription'],
+                example_sentence=data.get('example_sentence', ''),
+                difficulty_level=data.get('difficulty_level', 0),
+            )
+            for data in parsed
+        ]
+        stats['duplicates'] += len(seen) - len(words)
+
+        from .sync_service import record_changes
+
+        create_words(words)
+        UserWord.objects.bulk_create([
+            UserWord(user=user, word=word, **data.get('progress', {}))
+            for word, data in zip(words, parsed)
+        ])
+        record_changes(user.id, seen - existing, DeckChange.ACTION_UPSERT)
+        stats['imported'] = len(words)
+
+    return stats
+
+
+def create_words(words):
+    """
+    Массово сохраняет слова и возвращает их с заполненными id.
+    """
+    if connection.features.can_return_rows_from_bulk_insert:
+        return Word.objects.bulk_create(words)
+
+    # Бэкенд не возвращает id после массовой вставки
+    for word in words:
+        word.save()
+    return words
+
+
+def import_words(user, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Импортирует строки CSV в словарь пользователя пачками по chunk_size.
+    Возвращает статистику: imported, duplicates, skipped.
+    """
+    totals = {'imported': 0, 'duplicates': 0, 'skipped': 0}
+
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            for key, value in import_chunk(user, chunk).items():
+                totals[key] += value
+            chunk = []
+
+    if chunk:
+        for key, value in import_chunk(user, chunk).items():
+            totals[key] += value
+
+    return totals
+
+
+# ===== ФОНОВЫЕ ЗАДАЧИ ИМПОРТА =====
+
+# Задача в статусе "Выполняется" без обновлений дольше этого времени
+# считается брошенной (обработчик упал) и возвращается в очередь
+IMPORT_STALE_AFTER = datetime.timedelta(minutes=5)
+
+
+def create_import_job(user, csv_file):
+    """
+    Сохраняет загруженный файл на диск и ставит задачу импорта в очередь.
+    """
+    os.makedirs(settings.IMPORT_SPOOL_DIR, exist_ok=True)
+    extension = os.path.splitext(csv_file.name or '')[1].lower()
+    if extension not in IMPORT_EXTENSIONS:
+        extension = '.csv'
+    file_path = os.path.join(settings.IMPORT_SPOOL_DIR, f"{uuid.uuid4()}{extension}")
+
+    # Копируем файл кусками
+    with open(file_path, 'wb') as destination:
+        for chunk in csv_file.chunks():
+            destination.write(chunk)
+
+    return ImportJob.objects.create(
+        user=user,
+        file_path=file_path,
+        original_name=csv_file.name or '',
+        total_rows=count_import_rows(file_path),
+    )
+
+
+def count_import_rows(file_path):
+    """
+    Число строк данных для прогресса - тем же разбором, что и при импорте
+    (без заголовка CSV, с переносами внутри кавычек, без пустых строк JSONL).
+    Если файл не разбирается, возвращает 0 - ошибку покажет сама задача.
+    """
+    try:
+        with open(file_path, 'rb') as import_file:
+            return sum(1 for _ in iter_import_rows(import_file, file_path))
+    except (ValueError, csv.Error, zipfile.BadZipFile, sqlite3.Error):
+        return 0
+
+
+def requeue_stale_jobs(stale_after=IMPORT_STALE_AFTER):
+    """
+    Возвращает в очередь задачи, обработчик которых перестал обновлять прогресс.
+    Импорт продолжится с последней сохраненной пачки.
+    """
+    return ImportJob.objects.filter(
+        status=ImportJob.STATUS_RUNNING,
+        updated_at__lt=timezone.now() - stale_after,
+    ).update(status=ImportJob.STATUS_PENDING)
+
+
+def claim_next_job():
+    """
+    Захватывает следующую задачу из очереди.
+    Захват - условный UPDATE, поэтому несколько обработчиков не возьмут одну задачу.
+    """
+    pending = ImportJob.objects.filter(status=ImportJob.STATUS_PENDING).order_by('created_at')
+    for job_id in pending.values_list('id', flat=True)[:10]:
+        claimed = ImportJob.objects.filter(
+            id=job_id,
+            status=ImportJob.STATUS_PENDING,
+        ).update(status=ImportJob.STATUS_RUNNING, updated_at=timezone.now())
+        if claimed:
+            return ImportJob.objects.select_related('user').get(id=job_id)
+    return None
+
+
+def run_import_job(job, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Выполняет задачу импорта.
+
+    Прогресс сохраняется в одной транзакции с каждой пачкой, поэтому после
+    падения обработчика задача продолжается с первой незакоммиченной строки.
+    """
+    try:
+        with open(job.file_path, 'rb') as csv_file:
+            rows = iter_import_rows(csv_file, job.file_path)
+            # Пропускаем строки, импортированные до перезапуска
+            rows = itertools.islice(rows, job.rows_processed, None)
+
+            while True:
+                chunk = list(itertools.islice(rows, chunk_size))
+                if not chunk:
+                    break
+
+                with transaction.atomic():
+                    stats = import_chunk(job.user, chunk)
+                    job.rows_processed += len(chunk)
+                    job.imported_count += stats['imported']
+                    job.duplicate_count += stats['duplicates']
+                    job.error_count += stats['skipped']
+                    job.save(update_fields=[
+                        'rows_processed', 'imported_count', 'duplicate_count',
+                        'error_count', 'updated_at',
+                    ])
+    except Exception as e:
+        job.status = ImportJob.STATUS_FAILED
+        job.error_message = str(e)
+        job.save(update_fields=['status', 'error_message', 'updated_at'])
+    else:
+        job.status = ImportJob.STATUS_DONE
+        job.save(update_fields=['status', 'updated_at'])
+    finally:
+        # Файл нужен только незавершенной задаче (продолжение после падения обработчика)
+        if job.status in (ImportJob.STATUS_DONE, ImportJob.STATUS_FAILED):
+            try:
+                os.remove(job.file_path)
+            except OSError:
+                pass
+
+    return job
@@ -0,0 +1,32 @@
+# app_vocab/management/commands/apply_delta.py
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from app_vocab.sync_service import apply_delta
+
+
+class Command(BaseCommand):
+    """
+    Применяет файл изменений (export_delta) к словарю пользователя.
+    Повторное применение того же файла безопасно.
+    """
+    help = 'Применение изменений словаря (JSONL) из другой установки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Имя пользователя')
+        parser.add_argument('delta_file', help='Файл, выгруженный export_delta')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Пользователь {options['username']} не найден")
+
+        with open(options['delta_file'], encoding='utf-8-sig') as delta_file:
+            result = apply_delta(user, delta_file)
+
+        self.stdout.write(
+            f"✅ Обновлено/добавлено: {result['upserted']}, удалено: {result['deleted']}, "
+            f"пропущено строк: {result['skipped']}"
+        )
@@ -0,0 +1,92 @@
+# app_vocab/management/commands/bench_apkg.py
+
+import datetime
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app_vocab.anki_service import APKG_CHUNK_SIZE, export_user_apkg, iter_apkg_rows, write_apkg
+from app_vocab.import_service import import_words
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк конвертера Anki: генерирует колоду, импортирует ее во временного
+    пользователя и экспортирует обратно (в транзакции, которая затем откатывается). Выводит скорость, а с --memory -
+    пик памяти Python (tracemalloc заметно замедляет работу).
+    """
+    help = 'Замеряет скорость и память импорта/экспорта .apkg'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--notes', type=int, default=100000, help='Количество заметок в колоде')
+        parser.add_argument('--chunk-size', type=int, default=APKG_CHUNK_SIZE, help='Размер пачки')
+        parser.add_argument('--memory', action='store_true', help='Замерять пик памяти через tracemalloc')
+
+    def handle(self, *args, **options):
+        notes = options['notes']
+        now = timezone.now()
+
+        def generate():
+            for i in range(notes):
+                yield {
+                    'original': f'word{i}',
+                    'translation': f'слово{i}',
+                    'transcription': '',
+                    'repetition': i % 5,
+                    'interval': (i % 5) * 3,
+                    'ease_factor': 2.5,
+                    'next_review': now + datetime.timedelta(days=i % 30),
+                    'correct_answers': i % 5,
+                    'wrong_answers': 0,
+                }
+
+        fd, source_path = tempfile.mkstemp(suffix='.apkg')
+        os.close(fd)
+        fd, export_path = tempfile.mkstemp(suffix='.apkg')
+        os.close(fd)
+        try:
+            # Все изменения базы откатываются в конце замера
+            with transaction.atomic():
+                user = User.objects.create_user(f'bench_{uuid.uuid4().hex[:8]}')
+                write_apkg(generate(), source_path)
+                self.stdout.write(f"Колода: {notes} заметок, {os.path.getsize(source_path) / 1e6:.1f} МБ")
+
+                if options['memory']:
+                    tracemalloc.start()
+                started = time.perf_counter()
+                with open(source_path, 'rb') as apkg_file:
+                    result = import_words(user, iter_apkg_rows(apkg_file), chunk_size=options['chunk_size'])
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"Импорт: {result['imported']} слов за {elapsed:.2f} с ({notes / elapsed:.0f} заметок/сек)"
+                    + self.memory_peak()
+                )
+
+                started = time.perf_counter()
+                count = export_user_apkg(user, export_path)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"Экспорт: {count} заметок за {elapsed:.2f} с ({count / elapsed:.0f} заметок/сек)"
+                    + self.memory_peak()
+                )
+
+                transaction.set_rollback(True)
+        finally:
+            tracemalloc.stop()
+            os.remove(source_path)
+            os.remove(export_path)
+
+    def memory_peak(self):
+        """Пик памяти с прошлого замера (если включен tracemalloc)"""
+        if not tracemalloc.is_tracing():
+            return ''
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        return f", пик памяти {peak / 1e6:.1f} МБ"
@@ -0,0 +1,198 @@
+# app_vocab/management/commands/bench_http.py
+
+import asyncio
+import collections
+import importlib.util
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from aiohttp import ClientSession, TCPConnector
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.crypto import get_random_string
+
+from app_vocab.models import DeckChange, UserWord, Word
+
+
+BENCH_USERNAME = 'bench_http'
+
+# Как запускается сайт: ASGI (async-представления в цикле событий) и прежний
+# синхронный WSGI-вариант с потоками
+SERVERS = {
+    'asgi': lambda port, workers, threads: [
+        sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+        '--log-level', 'warning', '--no-access-log',
+    ],
+    'wsgi': lambda port, workers, threads: [
+        sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads),
+        '--log-level', 'warning',
+    ],
+}
+# Серверы нужны только бенчмарку и в requirements.txt не входят
+SERVER_PACKAGES = {'asgi': 'uvicorn', 'wsgi': 'gunicorn'}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест async-представлений: запускает сайт под uvicorn (ASGI)
+    и под gunicorn с потоками (WSGI), отправляет одинаковый поток запросов
+    к API и AJAX-адресам и сравнивает запросы в секунду и задержки.
+    Пользователь и слова бенчмарка удаляются в конце.
+    """
+    help = 'Сравнивает пропускную способность сайта под ASGI (uvicorn) и WSGI (gunicorn)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--servers', nargs='+', choices=sorted(SERVERS), default=['asgi', 'wsgi'],
+                            help='Какие варианты запуска замерять')
+        parser.add_argument('--base-url', help='Замерять уже запущенный сервер (например http://127.0.0.1:8000)')
+        parser.add_argument('--requests', type=int, default=2000, help='Количество запросов')
+        parser.add_argument('--concurrency', type=int, default=50, help='Одновременных запросов')
+        parser.add_argument('--workers', type=int, default=2, help='Процессов сервера')
+        parser.add_argument('--threads', type=int, default=8, help='Потоков в процессе gunicorn')
+        parser.add_argument('--words', type=int, default=200, help='Слов в словаре пользователя бенчмарка')
+        parser.add_argument('--tts', action='store_true', help='Замерять и /generate-audio/ (ходит в сеть)')
+
+    def handle(self, *args, **options):
+        self.last_word_id = Word.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        user = self.create_user(options['words'])
+        try:
+            cookies, csrf_token = self.login(user)
+            requests = self.make_requests(user, options['tts'])
+
+            if options['base_url']:
+                targets = [('server', options['base_url'].rstrip('/'), None)]
+            else:
+                targets = [(name, None, name) for name in options['servers']]
+
+            for name, base_url, server in targets:
+                process = None
+                if server:
+                    port = free_port()
+                    process = self.start_server(server, port, options)
+                    base_url = f'http://127.0.0.1:{port}'
+                try:
+                    result = asyncio.run(self.run_bench(base_url, requests, cookies, csrf_token, options))
+                finally:
+                    if process:
+                        process.terminate()
+                        process.wait(timeout=30)
+                self.report(name, result, options)
+        finally:
+            UserWord.objects.filter(user=user).delete()
+            DeckChange.objects.filter(user=user).delete()
+            user.delete()
+            Word.objects.filter(id__gt=self.last_word_id).delete()
+
+    def create_user(self, words):
+        User.objects.filter(username=BENCH_USERNAME).delete()
+        user = User.objects.create_user(BENCH_USERNAME, '', get_random_string(20))
+        created = Word.objects.bulk_create([
+            Word(original=f'bench{i}', translation=f'замер{i}') for i in range(words)
+        ])
+        UserWord.objects.bulk_create([UserWord(user=user, word=word) for word in created])
+        return user
+
+    def login(self, user):
+        """Сессия пользователя в базе (ее видят все процессы сервера) и CSRF-токен"""
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        csrf_token = get_random_string(32)
+        return {settings.SESSION_COOKIE_NAME: session.session_key, settings.CSRF_COOKIE_NAME: csrf_token}, csrf_token
+
+    def make_requests(self, user, tts):
+        """Запросы по кругу: (название, метод, путь, JSON, данные формы)"""
+        user_words = list(UserWord.objects.filter(user=user).values_list('id', 'word_id'))
+        requests = []
+        for i, (user_word_id, word_id) in enumerate(user_words):
+            wrong_id = user_words[(i + 1) % len(user_words)][1]
+            requests += [
+                ('api cards', 'GET', '/api/v1/cards/', None, None),
+                ('api quiz answer', 'POST', '/api/v1/quiz/answer/', {'card': user_word_id, 'option': wrong_id}, None),
+                ('check-answer', 'POST', '/test/check-answer/', None,
+                 {'user_answer': str(wrong_id), 'correct_answer': str(word_id)}),
+                ('review-now', 'GET', f'/my-words/review-now/{user_word_id}/', None, None),
+            ]
+            if tts:
+                requests.append(('generate-audio', 'GET', f'/generate-audio/{word_id}/', None, None))
+        return requests
+
+    def start_server(self, server, port, options):
+        package = SERVER_PACKAGES[server]
+        if importlib.util.find_spec(package) is None:
+            raise CommandError(f'Для варианта {server} нужен {package}: pip install uvicorn gunicorn')
+
+        command = SERVERS[server](port, options['workers'], options['threads'])
+        process = subprocess.Popen(command, cwd=settings.BASE_DIR)
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError(f'Сервер {server} не запустился: {" ".join(command)}')
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                return process
+            except OSError:
+                time.sleep(0.2)
+        process.terminate()
+        raise CommandError(f'Сервер {server} не ответил за 60 с')
+
+    async def run_bench(self, base_url, requests, cookies, csrf_token, options):
+        statuses = collections.Counter()
+        latencies = collections.defaultdict(list)
+        headers = {'X-CSRFToken': csrf_token, 'Referer': base_url + '/'}
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async with ClientSession(cookies=cookies, headers=headers,
+                                 connector=TCPConnector(limit=options['concurrency'])) as client:
+            async def send(number):
+                name, method, path, json, data = requests[number % len(requests)]
+                async with semaphore:
+                    started = time.monotonic()
+                    async with client.request(method, base_url + path, json=json, data=data,
+                                              allow_redirects=False) as response:
+                        await response.read()
+                        statuses[response.status] += 1
+                    latencies[name].append(time.monotonic() - started)
+
+            # Прогрев: импорты и соединения с базой в процессах сервера
+            await asyncio.gather(*(send(number) for number in range(min(len(requests), options['concurrency']))))
+            statuses.clear()
+            latencies.clear()
+
+            started = time.monotonic()
+            await asyncio.gather(*(send(number) for number in range(options['requests'])))
+            duration = time.monotonic() - started
+
+        return {'duration': duration, 'latencies': latencies, 'statuses': statuses}
+
+    def report(self, name, result, options):
+        all_latencies = [latency for values in result['latencies'].values() for latency in values]
+        quantiles = statistics.quantiles(all_latencies, n=100) if len(all_latencies) > 1 else all_latencies * 100
+        self.stdout.write(
+            f"{name}: {options['requests']} запросов за {result['duration']:.2f} с "
+            f"({options['requests'] / result['duration']:.0f} запр./с), "
+            f"p50 {quantiles[49] * 1000:.1f} мс, p99 {quantiles[98] * 1000:.1f} мс, "
+            f"ответы {dict(result['statuses'])}"
+        )
+        for endpoint, values in sorted(result['latencies'].items()):
+            endpoint_quantiles = statistics.quantiles(values, n=100) if len(values) > 1 else values * 100
+            self.stdout.write(
+                f"  {endpoint}: p50 {endpoint_quantiles[49] * 1000:.1f} мс, "
+                f"p99 {endpoint_quantiles[98] * 1000:.1f} мс"
+            )
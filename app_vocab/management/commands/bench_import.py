@@ -0,0 +1,53 @@
+# app_vocab/management/commands/bench_import.py
+
+import csv
+import io
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from app_vocab.import_service import IMPORT_CHUNK_SIZE, iter_csv_rows, import_words
+
+
+class Command(BaseCommand):
+    """
+    Бенчмарк потокового импорта CSV: генерирует файл, импортирует его
+    во временного пользователя (в транзакции, которая затем откатывается)
+    и выводит скорость в строках/сек.
+    """
+    help = 'Замеряет скорость импорта слов из CSV (строк/сек)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000, help='Количество строк в файле')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Размер пачки')
+        parser.add_argument('--duplicates', type=float, default=0.1, help='Доля дубликатов в файле')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        duplicates = int(rows * options['duplicates'])
+
+        # Генерируем CSV в формате экспорта
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['Слово', 'Транскрипция', 'Перевод', 'Уровень сложности', 'Дата добавления'])
+        for i in range(rows):
+            n = i % (rows - duplicates) if duplicates else i
+            writer.writerow([f'word{n}', '', f'слово{n}', 'Средний', ''])
+        data = io.BytesIO(buffer.getvalue().encode('utf-8'))
+
+        # Все изменения базы откатываются в конце замера
+        with transaction.atomic():
+            user = User.objects.create_user(f'bench_{uuid.uuid4().hex[:8]}')
+            started = time.perf_counter()
+            result = import_words(user, iter_csv_rows(data), chunk_size=options['chunk_size'])
+            elapsed = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        self.stdout.write(
+            f"Строк: {rows}, импортировано: {result['imported']}, "
+            f"дубликатов: {result['duplicates']}, пропущено: {result['skipped']}"
+        )
+        self.stdout.write(f"Время: {elapsed:.2f} с, скорость: {rows / elapsed:.0f} строк/сек")
@@ -0,0 +1,83 @@
+# app_vocab/management/commands/bench_reminders.py
+
+import asyncio
+import collections
+import random
+import time
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+from django.core.management.base import BaseCommand
+
+from app_vocab.reminder_service import (
+    BROADCAST_CONCURRENCY,
+    BROADCAST_RATE_LIMIT,
+    ReminderBroadcaster,
+)
+
+
+# Глобальный лимит Telegram, который имитирует FakeBot, - около 30 сообщений в секунду
+TELEGRAM_RATE_LIMIT = 30
+
+
+class FakeBot:
+    """
+    Имитация Bot API: задержка сети и серверный флуд-контроль.
+    Больше limit сообщений за последнюю секунду - TelegramRetryAfter.
+    """
+
+    def __init__(self, latency=0.05, limit=TELEGRAM_RATE_LIMIT, jitter=0.5):
+        self.latency = latency
+        self.limit = limit
+        self.jitter = jitter
+        self.sent_times = collections.deque()
+        self.sent = 0
+        self.flood_errors = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(self.latency * (1 + random.uniform(-self.jitter, self.jitter)))
+
+        now = time.monotonic()
+        while self.sent_times and self.sent_times[0] < now - 1:
+            self.sent_times.popleft()
+
+        if len(self.sent_times) >= self.limit:
+            self.flood_errors += 1
+            raise TelegramRetryAfter(
+                method=SendMessage(chat_id=chat_id, text=text),
+                message='Too Many Requests',
+                retry_after=1,
+            )
+
+        self.sent_times.append(now)
+        self.sent += 1
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест рассылки напоминаний на имитации бота.
+    Показывает, насколько пропускная способность близка к лимиту.
+    """
+    help = 'Нагрузочный тест рассылки напоминаний (без обращения к Telegram)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Количество получателей')
+        parser.add_argument('--rate', type=float, default=BROADCAST_RATE_LIMIT, help='Лимит рассылки (сообщ./с)')
+        parser.add_argument('--server-limit', type=int, default=TELEGRAM_RATE_LIMIT, help='Лимит имитации сервера')
+        parser.add_argument('--concurrency', type=int, default=BROADCAST_CONCURRENCY, help='Одновременных отправок')
+        parser.add_argument('--latency', type=float, default=0.05, help='Задержка ответа сервера (с)')
+
+    def handle(self, *args, **options):
+        bot = FakeBot(latency=options['latency'], limit=options['server_limit'])
+        broadcaster = ReminderBroadcaster(bot, rate=options['rate'], concurrency=options['concurrency'])
+        messages = [(100000 + i, f'Напоминание {i}') for i in range(options['users'])]
+
+        metrics = asyncio.run(broadcaster.broadcast(messages))
+
+        self.stdout.write(
+            f"Отправлено: {metrics['sent']}/{metrics['total']} за {metrics['duration']:.1f} с\n"
+            f"Скорость: {metrics['rate']:.1f} сообщ./с при лимите рассылки {options['rate']:.0f} "
+            f"и лимите сервера {options['server_limit']} ({metrics['rate'] / options['server_limit'] * 100:.0f}%)\n"
+            f"Ошибок: {metrics['failed']}, повторов: {metrics['retries']}, "
+            f"RetryAfter: {metrics['retry_after']} (флуд-ошибок сервера: {bot.flood_errors})"
+        )
@@ -0,0 +1,107 @@
+# app_vocab/management/commands/bench_search.py
+
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from app_vocab.models import Word
+from app_vocab.search_service import SEARCH_LIMIT, search_words
+
+
+LATIN_SYLLABLES = ['ba', 'ce', 'di', 'fo', 'gu', 'ka', 'le', 'mi', 'no', 'pu', 'ra', 'se', 'ti', 'vo', 'ze',
+                   'str', 'tion', 'ing', 'er', 'an']
+CYRILLIC_SYLLABLES = ['ба', 'ве', 'ги', 'до', 'жу', 'ка', 'ле', 'ми', 'но', 'пу', 'ра', 'се', 'ти', 'фо', 'ще',
+                      'ость', 'ние', 'ать', 'ов']
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест поиска слов: создает словарь из случайных слов (по умолчанию
+    миллион), замеряет поиск точных слов, начала слова, подстроки и слов с опечаткой
+    через search_words и для сравнения через icontains по трем полям.
+    Созданные слова удаляются в конце.
+    """
+    help = 'Замеряет поиск слов (FTS5/pg_trgm) на большом словаре'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--words', type=int, default=1_000_000, help='Сколько слов создать')
+        parser.add_argument('--queries', type=int, default=50, help='Запросов каждого вида')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Слов в одной пачке bulk_create')
+        parser.add_argument('--skip-icontains', action='store_true', help='Не замерять icontains')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(42)
+        # Созданные слова - все после последнего существующего
+        self.last_id = Word.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        try:
+            samples = self.create_words(options['words'], options['batch_size'])
+            queries = self.make_queries(samples, options['queries'])
+
+            for kind, texts in queries.items():
+                self.report(f'search_words, {kind}', texts, lambda text: search_words(text, limit=SEARCH_LIMIT))
+                if not options['skip_icontains']:
+                    self.report(f'icontains, {kind}', texts, self.icontains)
+        finally:
+            started = time.monotonic()
+            Word.objects.filter(id__gt=self.last_id).delete()
+            self.stdout.write(f'Удаление слов: {time.monotonic() - started:.1f} с')
+
+    def make_word(self, syllables, parts):
+        return ''.join(self.rng.choice(syllables) for _ in range(parts))
+
+    def create_words(self, count, batch_size):
+        """Создает слова пачками (индекс поиска обновляется триггерами) и возвращает часть из них"""
+        started = time.monotonic()
+        samples = []
+        for offset in range(0, count, batch_size):
+            batch = [
+                Word(
+                    original=f'{self.make_word(LATIN_SYLLABLES, self.rng.randint(2, 4))}{i}',
+                    translation=self.make_word(CYRILLIC_SYLLABLES, self.rng.randint(2, 4)),
+                    transcription='',
+                )
+                for i in range(offset, min(offset + batch_size, count))
+            ]
+            with transaction.atomic():
+                Word.objects.bulk_create(batch)
+            samples += self.rng.sample(batch, min(len(batch), 5))
+        elapsed = time.monotonic() - started
+        self.stdout.write(f'Создано слов: {count} за {elapsed:.1f} с ({count / elapsed:.0f}/с)')
+        return samples
+
+    def make_queries(self, samples, count):
+        words = self.rng.sample(samples, min(count, len(samples)))
+
+        def typo(text):
+            # Две соседние буквы меняются местами
+            i = self.rng.randrange(len(text) - 1)
+            return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+        return {
+            'точное слово': [word.original for word in words],
+            'начало перевода': [word.translation[:4] for word in words],
+            'подстрока': [word.original[1:6] for word in words],
+            'опечатка в переводе': [typo(word.translation) for word in words],
+        }
+
+    def icontains(self, text):
+        return list(Word.objects.filter(
+            Q(original__icontains=text) | Q(translation__icontains=text) | Q(transcription__icontains=text)
+        )[:SEARCH_LIMIT])
+
+    def report(self, name, texts, search):
+        latencies = []
+        found = 0
+        for text in texts:
+            started = time.monotonic()
+            found += bool(search(text))
+            latencies.append(time.monotonic() - started)
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 100
+        self.stdout.write(
+            f'{name}: p50 {quantiles[49] * 1000:.1f} мс, p95 {quantiles[94] * 1000:.1f} мс, '
+            f'найдено для {found} из {len(texts)}'
+        )
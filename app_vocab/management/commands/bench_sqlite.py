@@ -0,0 +1,125 @@
+# app_vocab/management/commands/bench_sqlite.py
+
+import itertools
+import statistics
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.utils import timezone
+
+from app_vocab.bot_db import get_deck_page, get_deck_stats
+from app_vocab.import_service import import_words
+from app_vocab.models import DeckChange, UserWord, Word
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест SQLite под одновременной работой сайта и бота:
+    потоки-"сайт" импортируют слова пачками и сохраняют повторения,
+    потоки-"бот" читают страницы словаря и статистику. Выводит скорость,
+    задержки и число ошибок "database is locked" для текущих настроек
+    (SQLITE_JOURNAL_MODE, SQLITE_BUSY_TIMEOUT, SQLITE_TRANSACTION_MODE и др.).
+    """
+    help = 'Замеряет одновременные записи сайта и чтения бота в SQLite'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=10, help='Длительность замера')
+        parser.add_argument('--writers', type=int, default=2, help='Потоков записи (импорт, повторения)')
+        parser.add_argument('--readers', type=int, default=4, help='Потоков чтения (запросы бота)')
+        parser.add_argument('--batch', type=int, default=200, help='Слов в одной пачке импорта')
+        parser.add_argument('--deck-size', type=int, default=2000, help='Слов в словаре читателя')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            self.stderr.write('Бенчмарк рассчитан на SQLite')
+            return
+
+        with connection.cursor() as cursor:
+            pragmas = {name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                       for name in ('journal_mode', 'synchronous', 'busy_timeout')}
+        pragmas['transaction_mode'] = settings.DATABASES['default'].get('OPTIONS', {}).get('transaction_mode')
+        self.stdout.write(f"Настройки: {pragmas}")
+
+        self.prefix = f'sqlbench_{uuid.uuid4().hex[:6]}'
+        users = []
+        try:
+            reader = User.objects.create_user(f'{self.prefix}_reader')
+            users.append(reader)
+            import_words(reader, self.make_rows('deck', options['deck_size']))
+
+            writers = [User.objects.create_user(f'{self.prefix}_writer{i}') for i in range(options['writers'])]
+            users += writers
+
+            results = {'запись': [], 'чтение': []}
+            stop_at = time.monotonic() + options['seconds']
+            threads = [
+                threading.Thread(target=self.run_worker, args=(self.write, user, options['batch'], stop_at, results['запись']))
+                for user in writers
+            ] + [
+                threading.Thread(target=self.run_worker, args=(self.read, reader, None, stop_at, results['чтение']))
+                for _ in range(options['readers'])
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            for kind, samples in results.items():
+                self.report(kind, samples, options['seconds'])
+        finally:
+            self.cleanup(users)
+
+    def make_rows(self, name, count):
+        return ({'original': f'{self.prefix}_{name}_{i}', 'translation': f'перевод {i}', 'transcription': ''}
+                for i in range(count))
+
+    def write(self, user, batch, counter):
+        """Запись как на сайте: пачка импорта и сохранение результата повторения"""
+        import_words(user, self.make_rows(f'{user.id}_{next(counter)}', batch))
+        user_word = UserWord.objects.filter(user=user).select_related('word').order_by('next_review').first()
+        user_word.repetition += 1
+        user_word.last_reviewed = timezone.now()
+        user_word.save()
+
+    def read(self, user, batch, counter):
+        """Чтение как в боте: страница словаря и статистика"""
+        get_deck_page.__wrapped__(user.id)
+        get_deck_stats.__wrapped__(user.id)
+
+    def run_worker(self, operation, user, batch, stop_at, samples):
+        counter = itertools.count()
+        try:
+            while time.monotonic() < stop_at:
+                started = time.monotonic()
+                try:
+                    operation(user, batch, counter)
+                except OperationalError as e:
+                    samples.append(('error', str(e)))
+                else:
+                    samples.append(('ok', time.monotonic() - started))
+        finally:
+            connection.close()
+
+    def report(self, kind, samples, seconds):
+        latencies = [value for status, value in samples if status == 'ok']
+        errors = [value for status, value in samples if status == 'error']
+        line = f"{kind}: {len(latencies)} операций ({len(latencies) / seconds:.0f}/с), ошибок: {len(errors)}"
+        if len(latencies) > 1:
+            quantiles = statistics.quantiles(latencies, n=100)
+            line += (f", p50 {quantiles[49] * 1000:.1f} мс, p95 {quantiles[94] * 1000:.1f} мс, "
+                     f"max {max(latencies) * 1000:.1f} мс")
+        self.stdout.write(line)
+        if errors:
+            self.stdout.write(f"  первая ошибка: {errors[0]}")
+
+    def cleanup(self, users):
+        """Удаляет пользователей и слова бенчмарка вместе с записями журнала синхронизации"""
+        UserWord.objects.filter(user__in=users).delete()
+        DeckChange.objects.filter(user__in=users).delete()
+        User.objects.filter(id__in=[user.id for user in users]).delete()
+        Word.objects.filter(original__startswith=self.prefix).delete()
@@ -0,0 +1,199 @@
+# app_vocab/management/commands/bench_webhook.py
+
+import asyncio
+import collections
+import itertools
+import logging
+import statistics
+import time
+
+from aiohttp import ClientSession, TCPConnector
+from aiohttp.test_utils import TestServer
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message
+from django.core.management.base import BaseCommand
+
+from app_vocab.bot import dp
+from app_vocab.bot_db import db_pool, profile_cache
+from app_vocab.bot_metrics import metrics
+from app_vocab.send_queue import SendQueue, SendQueueMiddleware
+from app_vocab.webhook import METRICS_PATH, WEBHOOK_PATH, create_webhook_app
+
+
+# Команды, которые только читают данные - бенчмарк не меняет базу
+BENCH_COMMANDS = ['/start', '/words', '/stats', '/remind', '/profile', '/cancel']
+BENCH_SECRET = 'bench-secret'
+
+
+class FakeTelegramSession(BaseSession):
+    """
+    Имитация Bot API: вместо HTTP-запросов к Telegram считает вызовы методов
+    и возвращает правдоподобные ответы.
+    """
+
+    def __init__(self, latency=0.0, flood_every=0):
+        super().__init__()
+        self.latency = latency
+        # Каждый flood_every-й запрос отвечает 429 (RetryAfter), как при превышении лимитов
+        self.flood_every = flood_every
+        self.requests = itertools.count(1)
+        self.calls = collections.Counter()
+        self.message_ids = itertools.count(1)
+
+    async def make_request(self, bot, method, timeout=None):
+        if self.flood_every and next(self.requests) % self.flood_every == 0:
+            self.calls['RetryAfter'] += 1
+            raise TelegramRetryAfter(method=method, message='Too Many Requests', retry_after=1)
+
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if isinstance(method, SendMessage):
+            return Message(
+                message_id=next(self.message_ids),
+                date=int(time.time()),
+                chat=Chat(id=method.chat_id, type='private'),
+                text=method.text,
+            )
+        return True
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b''
+
+    async def close(self):
+        pass
+
+
+def make_update(update_id, telegram_id, text):
+    """Обновление Telegram с текстовым сообщением"""
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': telegram_id, 'type': 'private'},
+            'from': {'id': telegram_id, 'is_bot': False, 'first_name': 'Bench'},
+            'text': text,
+        },
+    }
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный тест webhook-режима: поднимает приложение локально,
+    отправляет ему поток обновлений и измеряет сквозную пропускную способность
+    обработчиков (запрос завершается после обработки обновления).
+    """
+    help = 'Нагрузочный тест webhook-режима бота на имитации Telegram'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--updates', type=int, default=5000, help='Количество обновлений')
+        parser.add_argument('--concurrency', type=int, default=100, help='Одновременных запросов')
+        parser.add_argument('--users', type=int, default=200, help='Количество разных чатов')
+        parser.add_argument('--telegram-id', type=int, default=None,
+                            help='ID привязанного профиля (иначе используются непривязанные чаты)')
+        parser.add_argument('--latency', type=float, default=0.0, help='Задержка ответа Bot API (с)')
+        parser.add_argument('--flood-every', type=int, default=0, help='Каждый N-й запрос к Bot API получает 429')
+        parser.add_argument('--global-rate', type=float, default=1000.0,
+                            help='Общий лимит очереди отправки, сообщений/с')
+
+    def handle(self, *args, **options):
+        # Журнал каждого обновления заметно замедляет обработку и засоряет вывод
+        for logger in ('aiogram.event', 'aiohttp.access'):
+            logging.getLogger(logger).setLevel(logging.WARNING)
+        # Медленные обновления видны в итоговой сводке по обработчикам
+        logging.getLogger('app_vocab.bot_metrics').setLevel(logging.ERROR)
+
+        result = asyncio.run(self.run_bench(options))
+
+        latencies = result['latencies']
+        quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 100
+        self.stdout.write(
+            f"Обновлений: {options['updates']} за {result['duration']:.2f} с "
+            f"({options['updates'] / result['duration']:.0f} обновл./с)\n"
+            f"Задержка: p50 {quantiles[49] * 1000:.1f} мс, p95 {quantiles[94] * 1000:.1f} мс, "
+            f"max {max(latencies) * 1000:.1f} мс\n"
+            f"Ответы: {dict(result['statuses'])}, без секрета: {result['rejected_status']}\n"
+            f"Вызовы Bot API: {dict(result['calls'])}"
+        )
+
+        pool = db_pool.stats()
+        self.stdout.write(
+            f"Пул базы ({db_pool.size} потоков): задач {pool['completed']}, "
+            f"макс. очередь {pool['max_queued']}, ожидание {pool['avg_wait_ms']:.1f} мс, "
+            f"выполнение {pool['avg_run_ms']:.1f} мс"
+        )
+
+        queue = result['send_queue'].stats()
+        self.stdout.write(
+            f"Очередь отправки: отправлено {queue['sent']}, склеено {queue['coalesced']}, "
+            f"повторов {queue['retries']}, отброшено {queue['dropped']}, "
+            f"макс. в очереди {queue['max_pending']}, ожидали места {queue['throttled']}"
+        )
+
+        cache = profile_cache.stats()
+        self.stdout.write(
+            f"Кэш профилей: попаданий {cache['hits']}, промахов {cache['misses']} "
+            f"({cache['hit_rate'] * 100:.0f}%), записей {cache['size']}"
+        )
+
+        self.stdout.write(f"Обработчики (бюджет {metrics.budget * 1000:.0f} мс, {result['metrics_status']} на {METRICS_PATH}):")
+        for handler, summary in sorted(metrics.summary().items(), key=lambda item: -item[1]['avg_ms']):
+            self.stdout.write(
+                f"  {handler}: {summary['count']} шт., среднее {summary['avg_ms']} мс, "
+                f"p95 <= {summary['p95_ms']:.0f} мс, база {summary['avg_db_ms']} мс, "
+                f"запросов {summary['avg_queries']}, медленных {summary['slow']}"
+            )
+
+    async def run_bench(self, options):
+        session = FakeTelegramSession(latency=options['latency'], flood_every=options['flood_every'])
+        send_queue = SendQueue(global_rate=options['global_rate'])
+        session.middleware(SendQueueMiddleware(send_queue))
+        fake_bot = Bot(token='123456:BENCH', session=session)
+        app = create_webhook_app(bot=fake_bot, dispatcher=dp, secret=BENCH_SECRET, handle_in_background=False)
+
+        server = TestServer(app)
+        await server.start_server()
+        url = str(server.make_url(WEBHOOK_PATH))
+        headers = {'X-Telegram-Bot-Api-Secret-Token': BENCH_SECRET}
+
+        statuses = collections.Counter()
+        latencies = []
+        semaphore = asyncio.Semaphore(options['concurrency'])
+
+        async with ClientSession(connector=TCPConnector(limit=options['concurrency'])) as client:
+            # Запрос без секретного токена должен быть отклонен
+            async with client.post(url, json=make_update(0, 1, '/start')) as response:
+                rejected_status = response.status
+
+            async def send(update_id):
+                telegram_id = options['telegram_id'] or 900000000 + update_id % options['users']
+                update = make_update(update_id, telegram_id, BENCH_COMMANDS[update_id % len(BENCH_COMMANDS)])
+                async with semaphore:
+                    started = time.monotonic()
+                    async with client.post(url, json=update, headers=headers) as response:
+                        await response.read()
+                        statuses[response.status] += 1
+                    latencies.append(time.monotonic() - started)
+
+            started = time.monotonic()
+            await asyncio.gather(*(send(update_id) for update_id in range(1, options['updates'] + 1)))
+            duration = time.monotonic() - started
+
+            async with client.get(server.make_url(METRICS_PATH)) as response:
+                metrics_status = response.status
+
+        await server.close()
+        return {
+            'duration': duration,
+            'latencies': latencies,
+            'statuses': statuses,
+            'rejected_status': rejected_status,
+            'metrics_status': metrics_status,
+            'calls': session.calls,
+            'send_queue': send_queue,
+        }
@@ -0,0 +1,135 @@
+# app_vocab/management/commands/copy_from_sqlite.py
+
+import contextlib
+import os
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, models, router, transaction
+from django.db.migrations.recorder import MigrationRecorder
+
+
+# Под этим именем файл SQLite подключается как вторая база
+SOURCE_ALIAS = 'sqlite_source'
+
+
+@contextlib.contextmanager
+def keep_auto_dates(model_list):
+    """
+    bulk_create проставляет auto_now/auto_now_add текущим временем -
+    на время копирования отключаем их, чтобы сохранить исходные даты.
+    """
+    fields = [
+        field for model in model_list for field in model._meta.local_fields
+        if isinstance(field, models.DateField) and (field.auto_now or field.auto_now_add)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    """
+    Переносит все данные из файла SQLite в базу из настроек (обычно PostgreSQL):
+    таблицы целевой базы очищаются, строки копируются пачками через bulk_create
+    в одной транзакции, затем сбрасываются последовательности первичных ключей.
+    Обе базы должны быть на одной версии миграций.
+    """
+    help = 'Копирует данные из db.sqlite3 в базу DATABASE_URL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('sqlite_path', help='Путь к файлу SQLite')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Строк в одной пачке')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Целевая база')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Не спрашивать подтверждение')
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options['sqlite_path'])
+        if not os.path.exists(path):
+            raise CommandError(f'Файл не найден: {path}')
+
+        target = connections[options['database']]
+        if target.vendor == 'sqlite' and os.path.abspath(str(target.settings_dict['NAME'])) == path:
+            raise CommandError('Источник и целевая база - один и тот же файл')
+
+        # Подключаем файл как дополнительную базу
+        connections.settings[SOURCE_ALIAS] = connections.configure_settings({
+            DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+            SOURCE_ALIAS: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path},
+        })[SOURCE_ALIAS]
+        source = connections[SOURCE_ALIAS]
+
+        try:
+            self.check_migrations(source, target)
+            model_list = [
+                model for model in apps.get_models(include_auto_created=True)
+                if model._meta.managed and not model._meta.proxy
+                and router.allow_migrate_model(target.alias, model)
+            ]
+
+            if options['interactive']:
+                answer = input(f"Все данные в базе {target.settings_dict['NAME']} будут заменены. Продолжить? [yes/no]: ")
+                if answer != 'yes':
+                    self.stdout.write('Отменено')
+                    return
+
+            started = time.monotonic()
+            with transaction.atomic(using=target.alias), keep_auto_dates(model_list):
+                self.clear(target, model_list)
+                total = sum(self.copy_model(model, target, options['batch_size']) for model in model_list)
+                self.reset_sequences(target, model_list)
+        finally:
+            source.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Скопировано строк: {total} из {len(model_list)} таблиц за {time.monotonic() - started:.1f} с'
+        ))
+
+    def check_migrations(self, source, target):
+        source_applied = set(MigrationRecorder(source).applied_migrations())
+        target_applied = set(MigrationRecorder(target).applied_migrations())
+        if source_applied != target_applied:
+            raise CommandError(
+                'Версии миграций различаются: примените миграции к обеим базам '
+                '(python manage.py migrate с DATABASE_URL каждой из них)'
+            )
+
+    def clear(self, target, model_list):
+        """Очищает таблицы целевой базы (после migrate в них есть типы контента и права)"""
+        tables = [model._meta.db_table for model in model_list]
+        target.ops.execute_sql_flush(target.ops.sql_flush(no_style(), tables, allow_cascade=True))
+
+    def copy_model(self, model, target, batch_size):
+        manager = model._base_manager
+        copied = 0
+        batch = []
+        # Внешние ключи проверяются при фиксации транзакции, поэтому порядок таблиц не важен
+        for obj in manager.using(SOURCE_ALIAS).order_by('pk').iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                manager.using(target.alias).bulk_create(batch)
+                copied += len(batch)
+                batch = []
+        if batch:
+            manager.using(target.alias).bulk_create(batch)
+            copied += len(batch)
+
+        if copied:
+            self.stdout.write(f'  {model._meta.label}: {copied}')
+        return copied
+
+    def reset_sequences(self, target, model_list):
+        """Следующие первичные ключи должны идти после скопированных"""
+        statements = target.ops.sequence_reset_sql(no_style(), model_list)
+        if statements:
+            with target.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
@@ -0,0 +1,26 @@
+# app_vocab/management/commands/export_apkg.py
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from app_vocab.anki_service import export_user_apkg
+
+
+class Command(BaseCommand):
+    """
+    Экспортирует словарь пользователя в колоду Anki (.apkg) с расписанием повторений.
+    """
+    help = 'Экспорт словаря пользователя в колоду Anki (.apkg)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Имя пользователя')
+        parser.add_argument('apkg_file', help='Куда сохранить .apkg')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Пользователь {options['username']} не найден")
+
+        count = export_user_apkg(user, options['apkg_file'])
+        self.stdout.write(f"✅ Экспортировано заметок: {count}")
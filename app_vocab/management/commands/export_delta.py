@@ -0,0 +1,38 @@
+# app_vocab/management/commands/export_delta.py
+
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from app_vocab.sync_service import get_sync_cursor, stream_delta
+
+
+class Command(BaseCommand):
+    """
+    Выгружает изменения словаря пользователя после курсора.
+    Новый курсор печатается в stderr - его нужно передать в следующий --since.
+    """
+    help = 'Экспорт изменений словаря пользователя (JSONL) для синхронизации'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Имя пользователя')
+        parser.add_argument('--since', type=int, default=0, help='Курсор предыдущей синхронизации')
+        parser.add_argument('--output', help='Файл для записи (по умолчанию stdout)')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Пользователь {options['username']} не найден")
+
+        cursor = get_sync_cursor(user)
+        output = open(options['output'], 'w', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for line in stream_delta(user, since=options['since'], until=cursor):
+                output.write(line)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        self.stderr.write(f"cursor={cursor}")
@@ -0,0 +1,33 @@
+# app_vocab/management/commands/import_apkg.py
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from app_vocab.anki_service import iter_apkg_rows
+from app_vocab.import_service import import_words
+
+
+class Command(BaseCommand):
+    """
+    Импортирует колоду Anki (.apkg) в словарь пользователя вместе с расписанием.
+    """
+    help = 'Импорт колоды Anki (.apkg) в словарь пользователя'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Имя пользователя')
+        parser.add_argument('apkg_file', help='Файл колоды .apkg')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Размер пачки')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"Пользователь {options['username']} не найден")
+
+        with open(options['apkg_file'], 'rb') as apkg_file:
+            result = import_words(user, iter_apkg_rows(apkg_file), chunk_size=options['chunk_size'])
+
+        self.stdout.write(
+            f"✅ Импортировано: {result['imported']}, дубликатов: {result['duplicates']}, "
+            f"пропущено: {result['skipped']}"
+        )
@@ -0,0 +1,49 @@
+# app_vocab/management/commands/run_import_worker.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from app_vocab.import_service import (
+    IMPORT_CHUNK_SIZE,
+    claim_next_job,
+    requeue_stale_jobs,
+    run_import_job,
+)
+
+
+class Command(BaseCommand):
+    """
+    Обработчик фоновых задач импорта слов.
+    Запускается отдельным процессом: python manage.py run_import_worker
+    """
+    help = 'Выполняет фоновые задачи импорта слов из CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Обработать очередь и выйти')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Пауза между проверками очереди (сек)')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE, help='Размер пачки')
+
+    def handle(self, *args, **options):
+        self.stdout.write("📥 Обработчик импорта запущен")
+
+        while True:
+            # Подхватываем задачи, брошенные упавшими обработчиками
+            requeued = requeue_stale_jobs()
+            if requeued:
+                self.stdout.write(f"🔁 Возвращено в очередь задач: {requeued}")
+
+            job = claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"▶️ Задача #{job.id}: {job.original_name} (с строки {job.rows_processed})")
+            job = run_import_job(job, chunk_size=options['chunk_size'])
+            self.stdout.write(
+                f"{'✅' if job.status == job.STATUS_DONE else '❌'} Задача #{job.id}: "
+                f"импортировано {job.imported_count}, дубликатов {job.duplicate_count}, "
+                f"ошибок {job.error_count}"
+            )
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0005_userprofile_telegram_username_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_path', models.CharField(max_length=500, verbose_name='Путь к файлу')),
+                ('original_name', models.CharField(blank=True, max_length=255, verbose_name='Имя файла')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('running', 'Выполняется'), ('done', 'Завершен'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('total_rows', models.IntegerField(default=0, verbose_name='Всего строк')),
+                ('rows_processed', models.IntegerField(default=0, verbose_name='Обработано строк')),
+                ('imported_count', models.IntegerField(default=0, verbose_name='Импортировано')),
+                ('duplicate_count', models.IntegerField(default=0, verbose_name='Дубликатов')),
+                ('error_count', models.IntegerField(default=0, verbose_name='Ошибочных строк')),
+                ('error_message', models.TextField(blank=True, verbose_name='Текст ошибки')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создан')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлен')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Задача импорта',
+                'verbose_name_plural': 'Задачи импорта',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
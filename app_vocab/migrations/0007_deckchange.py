@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0006_importjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeckChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original', models.CharField(max_length=100, verbose_name='Иностранное слово')),
+                ('action', models.CharField(choices=[('upsert', 'Добавлено/изменено'), ('delete', 'Удалено')], max_length=10, verbose_name='Действие')),
+                ('changed_at', models.DateTimeField(auto_now=True, verbose_name='Время изменения')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Изменение словаря',
+                'verbose_name_plural': 'Изменения словаря',
+                'indexes': [models.Index(fields=['user', 'original'], name='app_vocab_d_user_id_b7531d_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0007_deckchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='next_reminder_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Следующее напоминание'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='reminder_hour',
+            field=models.IntegerField(default=9, verbose_name='Час напоминания'),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='reminder_timezone',
+            field=models.CharField(default='Europe/Moscow', max_length=50, verbose_name='Часовой пояс'),
+        ),
+    ]
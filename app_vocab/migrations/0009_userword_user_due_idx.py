@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0008_userprofile_reminder_schedule'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userword',
+            index=models.Index(fields=['user', 'next_review'], name='userword_user_due_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0009_userword_user_due_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BotSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='Ключ')),
+                ('state', models.CharField(blank=True, max_length=255, null=True, verbose_name='Состояние')),
+                ('data', models.TextField(default='{}', verbose_name='Данные (JSON)')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Последняя активность')),
+            ],
+            options={
+                'verbose_name': 'Сессия бота',
+                'verbose_name_plural': 'Сессии бота',
+            },
+        ),
+    ]
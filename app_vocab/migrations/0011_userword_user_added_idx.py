@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0010_botsession'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userword',
+            index=models.Index(fields=['user', '-date_added', '-id'], name='userword_user_added_idx'),
+        ),
+    ]
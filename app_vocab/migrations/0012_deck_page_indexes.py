@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 12:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0011_userword_user_added_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='userword',
+            name='userword_user_due_idx',
+        ),
+        migrations.AddIndex(
+            model_name='userword',
+            index=models.Index(fields=['user', 'next_review', 'id'], name='userword_user_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userword',
+            index=models.Index(fields=['user', 'repetition', 'id'], name='userword_user_level_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['original', 'id'], name='word_original_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['translation', 'id'], name='word_translation_idx'),
+        ),
+    ]
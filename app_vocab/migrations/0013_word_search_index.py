@@ -0,0 +1,78 @@
+from django.db import migrations
+
+
+# SQLite: таблица FTS5 с триграммами поверх app_vocab_word (external content)
+# и триггеры, которые держат ее в актуальном состоянии при любых изменениях слов,
+# включая bulk_create и удаление каскадом.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE app_vocab_word_fts USING fts5(
+        original, translation, transcription,
+        content='app_vocab_word', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER app_vocab_word_fts_insert AFTER INSERT ON app_vocab_word BEGIN
+        INSERT INTO app_vocab_word_fts(rowid, original, translation, transcription)
+        VALUES (new.id, new.original, new.translation, new.transcription);
+    END
+    """,
+    """
+    CREATE TRIGGER app_vocab_word_fts_delete AFTER DELETE ON app_vocab_word BEGIN
+        INSERT INTO app_vocab_word_fts(app_vocab_word_fts, rowid, original, translation, transcription)
+        VALUES ('delete', old.id, old.original, old.translation, old.transcription);
+    END
+    """,
+    """
+    CREATE TRIGGER app_vocab_word_fts_update AFTER UPDATE OF original, translation, transcription
+    ON app_vocab_word BEGIN
+        INSERT INTO app_vocab_word_fts(app_vocab_word_fts, rowid, original, translation, transcription)
+        VALUES ('delete', old.id, old.original, old.translation, old.transcription);
+        INSERT INTO app_vocab_word_fts(rowid, original, translation, transcription)
+        VALUES (new.id, new.original, new.translation, new.transcription);
+    END
+    """,
+    # Сколько слов содержат каждую триграмму - для поиска похожих слов
+    "CREATE VIRTUAL TABLE app_vocab_word_fts_vocab USING fts5vocab(app_vocab_word_fts, 'row')",
+    # Индексируем уже существующие слова
+    "INSERT INTO app_vocab_word_fts(app_vocab_word_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS app_vocab_word_fts_update',
+    'DROP TRIGGER IF EXISTS app_vocab_word_fts_delete',
+    'DROP TRIGGER IF EXISTS app_vocab_word_fts_insert',
+    'DROP TABLE IF EXISTS app_vocab_word_fts_vocab',
+    'DROP TABLE IF EXISTS app_vocab_word_fts',
+]
+
+# PostgreSQL: триграммные GIN-индексы pg_trgm. Индексируется UPPER(поле) - так их
+# используют и icontains Django (UPPER(поле) LIKE UPPER(...)), и поиск похожих слов.
+SEARCH_FIELDS = ('original', 'translation', 'transcription')
+POSTGRES_FORWARD = ['CREATE EXTENSION IF NOT EXISTS pg_trgm'] + [
+    f'CREATE INDEX IF NOT EXISTS word_{field}_trgm_idx ON app_vocab_word '
+    f'USING gin (UPPER({field}) gin_trgm_ops)'
+    for field in SEARCH_FIELDS
+]
+POSTGRES_BACKWARD = [f'DROP INDEX IF EXISTS word_{field}_trgm_idx' for field in SEARCH_FIELDS]
+
+
+def run_for_vendor(sqlite, postgresql):
+    def run(apps, schema_editor):
+        statements = {'sqlite': sqlite, 'postgresql': postgresql}.get(schema_editor.connection.vendor, [])
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0012_deck_page_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(SQLITE_FORWARD, POSTGRES_FORWARD),
+            run_for_vendor(SQLITE_BACKWARD, POSTGRES_BACKWARD),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:20
+
+from django.db import migrations, models
+
+
+def copy_word_fields(apps, schema_editor):
+    UserWord = apps.get_model('app_vocab', 'UserWord')
+    Word = apps.get_model('app_vocab', 'Word')
+    word = Word.objects.filter(pk=models.OuterRef('word_id'))
+    UserWord.objects.update(
+        word_original=models.Subquery(word.values('original')[:1]),
+        word_translation=models.Subquery(word.values('translation')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0013_word_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userword',
+            name='word_original',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Слово (для сортировки)'),
+        ),
+        migrations.AddField(
+            model_name='userword',
+            name='word_translation',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Перевод (для сортировки)'),
+        ),
+        migrations.RunPython(copy_word_fields, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='word',
+            name='word_original_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='word',
+            name='word_translation_idx',
+        ),
+        migrations.AddIndex(
+            model_name='userword',
+            index=models.Index(fields=['user', 'word_original', 'id'], name='userword_user_original_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userword',
+            index=models.Index(fields=['user', 'word_translation', 'id'], name='userword_user_transl_idx'),
+        ),
+    ]
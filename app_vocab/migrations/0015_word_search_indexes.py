@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0014_userword_sort_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['original', 'id'], name='word_original_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['translation', 'id'], name='word_translation_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-19 21:10
+
+import importlib
+import itertools
+
+from django.db import migrations, models
+
+search_index = importlib.import_module('app_vocab.migrations.0013_word_search_index')
+
+# Добавление поля NOT NULL в SQLite пересоздает таблицу слов, а вместе с ней
+# пропадают триггеры индекса FTS5 - создаем их заново (в обе стороны)
+FTS_TRIGGERS = [sql for sql in search_index.SQLITE_FORWARD if 'CREATE TRIGGER' in sql]
+
+
+def restore_fts_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in search_index.SQLITE_BACKWARD:
+        if 'TRIGGER' in sql:
+            schema_editor.execute(sql)
+    for sql in FTS_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+def fill_search_keys(apps, schema_editor):
+    # casefold есть только в Python (LOWER в SQLite меняет лишь ASCII) - заполняем пачками
+    Word = apps.get_model('app_vocab', 'Word')
+    rows = Word.objects.values_list('id', 'original', 'translation').order_by().iterator(chunk_size=2000)
+    with schema_editor.connection.cursor() as cursor:
+        while True:
+            batch = [
+                (original.casefold()[:100], translation.casefold()[:100], word_id)
+                for word_id, original, translation in itertools.islice(rows, 2000)
+            ]
+            if not batch:
+                break
+            cursor.executemany(
+                'UPDATE app_vocab_word SET search_original = %s, search_translation = %s WHERE id = %s', batch
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0015_word_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_fts_triggers),
+        migrations.AddField(
+            model_name='word',
+            name='search_original',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Слово (для поиска)'),
+        ),
+        migrations.AddField(
+            model_name='word',
+            name='search_translation',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100, verbose_name='Перевод (для поиска)'),
+        ),
+        migrations.RunPython(restore_fts_triggers, migrations.RunPython.noop),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['search_original', 'id'], name='word_search_original_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='word',
+            index=models.Index(fields=['search_translation', 'id'], name='word_search_transl_idx'),
+        ),
+    ]
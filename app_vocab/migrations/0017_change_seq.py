@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-19 22:10
+
+from django.db import migrations, models
+
+
+def fill_change_seq(apps, schema_editor):
+    # Прежний курсор - id записи журнала; номера изменений продолжают его,
+    # поэтому курсоры, выданные до миграции, остаются верными
+    DeckChange = apps.get_model('app_vocab', 'DeckChange')
+    DeckChange.objects.update(change_seq=models.F('id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app_vocab', '0016_word_search_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deckchange',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, verbose_name='Номер изменения'),
+        ),
+        migrations.AddField(
+            model_name='userword',
+            name='change_seq',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Номер изменения'),
+        ),
+        migrations.RunPython(fill_change_seq, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='deckchange',
+            index=models.Index(fields=['user', 'change_seq'], name='deckchange_user_change_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userword',
+            index=models.Index(fields=['user', 'change_seq'], name='userword_user_change_idx'),
+        ),
+    ]
@@ -1,11 +1,37 @@
 # app_vocab/models.py
 
 from django.db import models
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import User
 from django.utils import timezone
 import datetime
 
 
+# Поля слова и их ключи поиска без учета регистра
+SEARCH_KEY_FIELDS = {'original': 'search_original', 'translation': 'search_translation'}
+
+
+def search_key(value, max_length=100):
+    """Ключ поиска: строка в casefold (для любых алфавитов, а не только ASCII)"""
+    return (value or '').casefold()[:max_length]
+
+
+class WordManager(models.Manager):
+    # bulk_create/bulk_update не вызывают save() - ключи поиска заполняем здесь
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for word in objs:
+            word.fill_search_keys()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        for word in objs:
+            word.fill_search_keys()
+        fields = list(fields) + [key for field, key in SEARCH_KEY_FIELDS.items() if field in fields]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
 class Word(models.Model):
     """
     Модель для хранения слова (общие данные для всех пользователей).
@@ -18,6 +44,12 @@ class Word(models.Model):
     # Примеры использования (для подсказок в упражнениях)
     example_sentence = models.TextField(blank=True, verbose_name='Пример использования')
 
+    # Слово и перевод в casefold: поиск по точному совпадению и началу слова без учета регистра
+    search_original = models.CharField(max_length=100, blank=True, default='', editable=False,
+                                       verbose_name='Слово (для поиска)')
+    search_translation = models.CharField(max_length=100, blank=True, default='', editable=False,
+                                          verbose_name='Перевод (для поиска)')
+
     # Уровень сложности слова (общий для всех)
     difficulty_level = models.IntegerField(
         choices=[(1, 'Легкий'), (2, 'Средний'), (3, 'Сложный')],
@@ -25,6 +57,8 @@ class Word(models.Model):
         verbose_name='Уровень сложности'
     )
 
+    objects = WordManager()
+
     def get_audio_url(self):
         """Возвращает URL для озвучки слова"""
         from .tts_service import text_to_speech
@@ -38,10 +72,40 @@ class Word(models.Model):
         verbose_name = 'Слово'
         verbose_name_plural = 'Слова'
         ordering = ['-date_added']
+        indexes = [
+            # Поиск по написанию (удаление слов, проверка дубликатов)
+            models.Index(fields=['original', 'id'], name='word_original_idx'),
+            models.Index(fields=['translation', 'id'], name='word_translation_idx'),
+            # Поиск по точному совпадению и началу слова (search_service.exact_candidates)
+            models.Index(fields=['search_original', 'id'], name='word_search_original_idx'),
+            models.Index(fields=['search_translation', 'id'], name='word_search_transl_idx'),
+        ]
 
     def __str__(self):
         return f"{self.original} - {self.translation}"
 
+    def fill_search_keys(self):
+        for field, key in SEARCH_KEY_FIELDS.items():
+            setattr(self, key, search_key(getattr(self, field)))
+
+    def save(self, *args, **kwargs):
+        self.fill_search_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = list(update_fields) + [
+                key for field, key in SEARCH_KEY_FIELDS.items() if field in update_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class UserWordManager(models.Manager):
+    def bulk_create(self, objs, *args, **kwargs):
+        # save() не вызывается - копию слова для сортировки заполняем здесь
+        objs = list(objs)
+        for user_word in objs:
+            user_word.copy_word_fields()
+        return super().bulk_create(objs, *args, **kwargs)
+
 
 class UserWord(models.Model):
     """
@@ -64,14 +128,59 @@ class UserWord(models.Model):
 
     date_added = models.DateTimeField(auto_now_add=True, verbose_name='Дата добавления пользователю')
 
+    # Копия слова и перевода из Word: страницы словаря по алфавиту идут по индексу
+    # пользователя. Заполняется при добавлении, при изменении слова обновляется (signals.py)
+    word_original = models.CharField(max_length=100, blank=True, default='', verbose_name='Слово (для сортировки)')
+    word_translation = models.CharField(max_length=100, blank=True, default='', verbose_name='Перевод (для сортировки)')
+
+    # Номер последнего изменения записи (курсор синхронизации, общий с DeckChange)
+    change_seq = models.BigIntegerField(default=0, editable=False, verbose_name='Номер изменения')
+
+    objects = UserWordManager()
+
     class Meta:
         verbose_name = 'Прогресс пользователя'
         verbose_name_plural = 'Прогресс пользователей'
         unique_together = ['user', 'word']  # Важно: одна запись на пользователя и слово
+        indexes = [
+            # Слова пользователя, которые пора повторить (напоминания, тренировки),
+            # и страницы словаря по ключу (next_review, id)
+            models.Index(fields=['user', 'next_review', 'id'], name='userword_user_due_idx'),
+            # Постраничный вывод словаря по ключу (date_added, id) в боте и на сайте
+            models.Index(fields=['user', '-date_added', '-id'], name='userword_user_added_idx'),
+            # Страницы словаря по уровню - ключ (repetition, id)
+            models.Index(fields=['user', 'repetition', 'id'], name='userword_user_level_idx'),
+            # Страницы словаря по алфавиту слов и переводов
+            models.Index(fields=['user', 'word_original', 'id'], name='userword_user_original_idx'),
+            models.Index(fields=['user', 'word_translation', 'id'], name='userword_user_transl_idx'),
+            # Измененные после курсора синхронизации
+            models.Index(fields=['user', 'change_seq'], name='userword_user_change_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.word.original} (ур. {self.repetition})"
 
+    def copy_word_fields(self):
+        """Копирует слово и перевод для сортировки, если они еще не заполнены"""
+        if not self.word_original:
+            self.word_original = self.word.original
+            self.word_translation = self.word.translation
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.copy_word_fields()
+            return super().save(*args, **kwargs)
+
+        # Изменение прогресса попадает в дельту синхронизации без записи в журнал:
+        # номер изменения вычисляется в том же UPDATE
+        self.change_seq = last_change_seq(self.user_id) + 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields:
+            kwargs['update_fields'] = {*update_fields, 'change_seq'}
+        super().save(*args, **kwargs)
+        # Новое значение прочитается из базы при обращении к полю
+        del self.__dict__['change_seq']
+
     def update_progress(self, quality):
         """
         Алгоритм SM-2 для обновления интервалов повторений.
@@ -145,6 +254,11 @@ class UserProfile(models.Model):
 
     # Уведомления
     daily_goal_reminder = models.BooleanField(default=True, verbose_name='Напоминание о целях')
+    reminder_hour = models.IntegerField(default=9, verbose_name='Час напоминания')
+    reminder_timezone = models.CharField(max_length=50, default='Europe/Moscow', verbose_name='Часовой пояс')
+    # Когда отправить следующее напоминание (заполняет планировщик в run_bot.py)
+    next_reminder_at = models.DateTimeField(null=True, blank=True, db_index=True,
+                                            verbose_name='Следующее напоминание')
 
     # телеграм бот
     telegram_id = models.CharField(max_length=100, blank=True, null=True)
@@ -156,3 +270,109 @@ class UserProfile(models.Model):
 
     def __str__(self):
         return f"Профиль: {self.user.username}"
+
+
+class ImportJob(models.Model):
+    """
+    Фоновая задача импорта слов из CSV файла.
+    Файл сохраняется на диск, а обработчик (manage.py run_import_worker)
+    импортирует его пачками и сохраняет прогресс после каждой пачки.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'В очереди'),
+        (STATUS_RUNNING, 'Выполняется'),
+        (STATUS_DONE, 'Завершен'),
+        (STATUS_FAILED, 'Ошибка'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Пользователь')
+    file_path = models.CharField(max_length=500, verbose_name='Путь к файлу')
+    original_name = models.CharField(max_length=255, blank=True, verbose_name='Имя файла')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, verbose_name='Статус')
+
+    # Прогресс (обновляется в одной транзакции с каждой пачкой)
+    total_rows = models.IntegerField(default=0, verbose_name='Всего строк')
+    rows_processed = models.IntegerField(default=0, verbose_name='Обработано строк')
+    imported_count = models.IntegerField(default=0, verbose_name='Импортировано')
+    duplicate_count = models.IntegerField(default=0, verbose_name='Дубликатов')
+    error_count = models.IntegerField(default=0, verbose_name='Ошибочных строк')
+    error_message = models.TextField(blank=True, verbose_name='Текст ошибки')
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создан')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлен')
+
+    class Meta:
+        verbose_name = 'Задача импорта'
+        verbose_name_plural = 'Задачи импорта'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Импорт {self.original_name} ({self.get_status_display()})"
+
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+
+class DeckChange(models.Model):
+    """
+    Журнал изменений словаря пользователя для синхронизации между установками.
+    change_seq - монотонный номер изменения (курсор синхронизации); повторения
+    журнал не пишут, они сами увеличивают UserWord.change_seq из того же ряда.
+    На каждое слово хранится только последнее изменение.
+    """
+    ACTION_UPSERT = 'upsert'
+    ACTION_DELETE = 'delete'
+
+    ACTION_CHOICES = [
+        (ACTION_UPSERT, 'Добавлено/изменено'),
+        (ACTION_DELETE, 'Удалено'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Пользователь')
+    original = models.CharField(max_length=100, verbose_name='Иностранное слово')
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, verbose_name='Действие')
+    changed_at = models.DateTimeField(auto_now=True, verbose_name='Время изменения')
+    change_seq = models.BigIntegerField(default=0, verbose_name='Номер изменения')
+
+    class Meta:
+        verbose_name = 'Изменение словаря'
+        verbose_name_plural = 'Изменения словаря'
+        indexes = [
+            models.Index(fields=['user', 'original']),
+            models.Index(fields=['user', 'change_seq'], name='deckchange_user_change_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.change_seq} {self.user_id}: {self.original} ({self.action})"
+
+
+def last_change_seq(user_id):
+    """Номер последнего изменения словаря пользователя (выражение для запроса, 0 - изменений не было)"""
+    def last(model):
+        latest = model.objects.filter(user_id=user_id).order_by('-change_seq').values('change_seq')[:1]
+        return Coalesce(models.Subquery(latest), 0, output_field=models.BigIntegerField())
+    return Greatest(last(UserWord), last(DeckChange))
+
+
+class BotSession(models.Model):
+    """
+    Состояние FSM Telegram-бота (диалог теста, карточек и т.п.).
+    Хранится в базе, поэтому переживает перезапуск и общее для всех воркеров.
+    Сессии без активности дольше TTL считаются завершенными и удаляются.
+    """
+    key = models.CharField(max_length=255, unique=True, verbose_name='Ключ')
+    state = models.CharField(max_length=255, null=True, blank=True, verbose_name='Состояние')
+    data = models.TextField(default='{}', verbose_name='Данные (JSON)')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='Последняя активность')
+
+    class Meta:
+        verbose_name = 'Сессия бота'
+        verbose_name_plural = 'Сессии бота'
+
+    def __str__(self):
+        return f"{self.key}: {self.state or '-'}"
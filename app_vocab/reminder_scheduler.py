@@ -0,0 +1,191 @@
+# app_vocab/reminder_scheduler.py
+import asyncio
+import datetime
+import heapq
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import UserProfile
+from .bot_db import db_task
+from .cache_service import new_version
+from .reminder_service import send_reminders
+
+
+# Как часто перечитываем расписание из базы (подхватываем новые настройки), сек
+SCHEDULER_REFRESH_INTERVAL = 600
+# Сколько напоминаний отправляем за один проход
+SCHEDULER_BATCH_SIZE = 1000
+# Как часто проверяем, не менялись ли настройки напоминаний на сайте, сек
+SCHEDULER_POLL_INTERVAL = 30
+# Версия расписания в общем кэше: ее меняет процесс, сохранивший настройки
+SCHEDULE_VERSION_KEY = 'reminder-schedule-version'
+
+
+def get_user_timezone(name):
+    """Часовой пояс пользователя (UTC, если название неизвестно)"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return datetime.timezone.utc
+
+
+def is_valid_timezone(name):
+    """Название часового пояса из базы IANA, которое поместится в профиль"""
+    if len(name) > UserProfile._meta.get_field('reminder_timezone').max_length:
+        return False
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+    return True
+
+
+def compute_next_reminder(profile, after=None):
+    """
+    Следующий момент отправки напоминания: ближайшие reminder_hour:00
+    по часовому поясу пользователя строго после after.
+    """
+    after = after or timezone.now()
+    user_tz = get_user_timezone(profile.reminder_timezone)
+    hour = min(max(profile.reminder_hour, 0), 23)
+
+    local_now = after.astimezone(user_tz)
+    candidate = local_now.replace(hour=hour, minute=0, second=0, microsecond=0)
+    if candidate <= local_now:
+        candidate += datetime.timedelta(days=1)
+
+    return candidate.astimezone(datetime.timezone.utc)
+
+
+def request_schedule_refresh():
+    """
+    Настройки напоминаний пользователя изменились - планировщик (в процессе бота)
+    перечитает расписание не позже чем через SCHEDULER_POLL_INTERVAL.
+    Версия меняется после фиксации транзакции, чтобы планировщик прочитал новые настройки.
+    """
+    transaction.on_commit(lambda: cache.set(SCHEDULE_VERSION_KEY, new_version(), None))
+
+
+def reminder_profiles():
+    """Профили, которым нужно отправлять ежедневные напоминания"""
+    return (
+        UserProfile.objects
+        .filter(telegram_id__isnull=False, notification_enabled=True, daily_goal_reminder=True)
+        .exclude(telegram_id='')
+    )
+
+
+class ReminderScheduler:
+    """
+    Планировщик ежедневных напоминаний.
+
+    Время следующего напоминания каждого пользователя хранится в
+    UserProfile.next_reminder_at, в памяти - куча (min-heap) ближайших задач.
+    Планировщик спит ровно до ближайшей задачи; после перезапуска
+    просроченные напоминания отправляются сразу (один раз).
+    """
+
+    def __init__(self, bot, refresh_interval=SCHEDULER_REFRESH_INTERVAL, batch_size=SCHEDULER_BATCH_SIZE,
+                 poll_interval=SCHEDULER_POLL_INTERVAL):
+        self.bot = bot
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.heap = []
+        self.wakeup = asyncio.Event()
+        self.refresh_requested = False
+        self.schedule_version = None
+
+    def request_refresh(self):
+        """Просит перечитать расписание из базы (например, после смены настроек)"""
+        self.refresh_requested = True
+        self.wakeup.set()
+
+    async def schedule_changed(self):
+        """Сменилась ли версия расписания (request_schedule_refresh) с прошлой проверки"""
+        version = await cache.aget(SCHEDULE_VERSION_KEY)
+        changed = version != self.schedule_version
+        self.schedule_version = version
+        return changed
+
+    @db_task
+    def load_schedule(self):
+        """Читает расписание из базы, недостающее время напоминаний вычисляет и сохраняет"""
+        now = timezone.now()
+        heap = []
+        missing = []
+
+        profiles = reminder_profiles().only('id', 'reminder_hour', 'reminder_timezone', 'next_reminder_at')
+        for profile in profiles.iterator(chunk_size=2000):
+            if profile.next_reminder_at is None:
+                profile.next_reminder_at = compute_next_reminder(profile, now)
+                missing.append(profile)
+            heap.append((profile.next_reminder_at, profile.id))
+
+        UserProfile.objects.bulk_update(missing, ['next_reminder_at'], batch_size=500)
+        heapq.heapify(heap)
+        return heap
+
+    @db_task
+    def claim_due(self, profile_ids, now):
+        """
+        Возвращает профили, которым пора отправить напоминание, и сразу
+        переносит их следующее напоминание. Время переносится до отправки,
+        поэтому при падении напоминание может потеряться, но не задвоится.
+        """
+        profiles = list(
+            reminder_profiles()
+            .filter(id__in=profile_ids, next_reminder_at__lte=now)
+        )
+        for profile in profiles:
+            profile.next_reminder_at = compute_next_reminder(profile, now)
+        UserProfile.objects.bulk_update(profiles, ['next_reminder_at'], batch_size=500)
+        return profiles
+
+    async def refresh(self):
+        self.heap = await self.load_schedule()
+        self.refresh_requested = False
+        print(f"⏰ Расписание напоминаний загружено: {len(self.heap)} пользователей")
+
+    async def run(self):
+        """Основной цикл планировщика"""
+        loop = asyncio.get_running_loop()
+        await self.schedule_changed()
+        await self.refresh()
+        last_refresh = loop.time()
+
+        while True:
+            if await self.schedule_changed():
+                self.request_refresh()
+            if self.refresh_requested or loop.time() - last_refresh >= self.refresh_interval:
+                await self.refresh()
+                last_refresh = loop.time()
+
+            now = timezone.now()
+            timeout = min(self.refresh_interval - (loop.time() - last_refresh), self.poll_interval)
+            if self.heap:
+                timeout = min(timeout, (self.heap[0][0] - now).total_seconds())
+
+            if timeout > 0:
+                # Спим до ближайшего напоминания, проверки настроек или запроса на обновление
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+                continue
+
+            due_ids = []
+            while self.heap and self.heap[0][0] <= now and len(due_ids) < self.batch_size:
+                due_ids.append(heapq.heappop(self.heap)[1])
+
+            try:
+                profiles = await self.claim_due(due_ids, now)
+                for profile in profiles:
+                    heapq.heappush(self.heap, (profile.next_reminder_at, profile.id))
+                await send_reminders(self.bot, profiles)
+            except Exception as e:
+                print(f"❌ Ошибка в планировщике напоминаний: {e}")
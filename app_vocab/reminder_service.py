@@ -1,60 +1,253 @@
 # app_vocab/reminder_service.py
 import asyncio
-from asgiref.sync import sync_to_async
-from .models import UserProfile, Word
-import random
+import logging
+import time
 
+from aiogram.exceptions import TelegramRetryAfter, TelegramNetworkError, TelegramServerError, TelegramAPIError
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
 
-@sync_to_async
+from .models import UserProfile, UserWord
+from .bot_db import db_task
+from .send_queue import SendDropped
+
+
+logger = logging.getLogger('app_vocab.reminders')
+
+# Глобальный лимит Telegram - около 30 сообщений в секунду, берем с запасом
+BROADCAST_RATE_LIMIT = 28
+# Не чаще одного сообщения в секунду в один чат
+BROADCAST_PER_CHAT_INTERVAL = 1.0
+# Сколько отправок выполняется одновременно
+BROADCAST_CONCURRENCY = 20
+# Сколько раз повторяем отправку при флуд-контроле и сетевых ошибках
+BROADCAST_MAX_RETRIES = 3
+
+# Сколько слов показываем в напоминании
+REMINDER_DIGEST_SIZE = 5
+# Для скольких пользователей собираем сводки одним запросом
+REMINDER_DIGEST_BATCH_SIZE = 500
+
+
+class TokenBucket:
+    """
+    Ограничитель скорости "ведро токенов": не больше rate операций в секунду
+    с допустимым всплеском до capacity.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Ждет, пока появится токен, и забирает его"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ReminderBroadcaster:
+    """
+    Рассылка сообщений с учетом лимитов Telegram: общее ведро токенов,
+    пауза между сообщениями в один чат, ограниченное число одновременных
+    отправок и повтор после RetryAfter. Сообщения бота идут через очередь отправки
+    (send_queue.py): RetryAfter, на котором она сдалась, приходит сюда же,
+    а отброшенные ею (SendDropped) считаются неотправленными. Собирает метрики за запуск.
+    """
+
+    def __init__(self, bot, rate=BROADCAST_RATE_LIMIT, per_chat_interval=BROADCAST_PER_CHAT_INTERVAL,
+                 concurrency=BROADCAST_CONCURRENCY, max_retries=BROADCAST_MAX_RETRIES):
+        self.bot = bot
+        # Без всплесков: сообщения идут равномерно
+        self.bucket = TokenBucket(rate, capacity=1)
+        self.per_chat_interval = per_chat_interval
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.max_retries = max_retries
+
+        self.chat_last_sent = {}
+        # После RetryAfter все отправки ждут до этого момента
+        self.paused_until = 0.0
+
+        self.metrics = {
+            'total': 0,
+            'sent': 0,
+            'failed': 0,
+            'retries': 0,
+            'retry_after': 0,
+            'duration': 0.0,
+            'rate': 0.0,
+        }
+
+    async def wait_for_chat(self, chat_id):
+        """Выдерживает паузу между сообщениями в один чат"""
+        last_sent = self.chat_last_sent.get(chat_id)
+        if last_sent is not None:
+            delay = last_sent + self.per_chat_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+    async def send(self, chat_id, text, **kwargs):
+        """Отправляет одно сообщение с повторами. Возвращает True при успехе."""
+        async with self.semaphore:
+            for attempt in range(self.max_retries + 1):
+                delay = self.paused_until - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                await self.wait_for_chat(chat_id)
+                await self.bucket.acquire()
+
+                try:
+                    self.chat_last_sent[chat_id] = time.monotonic()
+                    await self.bot.send_message(chat_id=chat_id, text=text, **kwargs)
+                    self.metrics['sent'] += 1
+                    return True
+                except TelegramRetryAfter as e:
+                    # Флуд-контроль - приостанавливаем всю рассылку
+                    self.metrics['retry_after'] += 1
+                    self.paused_until = max(self.paused_until, time.monotonic() + e.retry_after)
+                except (TelegramNetworkError, TelegramServerError):
+                    await asyncio.sleep(2 ** attempt)
+                except SendDropped as e:
+                    # Очередь отправки не дождалась своей очереди - сообщение не ушло
+                    logger.warning('Напоминание пользователю %s отброшено: %s', chat_id, e)
+                    break
+                except TelegramAPIError as e:
+                    # Пользователь заблокировал бота, чат не найден и т.п. - повторять бессмысленно
+                    logger.warning('Ошибка отправки напоминания пользователю %s: %s', chat_id, e)
+                    break
+                except Exception:
+                    # Непредвиденная ошибка одной отправки не должна остановить рассылку остальным
+                    logger.exception('Сбой отправки напоминания пользователю %s', chat_id)
+                    break
+
+                if attempt < self.max_retries:
+                    self.metrics['retries'] += 1
+
+            self.metrics['failed'] += 1
+            return False
+
+    async def broadcast(self, messages, **kwargs):
+        """
+        Рассылает сообщения [(chat_id, text), ...].
+        Возвращает метрики: total, sent, failed, retries, retry_after, duration, rate.
+        """
+        messages = list(messages)
+        self.metrics['total'] += len(messages)
+
+        started = time.monotonic()
+        await asyncio.gather(*(self.send(chat_id, text, **kwargs) for chat_id, text in messages))
+        self.metrics['duration'] = time.monotonic() - started
+        if self.metrics['duration'] > 0:
+            self.metrics['rate'] = self.metrics['sent'] / self.metrics['duration']
+
+        return self.metrics
+
+
+@db_task
 def get_users_for_reminders():
     """Возвращает пользователей с привязанными Telegram аккаунтами"""
     return list(UserProfile.objects.filter(telegram_id__isnull=False))
 
 
-@sync_to_async
-def get_random_words(count=3):
-    """Возвращает случайные слова для напоминания"""
-    words = list(Word.objects.all())
-    if len(words) > count:
-        return random.sample(words, count)
-    return words
+def build_reminder_digests(user_ids, limit=REMINDER_DIGEST_SIZE, now=None):
+    """
+    Сводки для напоминаний: сколько слов пора повторить и первые limit из них.
+    Одним запросом с оконными функциями на пачку пользователей.
+    Возвращает {user_id: {'due_count': N, 'words': [UserWord, ...]}};
+    пользователей без слов к повторению в результате нет.
+    """
+    now = now or timezone.now()
+    user_ids = list(user_ids)
+    digests = {}
 
+    for start in range(0, len(user_ids), REMINDER_DIGEST_BATCH_SIZE):
+        batch = user_ids[start:start + REMINDER_DIGEST_BATCH_SIZE]
+        due_words = (
+            UserWord.objects
+            .filter(user_id__in=batch, next_review__lte=now)
+            .annotate(
+                rank=Window(
+                    RowNumber(),
+                    partition_by=F('user_id'),
+                    order_by=[F('next_review').asc(), F('id').asc()],
+                ),
+                due_count=Window(Count('id'), partition_by=F('user_id')),
+            )
+            .filter(rank__lte=limit)
+            .select_related('word')
+            .order_by('user_id', 'rank')
+        )
 
-async def send_reminder_to_user(bot, user_profile):
-    """Отправляет напоминание конкретному пользователю"""
-    try:
-        words = await get_random_words(3)
+        for user_word in due_words:
+            digest = digests.setdefault(user_word.user_id, {'due_count': user_word.due_count, 'words': []})
+            digest['words'].append(user_word)
 
-        if not words:
-            return False
+    return digests
 
-        words_list = "\n".join([f"• {word.original} - {word.translation}" for word in words])
 
-        await bot.send_message(
-            chat_id=user_profile.telegram_id,
-            text=f"🔔 <b>Пора повторить слова!</b>\n\n"
-                 f"{words_list}\n\n"
-                 f"💡 <i>Используйте /quiz для теста или /cards для карточек</i>",
-            parse_mode='HTML'
-        )
-        return True
-    except Exception as e:
-        print(f"Ошибка отправки напоминания пользователю {user_profile.telegram_id}: {e}")
-        return False
+def format_reminder(digest):
+    """Текст напоминания со словами, которые пора повторить"""
+    words_list = "\n".join(
+        [f"• {user_word.word.original} - {user_word.word.translation}" for user_word in digest['words']]
+    )
+    more = digest['due_count'] - len(digest['words'])
+    more_text = f"\n<i>...и еще {more}</i>" if more > 0 else ""
+    return (
+        f"🔔 <b>Пора повторить слова!</b>\n"
+        f"К повторению: <b>{digest['due_count']}</b>\n\n"
+        f"{words_list}{more_text}\n\n"
+        f"💡 <i>Используйте /quiz для теста или /cards для карточек</i>"
+    )
+
+
+async def send_reminders(bot, users):
+    """
+    Отправляет напоминания указанным пользователям (UserProfile).
+    Тем, у кого нечего повторять, сообщение не отправляется.
+    """
+    if not users:
+        return None
+
+    digests = await db_task(build_reminder_digests)([user.user_id for user in users])
+    messages = [
+        (user.telegram_id, format_reminder(digests[user.user_id]))
+        for user in users
+        if user.user_id in digests
+    ]
+
+    if not messages:
+        print("Нет пользователей со словами к повторению")
+        return None
+
+    metrics = await ReminderBroadcaster(bot).broadcast(messages, parse_mode='HTML')
+
+    print(
+        f"📨 Отправлено напоминаний: {metrics['sent']}/{metrics['total']} "
+        f"(пропущено без слов к повторению: {len(users) - len(messages)}) "
+        f"за {metrics['duration']:.1f} с ({metrics['rate']:.1f} сообщ./с), "
+        f"ошибок: {metrics['failed']}, повторов: {metrics['retries']}, RetryAfter: {metrics['retry_after']}"
+    )
+    return metrics
 
 
 async def send_daily_reminders(bot):
-    """Отправляет ежедневные напоминания всем пользователям"""
+    """Отправляет напоминания сразу всем пользователям"""
     users = await get_users_for_reminders()
 
     if not users:
         print("Нет пользователей для напоминаний")
-        return
-
-    success_count = 0
-    for user in users:
-        if await send_reminder_to_user(bot, user):
-            success_count += 1
-        await asyncio.sleep(1)  # Пауза между отправками
+        return None
 
-    print(f"📨 Отправлено напоминаний: {success_count}/{len(users)}")
+    return await send_reminders(bot, users)
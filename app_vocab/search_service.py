@@ -0,0 +1,210 @@
+# app_vocab/search_service.py
+
+import difflib
+import os
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import SEARCH_KEY_FIELDS, Word, search_key
+
+
+# Сколько слов по умолчанию возвращает поиск
+SEARCH_LIMIT = int(os.getenv('SEARCH_LIMIT', 20))
+# Сколько кандидатов каждого вида берем из индекса перед ранжированием
+SEARCH_CANDIDATES = int(os.getenv('SEARCH_CANDIDATES', 200))
+# Похожими (fuzzy) считаются слова с похожестью не ниже этой
+FUZZY_MIN_SIMILARITY = float(os.getenv('SEARCH_FUZZY_MIN_SIMILARITY', 0.5))
+# Сколько строк индекса можно перебрать при поиске похожих слов: частые триграммы
+# ("ing", "ово") совпадают с большой частью словаря, их пропускаем
+FUZZY_MAX_ROWS = int(os.getenv('SEARCH_FUZZY_MAX_ROWS', 20000))
+
+# Поля слова, по которым идет поиск (в том же порядке, что в индексе FTS5)
+SEARCH_FIELDS = ('original', 'translation', 'transcription')
+# Триграммный индекс находит только строки от трех символов
+TRIGRAM_MIN_LENGTH = 3
+
+# Виды совпадения по убыванию важности
+MATCH_EXACT, MATCH_PREFIX, MATCH_SUBSTRING, MATCH_FUZZY = range(4)
+
+
+def fts_phrase(text):
+    """Строка как фраза запроса FTS5 (кавычки внутри удваиваются)"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def trigrams(text):
+    text = text.casefold()
+    return {text[i:i + TRIGRAM_MIN_LENGTH] for i in range(len(text) - TRIGRAM_MIN_LENGTH + 1)}
+
+
+def words_containing(query, prefix=''):
+    """
+    Условие "слово содержит query" (без учета регистра) в любом из полей поиска.
+    prefix - путь до слова, например 'word__' для UserWord.
+    В SQLite идет через таблицу FTS5, в PostgreSQL - через триграммные индексы.
+    """
+    if connection.vendor == 'sqlite' and len(query) >= TRIGRAM_MIN_LENGTH:
+        return Q(**{f'{prefix}id__in': RawSQL(
+            'SELECT rowid FROM app_vocab_word_fts WHERE app_vocab_word_fts MATCH %s', [fts_phrase(query)]
+        )})
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{prefix}{field}__icontains': query})
+    return condition
+
+
+def scoped_words(user_id=None):
+    """Слова, среди которых идет поиск: все или (user_id) только из словаря пользователя"""
+    if user_id is None:
+        return Word.objects.all()
+    return Word.objects.filter(userword__user_id=user_id)
+
+
+def scope_sql(user_id=None):
+    """То же условие для сырых запросов по id слова: SQL и параметры"""
+    if user_id is None:
+        return '', []
+    return ' AND {} IN (SELECT word_id FROM app_vocab_userword WHERE user_id = %s)', [user_id]
+
+
+def exact_candidates(query, user_id=None):
+    """
+    Слова, совпадающие с query целиком или по началу - по индексам ключей поиска
+    (слово и перевод в casefold, см. Word.search_original), без учета регистра.
+    """
+    key = search_key(query)
+    # Порядок не нужен - результаты ранжирует match_rank
+    words = list(
+        scoped_words(user_id).filter(Q(search_original=key) | Q(search_translation=key))
+        .order_by()[:SEARCH_CANDIDATES]
+    )
+    for field in SEARCH_KEY_FIELDS.values():
+        if connection.vendor == 'sqlite':
+            # Диапазон по индексу (ключ, id): LIKE в SQLite индекс не использует
+            condition = Q(**{f'{field}__gte': key, f'{field}__lt': key + '\U0010ffff'})
+        else:
+            condition = Q(**{f'{field}__startswith': key})
+        words += scoped_words(user_id).filter(condition).order_by(field, 'id')[:SEARCH_CANDIDATES]
+    return words
+
+
+def fts_ids(match, ranked=True, user_id=None):
+    """id слов по запросу FTS5: лучшие по рангу bm25 или (ranked=False) первые найденные"""
+    order = 'ORDER BY rank' if ranked else ''
+    scope, scope_params = scope_sql(user_id)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM app_vocab_word_fts WHERE app_vocab_word_fts MATCH %s'
+            f'{scope.format("rowid")} {order} LIMIT %s',
+            [match, *scope_params, SEARCH_CANDIDATES],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def substring_candidates(query, user_id=None):
+    """
+    Слова, содержащие query. Без ранжирования: частая подстрока совпадает
+    с большей частью словаря, а точные и по началу слова берутся отдельно.
+    """
+    if len(query) < TRIGRAM_MIN_LENGTH:
+        # Одна-две буквы - только совпадения по началу слова
+        return []
+    if connection.vendor == 'sqlite':
+        return list(Word.objects.filter(id__in=fts_ids(fts_phrase(query), ranked=False, user_id=user_id)))
+    return list(scoped_words(user_id).filter(words_containing(query))[:SEARCH_CANDIDATES])
+
+
+def rare_trigrams(grams):
+    """
+    Самые редкие триграммы запроса, вместе встречающиеся не более чем в FUZZY_MAX_ROWS
+    строках: ранжировать bm25 все слова с частой триграммой слишком долго.
+    """
+    placeholders = ', '.join(['%s'] * len(grams))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT term, doc FROM app_vocab_word_fts_vocab WHERE term IN ({placeholders}) ORDER BY doc',
+            list(grams),
+        )
+        counts = cursor.fetchall()
+
+    selected = []
+    total = 0
+    for gram, count in counts:
+        if selected and total + count > FUZZY_MAX_ROWS:
+            break
+        selected.append(gram)
+        total += count
+    return selected
+
+
+def fuzzy_candidates(query, user_id=None):
+    """Слова, у которых много общих с query триграмм (опечатки, другие формы слова)"""
+    grams = trigrams(query)
+    if not grams:
+        return []
+
+    if connection.vendor == 'sqlite':
+        grams = rare_trigrams(grams)
+        if not grams:
+            return []
+        ids = fts_ids(' OR '.join(fts_phrase(gram) for gram in grams), user_id=user_id)
+    elif connection.vendor == 'postgresql':
+        # Оператор % pg_trgm: похожесть выше pg_trgm.similarity_threshold (0.3)
+        condition = ' OR '.join(f'UPPER({field}) %% UPPER(%s)' for field in SEARCH_FIELDS)
+        order = ', '.join(f'similarity(UPPER({field}), UPPER(%s))' for field in SEARCH_FIELDS)
+        scope, scope_params = scope_sql(user_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id FROM app_vocab_word WHERE ({condition}){scope.format("id")} '
+                f'ORDER BY GREATEST({order}) DESC LIMIT %s',
+                [query] * len(SEARCH_FIELDS) + scope_params + [query] * len(SEARCH_FIELDS) + [SEARCH_CANDIDATES],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+    else:
+        return []
+    return list(Word.objects.filter(id__in=ids))
+
+
+def match_rank(word, query):
+    """Ключ сортировки результатов: вид совпадения, похожесть, длина слова"""
+    needle = query.casefold()
+    values = [(getattr(word, field) or '').casefold() for field in SEARCH_FIELDS]
+    if needle in values:
+        kind = MATCH_EXACT
+    elif any(value.startswith(needle) for value in values):
+        kind = MATCH_PREFIX
+    elif any(needle in value for value in values):
+        kind = MATCH_SUBSTRING
+    else:
+        kind = MATCH_FUZZY
+    similarity = max(difflib.SequenceMatcher(None, needle, value).ratio() for value in values)
+    return kind, -similarity, len(word.original), word.id
+
+
+def search_words(query, limit=SEARCH_LIMIT, fuzzy=True, user_id=None):
+    """
+    Поиск слов по написанию, переводу и транскрипции без учета регистра.
+    Сначала точные совпадения, затем по началу слова, затем по подстроке,
+    затем (fuzzy=True) похожие слова. Внутри группы - по похожести и длине.
+    user_id - искать только в словаре пользователя.
+    """
+    query = ' '.join(query.split())
+    if not query:
+        return []
+
+    # Группы идут строго по порядку, поэтому следующую ищем, только если слов не хватает
+    candidates = {word.id: word for word in exact_candidates(query, user_id)}
+    if len(candidates) < limit:
+        for word in substring_candidates(query, user_id):
+            candidates.setdefault(word.id, word)
+    if fuzzy and len(candidates) < limit:
+        for word in fuzzy_candidates(query, user_id):
+            candidates.setdefault(word.id, word)
+
+    ranked = sorted(((match_rank(word, query), word) for word in candidates.values()), key=lambda item: item[0])
+    return [
+        word for (kind, similarity, length, pk), word in ranked
+        if kind != MATCH_FUZZY or -similarity >= FUZZY_MIN_SIMILARITY
+    ][:limit]
@@ -0,0 +1,257 @@
+# app_vocab/send_queue.py
+import asyncio
+import collections
+import contextvars
+import logging
+import os
+import time
+
+from aiogram.client.default import Default
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from .bot_metrics import current_update
+
+
+logger = logging.getLogger('app_vocab.send_queue')
+
+# Лимиты Telegram: около 1 сообщения в секунду в чат (с небольшими всплесками)
+# и около 30 в секунду на бота. У каждого процесса webhook свой лимит -
+# BOT_SEND_GLOBAL_RATE делим на число воркеров.
+SEND_CHAT_RATE = float(os.getenv('BOT_SEND_CHAT_RATE', 1))
+SEND_CHAT_BURST = int(os.getenv('BOT_SEND_CHAT_BURST', 5))
+SEND_GLOBAL_RATE = float(os.getenv('BOT_SEND_GLOBAL_RATE', 30))
+# Сколько запросов может ждать отправки в процессе; дальше обработчики ждут места
+SEND_QUEUE_LIMIT = int(os.getenv('BOT_SEND_QUEUE_LIMIT', 1000))
+# Запрос, не отправленный за это время, сек, отбрасывается
+SEND_MAX_DELAY = float(os.getenv('BOT_SEND_MAX_DELAY', 30))
+# Сколько раз повторяем запрос после ответа 429 (RetryAfter)
+SEND_MAX_RETRIES = 3
+
+# Предельная длина текста сообщения Telegram
+MESSAGE_MAX_LENGTH = 4096
+# Поля SendMessage, с которыми сообщения можно склеить (остальные должны быть не заданы)
+MERGEABLE_FIELDS = {'chat_id', 'text', 'parse_mode', 'reply_markup'}
+
+# Запрос отправляет сама очередь - middleware пропускает его дальше
+sending_from_queue = contextvars.ContextVar('sending_from_queue', default=False)
+
+
+class SendDropped(Exception):
+    """Запрос отброшен очередью: переполнение или истекло время ожидания"""
+
+
+class TokenBucket:
+    """Ограничитель частоты: rate запросов в секунду, всплеск до burst"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Занимает место и возвращает, сколько секунд подождать перед отправкой"""
+        self.refill()
+        self.tokens -= 1
+        return 0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def pause(self, seconds):
+        """Не выдавать мест ближайшие seconds секунд (после RetryAfter)"""
+        self.refill()
+        self.tokens = min(self.tokens, 0) - seconds * self.rate
+
+
+class OutgoingRequest:
+    def __init__(self, bot, method, future):
+        self.bot = bot
+        self.method = method
+        # None - отправка без ожидания результата (post)
+        self.future = future
+        self.update = current_update.get()
+        self.created = time.monotonic()
+
+
+class ChatQueue:
+    def __init__(self, rate, burst):
+        self.requests = collections.deque()
+        self.bucket = TokenBucket(rate, burst)
+
+
+def can_merge(first, second):
+    """Два текстовых сообщения в один чат можно отправить одним"""
+    if not (isinstance(first, SendMessage) and isinstance(second, SendMessage)):
+        return False
+    if first.reply_markup is not None or str(first.parse_mode) != str(second.parse_mode):
+        return False
+    if len(first.text) + len(second.text) + 2 > MESSAGE_MAX_LENGTH:
+        return False
+    return all(
+        getattr(method, field) is None or isinstance(getattr(method, field), Default)
+        for method in (first, second)
+        for field in SendMessage.model_fields.keys() - MERGEABLE_FIELDS
+    )
+
+
+class SendQueue:
+    """
+    Очередь исходящих запросов к Bot API: по одной на чат, с общим лимитом на процесс.
+    Запросы в чат уходят по порядку; подряд идущие тексты без клавиатуры
+    склеиваются со следующим сообщением. На 429 чат ставится на паузу retry_after
+    и запрос повторяется. Переполненная очередь задерживает обработчики,
+    а запросы, ждавшие дольше SEND_MAX_DELAY, отбрасываются: ожидающий результата
+    получает последний TelegramRetryAfter, если повторы кончились из-за 429, иначе SendDropped.
+    """
+
+    def __init__(self, chat_rate=SEND_CHAT_RATE, chat_burst=SEND_CHAT_BURST, global_rate=SEND_GLOBAL_RATE,
+                 limit=SEND_QUEUE_LIMIT, max_delay=SEND_MAX_DELAY, max_retries=SEND_MAX_RETRIES):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.limit = limit
+        self.max_delay = max_delay
+        self.max_retries = max_retries
+        self.chats = {}
+        # Ссылки на задачи отправки, чтобы их не собрал сборщик мусора
+        self.tasks = set()
+        self.pending = 0
+        self.metrics = {
+            'sent': 0,
+            'coalesced': 0,
+            'retries': 0,
+            'dropped': 0,
+            'throttled': 0,
+            'max_pending': 0,
+        }
+
+    async def submit(self, bot, method):
+        """Ставит запрос в очередь чата и ждет его результата"""
+        future = asyncio.get_running_loop().create_future()
+        await self.enqueue(OutgoingRequest(bot, method, future))
+        return await future
+
+    async def post(self, method, bot=None):
+        """Ставит запрос в очередь, не дожидаясь отправки (порядок в чате сохраняется)"""
+        await self.enqueue(OutgoingRequest(bot or method.bot, method, None))
+
+    async def enqueue(self, request):
+        if self.pending >= self.limit:
+            # Обратное давление: обработчик ждет, пока очередь разгрузится
+            self.metrics['throttled'] += 1
+            while self.pending >= self.limit:
+                if time.monotonic() - request.created > self.max_delay:
+                    self.drop([request], 'очередь переполнена')
+                    return
+                await asyncio.sleep(0.01)
+
+        key = (request.bot.id, request.method.chat_id)
+        queue = self.chats.get(key)
+        if queue is None:
+            queue = self.chats[key] = ChatQueue(self.chat_rate, self.chat_burst)
+            task = asyncio.create_task(self.drain(key, queue))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+        queue.requests.append(request)
+        self.pending += 1
+        self.metrics['max_pending'] = max(self.metrics['max_pending'], self.pending)
+
+    async def drain(self, key, queue):
+        """Отправляет запросы чата, пока они есть"""
+        sending_from_queue.set(True)
+        try:
+            while queue.requests:
+                # Пакет собираем после ожидания лимита: пока чат ждет,
+                # подряд идущие тексты успевают склеиться в одно сообщение
+                await asyncio.sleep(self.wait_time(queue))
+                batch = [queue.requests.popleft()]
+                while queue.requests and can_merge(batch[-1].method, queue.requests[0].method):
+                    batch.append(queue.requests.popleft())
+                self.pending -= len(batch)
+                await self.deliver(queue, batch)
+        finally:
+            del self.chats[key]
+
+    def wait_time(self, queue):
+        """Сколько ждать следующей отправки в чат с учетом лимита чата и общего"""
+        return max(queue.bucket.reserve(), self.global_bucket.reserve())
+
+    async def deliver(self, queue, batch):
+        method = batch[-1].method
+        if len(batch) > 1:
+            method = method.model_copy(update={'text': '\n\n'.join(request.method.text for request in batch)})
+            self.metrics['coalesced'] += len(batch) - 1
+
+        retry_after = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                await asyncio.sleep(self.wait_time(queue))
+            if time.monotonic() - batch[0].created > self.max_delay:
+                break
+
+            current_update.set(batch[-1].update)
+            try:
+                result = await batch[-1].bot(method)
+            except TelegramRetryAfter as e:
+                self.metrics['retries'] += 1
+                queue.bucket.pause(e.retry_after)
+                retry_after = e
+                continue
+            except Exception as e:
+                # Отправленные без ожидания никто не проверит - пишем ошибку в журнал
+                if any(request.future is None for request in batch):
+                    logger.exception('Не удалось отправить %s в чат %s', type(method).__name__, method.chat_id)
+                for request in batch:
+                    if request.future is not None and not request.future.done():
+                        request.future.set_exception(e)
+                return
+
+            self.metrics['sent'] += 1
+            for request in batch:
+                if request.future is not None and not request.future.done():
+                    request.future.set_result(result)
+            return
+
+        self.drop(batch, 'превышены повторы или время ожидания', retry_after)
+
+    def drop(self, batch, reason, error=None):
+        self.metrics['dropped'] += len(batch)
+        logger.warning('Отброшено запросов в чат %s: %d (%s)', batch[0].method.chat_id, len(batch), reason)
+        for request in batch:
+            if request.future is not None and not request.future.done():
+                request.future.set_exception(error or SendDropped(reason))
+
+    def stats(self):
+        """Снимок метрик очереди"""
+        return dict(self.metrics, pending=self.pending, chats=len(self.chats))
+
+    def render_prometheus(self):
+        """Метрики очереди в текстовом формате Prometheus"""
+        stats = self.stats()
+        lines = []
+        for name in ('sent', 'coalesced', 'retries', 'dropped', 'throttled'):
+            lines += [f'# TYPE bot_send_queue_{name}_total counter', f'bot_send_queue_{name}_total {stats[name]}']
+        for name in ('pending', 'max_pending', 'chats'):
+            lines += [f'# TYPE bot_send_queue_{name} gauge', f'bot_send_queue_{name} {stats[name]}']
+        return '\n'.join(lines) + '\n'
+
+
+send_queue = SendQueue()
+
+
+class SendQueueMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: запросы, адресованные чату, идут через очередь"""
+
+    def __init__(self, queue=send_queue):
+        self.queue = queue
+
+    async def __call__(self, make_request, bot, method):
+        if sending_from_queue.get() or getattr(method, 'chat_id', None) is None:
+            return await make_request(bot, method)
+        return await self.queue.submit(bot, method)
@@ -2,6 +2,7 @@
 
 from django.utils import timezone
 from .models import Word, UserWord, UserProfile
+from .cache_service import cached_for_user
 import random
 
 from django.contrib.auth.models import User
@@ -15,6 +16,14 @@ def get_or_create_user_profile(user):
     return profile
 
 
+def get_cached_user_profile(user):
+    """
+    Профиль пользователя из кэша - только для чтения настроек.
+    Если профиль будет изменен и сохранен, берите get_or_create_user_profile.
+    """
+    return cached_for_user(user.id, 'profile', lambda: get_or_create_user_profile(user))
+
+
 def get_or_create_user_word(user, word):
     """
     Получает или создает запись прогресса пользователя для слова.
@@ -34,7 +43,7 @@ def get_today_words(user, limit=None):
     Возвращает слова для повторения сегодня с учетом настроек пользователя.
     """
     today = timezone.now()
-    profile = get_or_create_user_profile(user)
+    profile = get_cached_user_profile(user)
 
     # Используем лимит из настроек, если не указан явно
     if limit is None:
@@ -89,9 +98,13 @@ def process_user_answer(user_word, quality):
 
 def get_user_statistics(user):
     """
-    Возвращает статистику пользователя.
+    Возвращает статистику пользователя (из кэша, пока он ничего не менял).
     """
-    profile = get_or_create_user_profile(user)
+    return cached_for_user(user.id, 'statistics', lambda: compute_user_statistics(user))
+
+
+def compute_user_statistics(user):
+    profile = get_cached_user_profile(user)
     user_words = UserWord.objects.filter(user=user)
 
     total_words = user_words.count()
@@ -148,26 +161,19 @@ def get_words_for_games(user, min_words=6):
     return unique_words[:12]  # Ограничим для удобства игры
 
 
-from asgiref.sync import sync_to_async
-
-
-@sync_to_async
-def get_quiz_question_async():
-    """Асинхронная версия генерации вопроса для теста"""
-    return get_quiz_question()
-
-
-def get_quiz_question():
-    """Генерирует вопрос для теста в боте"""
+def get_quiz_question(user_id=None):
+    """Генерирует вопрос для теста в боте (из словаря пользователя, если указан user_id)"""
     from .models import Word
     import random
 
-    # Простая синхронная версия получения случайных слов
-    all_words = list(Word.objects.all())
-    if len(all_words) < 4:
-        return None
+    words = Word.objects.all()
+    if user_id is not None:
+        words = words.filter(userword__user_id=user_id)
 
-    words = random.sample(all_words, 4)
+    # Случайные слова выбирает база - таблица целиком в память не читается
+    words = list(words.order_by('?')[:4])
+    if len(words) < 4:
+        return None
 
     # Случайно выбираем тип вопроса
     question_type = random.choice(['word_to_translation', 'translation_to_word'])
@@ -193,26 +199,24 @@ def get_quiz_question():
     }
 
 
-@sync_to_async
-def get_review_cards_async():
-    """Асинхронная версия получения карточек для повторения"""
-    return get_review_cards()
-
-
-def get_review_cards():
-    """Возвращает карточки для повторения"""
+def get_review_cards(user_id=None, limit=10):
+    """
+    Возвращает карточки для повторения. Для пользователя - сначала слова,
+    которые пора повторить, остальное добирается случайными словами его словаря.
+    """
     from .models import Word
-    import random
-
-    # Получаем все слова из базы
-    all_words = list(Word.objects.all())
 
-    if not all_words:
-        return []
-
-    # Берем случайные слова для повторения (максимум 10)
-    num_cards = min(10, len(all_words))
-    selected_words = random.sample(all_words, num_cards)
+    if user_id is None:
+        selected_words = list(Word.objects.order_by('?')[:limit])
+    else:
+        deck = UserWord.objects.filter(user_id=user_id).select_related('word')
+        due = list(deck.filter(next_review__lte=timezone.now()).order_by('next_review')[:limit])
+        if len(due) < limit:
+            due += list(
+                deck.exclude(id__in=[user_word.id for user_word in due])
+                .order_by('?')[:limit - len(due)]
+            )
+        selected_words = [user_word.word for user_word in due]
 
 
     # Формируем карточки
@@ -0,0 +1,76 @@
+# app_vocab/signals.py
+
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Word, UserWord, DeckChange, UserProfile
+from .sync_service import record_changes
+from .cache_service import invalidate_user_cache
+from .db_router import pin_user
+
+
+# ===== ЖУРНАЛ ИЗМЕНЕНИЙ ДЛЯ СИНХРОНИЗАЦИИ =====
+# Массовые операции (bulk_create/bulk_update) сигналов не вызывают,
+# поэтому импорт и применение дельты пишут журнал сами.
+
+@receiver(pre_save, sender=Word)
+def remember_old_original(sender, instance, **kwargs):
+    """Запоминает прежнее написание слова, чтобы отследить переименование"""
+    instance._old_original = None
+    if instance.pk:
+        instance._old_original = (
+            Word.objects.filter(pk=instance.pk).values_list('original', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Word)
+def track_word_change(sender, instance, created, **kwargs):
+    """Изменение общего слова - изменение словарей всех пользователей с этим словом"""
+    if created:
+        return
+
+    user_words = UserWord.objects.filter(word=instance)
+    user_words.update(word_original=instance.original, word_translation=instance.translation)
+    user_ids = list(user_words.values_list('user_id', flat=True))
+    old_original = getattr(instance, '_old_original', None)
+
+    for user_id in user_ids:
+        if old_original and old_original != instance.original:
+            record_changes(user_id, [old_original], DeckChange.ACTION_DELETE)
+        record_changes(user_id, [instance.original], DeckChange.ACTION_UPSERT)
+
+
+@receiver(post_save, sender=UserWord)
+def track_user_word_change(sender, instance, created, **kwargs):
+    """
+    Добавление слова попадает в журнал. Повторение (прогресс SM-2) журнал не пишет -
+    это самый частый путь записи; его номер изменения UserWord.save() ставит
+    в том же UPDATE. Кэш и отметку реплики сбрасываем в обоих случаях.
+    """
+    if created:
+        record_changes(instance.user_id, [instance.word.original], DeckChange.ACTION_UPSERT)
+    else:
+        pin_user(instance.user_id)
+        invalidate_user_cache(instance.user_id)
+
+
+@receiver(post_delete, sender=UserWord)
+def track_user_word_delete(sender, instance, **kwargs):
+    """Удаление слова из словаря"""
+    try:
+        original = instance.word.original
+    except Word.DoesNotExist:
+        return
+    record_changes(instance.user_id, [original], DeckChange.ACTION_DELETE)
+
+
+# ===== КЭШ ПРОФИЛЕЙ БОТА =====
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_cached_profile(sender, instance, **kwargs):
+    """Сохранение профиля (настройки на сайте, привязка в боте) сбрасывает его в кэше бота"""
+    from .bot_db import profile_cache
+    profile_cache.invalidate(telegram_id=instance.telegram_id, profile_id=instance.pk)
+    # Профиль входит в кэшированные страницы сайта
+    invalidate_user_cache(instance.user_id)
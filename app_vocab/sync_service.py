@@ -0,0 +1,234 @@
+# app_vocab/sync_service.py
+
+import heapq
+import itertools
+import json
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Word, UserWord, DeckChange, last_change_seq
+from .db_router import pin_user
+from .cache_service import invalidate_user_cache
+from .export_service import user_word_to_dict
+from .import_service import parse_jsonl_row, create_words
+
+
+# Сколько изменений обрабатываем за один раз
+SYNC_CHUNK_SIZE = 1000
+
+# Поля SM-2, которые переносятся при синхронизации
+PROGRESS_FIELDS = ['interval', 'repetition', 'ease_factor', 'next_review',
+                   'last_reviewed', 'correct_answers', 'wrong_answers']
+WORD_FIELDS = ['translation', 'transcription', 'example_sentence', 'difficulty_level']
+
+
+def record_changes(user_id, originals, action):
+    """
+    Записывает изменения слов пользователя в журнал.
+    Старые записи по этим словам удаляются, поэтому журнал не растет
+    быстрее словаря, а новый номер изменения всегда больше прежнего.
+    Через журнал проходят все изменения состава словаря, поэтому здесь же
+    сбрасывается кэш пользователя и он на время переключается
+    на чтение из основной базы (повторения делают это сами, см. signals.py).
+    """
+    originals = list(originals)
+    if not originals:
+        return
+
+    DeckChange.objects.filter(user_id=user_id, original__in=originals).delete()
+    # Номера изменений вычисляются в том же INSERT
+    last_seq = last_change_seq(user_id)
+    DeckChange.objects.bulk_create([
+        DeckChange(user_id=user_id, original=original, action=action, change_seq=last_seq + number)
+        for number, original in enumerate(originals, 1)
+    ])
+    pin_user(user_id)
+    invalidate_user_cache(user_id)
+
+
+def get_sync_cursor(user):
+    """Номер последнего изменения словаря пользователя (0 - изменений нет)"""
+    cursor = User.objects.filter(pk=user.pk).values_list(last_change_seq(user.pk), flat=True).first()
+    return cursor or 0
+
+
+def stream_delta(user, since=0, until=None):
+    """
+    Генерирует JSONL с изменениями словаря после курсора since (до until включительно).
+    Каждая строка - {"op": "upsert", ...слово и прогресс SM-2} или {"op": "delete", "original": ...}.
+    """
+    if until is None:
+        until = get_sync_cursor(user)
+
+    # Журнал (добавления, изменения, удаления) и повторения, которые журнал не пишут,
+    # сливаются по номеру изменения
+    journal = (
+        DeckChange.objects
+        .filter(user=user, change_seq__gt=since, change_seq__lte=until)
+        .order_by('change_seq')
+        .values_list('change_seq', 'original', 'action')
+        .iterator(chunk_size=SYNC_CHUNK_SIZE)
+    )
+    reviews = (
+        (change_seq, original, DeckChange.ACTION_UPSERT)
+        for change_seq, original in UserWord.objects
+        .filter(user=user, change_seq__gt=since, change_seq__lte=until)
+        .order_by('change_seq')
+        .values_list('change_seq', 'word_original')
+        .iterator(chunk_size=SYNC_CHUNK_SIZE)
+    )
+    changes = heapq.merge(journal, reviews)
+
+    while True:
+        chunk = list(itertools.islice(changes, SYNC_CHUNK_SIZE))
+        if not chunk:
+            break
+
+        # Текущее состояние всех измененных слов пачки - одним запросом
+        upserts = [original for _, original, action in chunk if action == DeckChange.ACTION_UPSERT]
+        user_words = {
+            user_word.word.original: user_word
+            for user_word in UserWord.objects.filter(
+                user=user,
+                word__original__in=upserts,
+            ).select_related('word')
+        }
+
+        for _, original, action in chunk:
+            if action == DeckChange.ACTION_DELETE:
+                line = {'op': DeckChange.ACTION_DELETE, 'original': original}
+            elif original in user_words:
+                line = {'op': DeckChange.ACTION_UPSERT, **user_word_to_dict(user_words[original])}
+            else:
+                continue
+            yield json.dumps(line, ensure_ascii=False) + '\n'
+
+
+def apply_delta_chunk(user, lines):
+    """
+    Применяет пачку строк дельты к словарю пользователя.
+    Значения перезаписываются, а не накапливаются, поэтому повторное
+    применение той же дельты ничего не меняет.
+    """
+    stats = {'upserted': 0, 'deleted': 0, 'skipped': 0}
+
+    # Внутри пачки учитываем только последнее изменение каждого слова
+    upserts = {}
+    deletes = set()
+    for line in lines:
+        try:
+            row = json.loads(line)
+            op = row.get('op')
+        except (ValueError, AttributeError):
+            row, op = {}, None
+
+        if op == DeckChange.ACTION_DELETE:
+            original = (row.get('original') or '').strip()
+            if original:
+                upserts.pop(original, None)
+                deletes.add(original)
+                continue
+        elif op == DeckChange.ACTION_UPSERT:
+            data = parse_jsonl_row(line)
+            if data is not None:
+                deletes.discard(data['original'])
+                upserts[data['original']] = data
+                continue
+
+        stats['skipped'] += 1
+
+    with transaction.atomic():
+        if deletes:
+            # Журнал удалений пополняется сигналом post_delete
+            stats['deleted'], _ = UserWord.objects.filter(
+                user=user,
+                word__original__in=deletes,
+            ).delete()
+
+        if upserts:
+            existing = {
+                user_word.word.original: user_word
+                for user_word in UserWord.objects.filter(
+                    user=user,
+                    word__original__in=upserts,
+                ).select_related('word')
+            }
+
+            # Слова, которые есть и в словарях других пользователей, не меняем -
+            # пользователь получает свою копию
+            shared_ids = set(
+                UserWord.objects.filter(word_id__in=[user_word.word_id for user_word in existing.values()])
+                .exclude(user=user)
+                .values_list('word_id', flat=True)
+            )
+
+            # Обновляем существующие слова
+            changed_words = []
+            copied_words = []
+            changed_user_words = []
+            for original, user_word in existing.items():
+                data = upserts[original]
+                word = user_word.word
+                if any(field in data and getattr(word, field) != data[field] for field in WORD_FIELDS):
+                    if word.id in shared_ids:
+                        word.pk = None
+                        copied_words.append(user_word)
+                    else:
+                        changed_words.append(word)
+                    for field in WORD_FIELDS:
+                        if field in data:
+                            setattr(word, field, data[field])
+                for field, value in data['progress'].items():
+                    setattr(user_word, field, value)
+                user_word.word_original = word.original
+                user_word.word_translation = word.translation
+                changed_user_words.append(user_word)
+
+            Word.objects.bulk_update(changed_words, WORD_FIELDS)
+            create_words([user_word.word for user_word in copied_words])
+            for user_word in copied_words:
+                user_word.word_id = user_word.word.id
+            UserWord.objects.bulk_update(
+                changed_user_words, PROGRESS_FIELDS + ['word', 'word_original', 'word_translation']
+            )
+
+            # Добавляем новые
+            new_data = [data for original, data in upserts.items() if original not in existing]
+            words = create_words([
+                Word(
+                    original=data['original'],
+                    translation=data['translation'],
+                    transcription=data['transcription'],
+                    example_sentence=data['example_sentence'],
+                    difficulty_level=data['difficulty_level'],
+                )
+                for data in new_data
+            ])
+            UserWord.objects.bulk_create([
+                UserWord(user=user, word=word, **data['progress'])
+                for word, data in zip(words, new_data)
+            ])
+
+            record_changes(user.id, upserts, DeckChange.ACTION_UPSERT)
+            stats['upserted'] = len(upserts)
+
+    return stats
+
+
+def apply_delta(user, lines, chunk_size=SYNC_CHUNK_SIZE):
+    """
+    Применяет дельту (результат stream_delta) к словарю пользователя пачками.
+    Возвращает статистику: upserted, deleted, skipped.
+    """
+    totals = {'upserted': 0, 'deleted': 0, 'skipped': 0}
+    lines = (line for line in lines if line.strip())
+
+    while True:
+        chunk = list(itertools.islice(lines, chunk_size))
+        if not chunk:
+            break
+        for key, value in apply_delta_chunk(user, chunk).items():
+            totals[key] += value
+
+    return totals
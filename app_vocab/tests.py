@@ -1,3 +1,1331 @@
-from django.test import TestCase
+import ast
+import asyncio
+import contextlib
+import gc
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock, skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import DeckChange, UserProfile, UserWord, Word
+
+
+BOT_MODULE = Path(__file__).with_name('bot.py')
+# Вызовы, которые блокируют цикл событий или обходят пул bot_db
+BLOCKING_CALLS = {'sync_to_async', 'get_audio_url', 'text_to_speech'}
+
+
+class ImportTest(TestCase):
+    """Импорт словаря пачками: дубликаты, ошибочные строки"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('import_user', '', 'password')
+
+    def test_chunked_dedupe(self):
+        from .import_service import import_words, iter_csv_rows
+
+        Word.objects.create(original='fox', translation='лиса')
+        UserWord.objects.create(user=self.user, word=Word.objects.get(original='fox'))
+        csv_file = io.BytesIO('Слово,Перевод\ncat,кошка\ndog,собака\ncat,кот\nfox,лиса\n,пусто\nowl,сова\n'.encode())
+
+        # Повтор cat попадает в другую пачку - его отсекает проверка по словарю
+        stats = import_words(self.user, iter_csv_rows(csv_file), chunk_size=2)
+        self.assertEqual(stats, {'imported': 3, 'duplicates': 2, 'skipped': 1})
+        self.assertEqual(
+            sorted(UserWord.objects.filter(user=self.user).values_list('word__original', flat=True)),
+            ['cat', 'dog', 'fox', 'owl'],
+        )
+
+    def test_bad_jsonl_date_is_row_error(self):
+        from .import_service import import_words, iter_jsonl_rows
+
+        lines = [
+            {'original': 'good', 'translation': 'хорошо', 'next_review': '2030-01-01T00:00:00+00:00'},
+            {'original': 'bad', 'translation': 'плохо', 'next_review': 'завтра'},
+        ]
+        jsonl = io.BytesIO(''.join(json.dumps(line, ensure_ascii=False) + '\n' for line in lines).encode())
+
+        stats = import_words(self.user, iter_jsonl_rows(jsonl))
+        self.assertEqual((stats['imported'], stats['skipped']), (1, 1))
+        self.assertEqual(UserWord.objects.get(user=self.user).next_review.year, 2030)
+
+    def test_job_rows_and_spool_cleanup(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .import_service import create_import_job, run_import_job
+
+        with tempfile.TemporaryDirectory() as spool, self.settings(IMPORT_SPOOL_DIR=spool):
+            # Заголовок, перенос внутри кавычек и нет перевода строки в конце
+            csv_file = SimpleUploadedFile('words.csv', 'Слово,Перевод\ncat,"кошка\nкот"\ndog,собака'.encode())
+            job = create_import_job(self.user, csv_file)
+            self.assertEqual(job.total_rows, 2)
+            run_import_job(job)
+            self.assertEqual((job.status, job.rows_processed), ('done', 2))
+
+            # Файл упавшей задачи тоже удаляется
+            job = create_import_job(self.user, SimpleUploadedFile('deck.apkg', b'not a zip'))
+            self.assertEqual(job.total_rows, 0)
+            run_import_job(job)
+            self.assertEqual(job.status, 'failed')
+            self.assertEqual(os.listdir(spool), [])
+
+    def test_job_resumes_after_crash(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from .import_service import create_import_job, run_import_job
+
+        with tempfile.TemporaryDirectory() as spool, self.settings(IMPORT_SPOOL_DIR=spool):
+            lines = ''.join(f'word{i},слово{i}\n' for i in range(5))
+            job = create_import_job(self.user, SimpleUploadedFile('words.csv', f'Слово,Перевод\n{lines}'.encode()))
+            # Обработчик упал после первой пачки из двух строк
+            job.status, job.rows_processed, job.imported_count = 'running', 2, 2
+            job.save()
+
+            run_import_job(job, chunk_size=2)
+            self.assertEqual((job.status, job.rows_processed, job.imported_count), ('done', 5, 5))
+            self.assertEqual(
+                sorted(UserWord.objects.filter(user=self.user).values_list('word__original', flat=True)),
+                ['word2', 'word3', 'word4'],
+            )
+
+
+class ExportTest(TestCase):
+    """Экспорт CSV, JSONL и .apkg читается импортом без потерь"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('export_user', '', 'password')
+        self.other = User.objects.create_user('export_other', '', 'password')
+        now = timezone.now().replace(microsecond=0)
+        for i in range(3):
+            word = Word.objects.create(original=f'export{i}', translation=f'экспорт{i}', transcription=f'[e{i}]',
+                                       example_sentence=f'Example {i}', difficulty_level=i)
+            UserWord.objects.create(user=self.user, word=word, interval=i + 1, repetition=i, ease_factor=2.5 - i / 10,
+                                    next_review=now + timedelta(days=i), last_reviewed=now,
+                                    correct_answers=i, wrong_answers=1)
+
+    def test_csv_round_trip(self):
+        from .export_service import stream_csv
+        from .import_service import iter_csv_rows
+
+        csv_file = io.BytesIO(''.join(stream_csv(self.user)).encode())
+        self.assertEqual(list(iter_csv_rows(csv_file)), [
+            {'original': f'export{i}', 'translation': f'экспорт{i}', 'transcription': f'[e{i}]'} for i in range(3)
+        ])
+
+    def test_jsonl_round_trip(self):
+        from .export_service import stream_jsonl, user_word_to_dict
+        from .import_service import import_words, iter_jsonl_rows
+
+        jsonl = io.BytesIO(''.join(stream_jsonl(self.user)).encode())
+        self.assertEqual(import_words(self.other, iter_jsonl_rows(jsonl))['imported'], 3)
+
+        def exported(user):
+            rows = [user_word_to_dict(uw) for uw in UserWord.objects.filter(user=user).select_related('word')]
+            for row in rows:
+                del row['date_added']
+            return sorted(rows, key=lambda row: row['original'])
+
+        self.assertEqual(exported(self.other), exported(self.user))
+
+    def test_apkg_round_trip(self):
+        from .anki_service import export_user_apkg, iter_apkg_rows
+
+        apkg = io.BytesIO()
+        export_user_apkg(self.user, apkg)
+        apkg.seek(0)
+        rows = list(iter_apkg_rows(apkg))
+
+        user_words = UserWord.objects.filter(user=self.user).select_related('word').order_by('id')
+        self.assertEqual(len(rows), 3)
+        for row, user_word in zip(rows, user_words):
+            word = user_word.word
+            self.assertEqual((row['original'], row['translation'], row['transcription']),
+                             (word.original, word.translation, word.transcription))
+            progress = row['progress']
+            if not user_word.repetition:
+                # Новая карточка Anki - расписания нет
+                self.assertEqual(progress['repetition'], 0)
+                continue
+            self.assertEqual((progress['interval'], progress['ease_factor']),
+                             (user_word.interval, user_word.ease_factor))
+            # Anki хранит срок с точностью до дня
+            self.assertLess(abs(progress['next_review'] - user_word.next_review), timedelta(days=1))
+
+
+class DeltaSyncTest(TestCase):
+    """Дельта синхронизации меняет только словарь импортирующего пользователя"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('sync_user', '', 'password')
+        self.other = User.objects.create_user('sync_other', '', 'password')
+
+    def test_shared_word_is_copied(self):
+        from .sync_service import apply_delta
+
+        shared = Word.objects.create(original='house', translation='дом')
+        UserWord.objects.create(user=self.user, word=shared)
+        UserWord.objects.create(user=self.other, word=shared)
+
+        line = json.dumps({'op': 'upsert', 'original': 'house', 'translation': 'здание', 'repetition': 2})
+        self.assertEqual(apply_delta(self.user, [line])['upserted'], 1)
+
+        shared.refresh_from_db()
+        self.assertEqual(shared.translation, 'дом')
+        user_word = UserWord.objects.select_related('word').get(user=self.user)
+        self.assertNotEqual(user_word.word_id, shared.id)
+        self.assertEqual((user_word.word.translation, user_word.repetition), ('здание', 2))
+
+    def test_repeated_delta_changes_nothing(self):
+        from .sync_service import apply_delta, stream_delta
+
+        for i in range(3):
+            word = Word.objects.create(original=f'sync{i}', translation=f'синхр{i}')
+            UserWord.objects.create(user=self.user, word=word, repetition=i, interval=i + 1)
+        UserWord.objects.get(user=self.user, word__original='sync0').delete()
+        UserWord.objects.create(user=self.other, word=Word.objects.create(original='sync0', translation='старое'))
+        delta = list(stream_delta(self.user))
+
+        def deck():
+            return sorted(UserWord.objects.filter(user=self.other)
+                          .values_list('word__original', 'word__translation', 'repetition', 'interval'))
+
+        self.assertEqual(apply_delta(self.other, delta), {'upserted': 2, 'deleted': 1, 'skipped': 0})
+        applied, words = deck(), Word.objects.count()
+        self.assertEqual(applied, [('sync1', 'синхр1', 1, 2), ('sync2', 'синхр2', 2, 3)])
+
+        apply_delta(self.other, delta)
+        self.assertEqual((deck(), Word.objects.count()), (applied, words))
+
+    def test_review_is_synced(self):
+        from .sync_service import apply_delta, get_sync_cursor, stream_delta
+
+        for original in ('apple', 'pear'):
+            UserWord.objects.create(user=self.user, word=Word.objects.create(original=original, translation='фрукт'))
+        cursor = get_sync_cursor(self.user)
+        apply_delta(self.other, stream_delta(self.user))
+
+        # Только ответ в тренировке - журнал изменений не пишется
+        journal = DeckChange.objects.count()
+        user_word = UserWord.objects.get(user=self.user, word__original='pear')
+        user_word.update_progress(5)
+        user_word.update_progress(5)
+        self.assertEqual(DeckChange.objects.count(), journal)
+        self.assertGreater(get_sync_cursor(self.user), cursor)
+
+        delta = list(stream_delta(self.user, since=cursor))
+        self.assertEqual([json.loads(line)['original'] for line in delta], ['pear'])
+        self.assertEqual(list(stream_delta(self.user, since=get_sync_cursor(self.user))), [])
+
+        apply_delta(self.other, delta)
+        synced = UserWord.objects.get(user=self.other, word__original='pear')
+        self.assertEqual((synced.repetition, synced.interval, synced.correct_answers), (2, 6, 2))
+
+
+class ReminderBroadcasterTest(TestCase):
+    """Рассылка напоминаний: лимит скорости, флуд-контроль и ошибки отдельных отправок"""
+
+    async def broadcast(self, send_message):
+        from .reminder_service import ReminderBroadcaster
+
+        fake_bot = mock.Mock(send_message=mock.AsyncMock(side_effect=send_message))
+        broadcaster = ReminderBroadcaster(fake_bot, rate=1000, per_chat_interval=0)
+        return await broadcaster.broadcast([(chat_id, 'Пора повторить') for chat_id in range(1, 6)])
+
+    def test_unexpected_error_is_counted(self):
+        async def send_message(chat_id, text):
+            if chat_id == 2:
+                raise RuntimeError('сбой')
+
+        with self.assertLogs('app_vocab.reminders', 'ERROR'):
+            metrics = asyncio.run(self.broadcast(send_message))
+        self.assertEqual((metrics['sent'], metrics['failed']), (4, 1))
+
+    def test_dropped_by_send_queue_is_failed(self):
+        from .send_queue import SendDropped
+
+        async def send_message(chat_id, text):
+            if chat_id == 3:
+                raise SendDropped('истекло время ожидания')
+
+        with self.assertLogs('app_vocab.reminders', 'WARNING'):
+            metrics = asyncio.run(self.broadcast(send_message))
+        self.assertEqual((metrics['sent'], metrics['failed'], metrics['retries']), (4, 1, 0))
+
+    def test_token_bucket_rate(self):
+        from .reminder_service import TokenBucket
+
+        async def acquire_all():
+            bucket = TokenBucket(rate=50, capacity=1)
+            started = time.monotonic()
+            for _ in range(6):
+                await bucket.acquire()
+            return time.monotonic() - started
+
+        # Первый токен сразу, остальные пять - по одному за 1/50 секунды
+        self.assertGreaterEqual(asyncio.run(acquire_all()), 5 / 50 * 0.9)
+
+    def test_retry_after_pauses_and_resends(self):
+        from aiogram.exceptions import TelegramRetryAfter
+        from aiogram.methods import SendMessage
+
+        flooded = []
+
+        async def send_message(chat_id, text):
+            if chat_id == 3 and not flooded:
+                flooded.append(chat_id)
+                raise TelegramRetryAfter(SendMessage(chat_id=chat_id, text=text), 'Too Many Requests', 0.2)
+
+        started = time.monotonic()
+        metrics = asyncio.run(self.broadcast(send_message))
+        self.assertEqual((metrics['sent'], metrics['failed'], metrics['retry_after'], metrics['retries']),
+                         (5, 0, 1, 1))
+        # Повтор идет не раньше, чем разрешил Telegram
+        self.assertGreaterEqual(time.monotonic() - started, 0.2)
+
+
+class ReminderDigestTest(TestCase):
+    """Сводки напоминаний собираются одним запросом на пачку пользователей"""
+
+    def setUp(self):
+        now = timezone.now()
+        self.users = [User.objects.create_user(f'digest_user{i}', '', 'password') for i in range(3)]
+        # 7 слов к повторению, 2 к повторению и 3 на будущее, ни одного к повторению
+        for user, due, future in zip(self.users, (7, 2, 0), (0, 3, 4)):
+            for i in range(due + future):
+                word = Word.objects.create(original=f'{user.username}_{i}', translation=f'сводка{i}')
+                # Просроченные идут по порядку номеров, будущие - после now
+                days = i - due if i < due else i + 1
+                UserWord.objects.create(user=user, word=word, next_review=now + timedelta(days=days))
+
+    def test_one_query_per_batch(self):
+        from .reminder_service import build_reminder_digests, format_reminder
+
+        user_ids = [user.id for user in self.users]
+        with self.assertNumQueries(1):
+            digests = build_reminder_digests(user_ids, limit=5)
+            texts = {user_id: format_reminder(digest) for user_id, digest in digests.items()}
+
+        first, second, third = user_ids
+        self.assertEqual(set(digests), {first, second})
+        self.assertEqual((digests[first]['due_count'], len(digests[first]['words'])), (7, 5))
+        self.assertEqual(
+            [uw.word.original for uw in digests[first]['words']],
+            [f'digest_user0_{i}' for i in range(5)],
+        )
+        self.assertEqual((digests[second]['due_count'], len(digests[second]['words'])), (2, 2))
+        self.assertIn('...и еще 2', texts[first])
+
+        with mock.patch('app_vocab.reminder_service.REMINDER_DIGEST_BATCH_SIZE', 2), self.assertNumQueries(2):
+            self.assertEqual(build_reminder_digests(user_ids, limit=5).keys(), digests.keys())
+
+
+class ReminderSchedulerTest(TestCase):
+    """Планировщик напоминаний: время отправки и новые настройки с сайта"""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_next_reminder_across_timezones_and_dst(self):
+        import datetime
+        from .reminder_scheduler import compute_next_reminder
+
+        def utc(*args):
+            return datetime.datetime(*args, tzinfo=datetime.timezone.utc)
+
+        cases = [
+            # 10:00 по Москве - следующее напоминание завтра в 9:00 MSK
+            ('Europe/Moscow', utc(2026, 3, 1, 7), utc(2026, 3, 2, 6)),
+            # Ровно в момент отправки - уже на следующий день
+            ('Europe/Moscow', utc(2026, 3, 2, 6), utc(2026, 3, 3, 6)),
+            # Переход на летнее время в Нью-Йорке 8 марта: 9:00 EDT вместо 9:00 EST
+            ('America/New_York', utc(2026, 3, 7, 15), utc(2026, 3, 8, 13)),
+            # Переход на зимнее время в Берлине 25 октября: 9:00 CET вместо 9:00 CEST
+            ('Europe/Berlin', utc(2026, 10, 24, 8), utc(2026, 10, 25, 8)),
+            # Неизвестный пояс - UTC
+            ('Mars/Olympus', utc(2026, 3, 1, 10), utc(2026, 3, 2, 9)),
+        ]
+        for tz_name, after, expected in cases:
+            profile = UserProfile(reminder_hour=9, reminder_timezone=tz_name)
+            self.assertEqual(compute_next_reminder(profile, after), expected, (tz_name, after))
+
+    def test_settings_change_requests_refresh(self):
+        from .reminder_scheduler import ReminderScheduler
+
+        user = User.objects.create_user('scheduler_user', '', 'password')
+        UserProfile.objects.create(user=user, telegram_id='779000', reminder_hour=9)
+        self.client.force_login(user)
+        scheduler = ReminderScheduler(bot=None)
+        self.assertFalse(asyncio.run(scheduler.schedule_changed()))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/settings/', {'reminder_hour': '20', 'reminder_timezone': 'Europe/Moscow',
+                                            'notification_enabled': 'on', 'daily_goal_reminder': 'on'})
+        self.assertTrue(asyncio.run(scheduler.schedule_changed()))
+        self.assertFalse(asyncio.run(scheduler.schedule_changed()))
+
+    def test_unknown_timezone_is_rejected(self):
+        user = User.objects.create_user('timezone_user', '', 'password')
+        UserProfile.objects.create(user=user, reminder_hour=9, reminder_timezone='Asia/Tokyo')
+        self.client.force_login(user)
+
+        for name in ('Europe/Atlantis', 'Europe', 'x' * 60):
+            response = self.client.post('/settings/', {'reminder_hour': '20', 'reminder_timezone': name,
+                                                       'daily_new_words': '50'})
+            self.assertContains(response, 'Неизвестный часовой пояс')
+        profile = UserProfile.objects.get(user=user)
+        self.assertEqual((profile.reminder_hour, profile.reminder_timezone, profile.daily_new_words),
+                         (9, 'Asia/Tokyo', 5))
+
+        response = self.client.post('/settings/', {'reminder_hour': '20', 'reminder_timezone': 'Asia/Novosibirsk'})
+        self.assertRedirects(response, reverse('app_vocab:settings'))
+        profile.refresh_from_db()
+        self.assertEqual((profile.reminder_hour, profile.reminder_timezone), (20, 'Asia/Novosibirsk'))
+
+
+class BotEventLoopLintTest(TestCase):
+    """Обработчики бота не обращаются к ORM и блокирующему вводу-выводу из цикла событий"""
+
+    def test_no_orm_in_async_handlers(self):
+        tree = ast.parse(BOT_MODULE.read_text(encoding='utf-8'))
+        problems = []
+
+        for func in ast.walk(tree):
+            if not isinstance(func, ast.AsyncFunctionDef):
+                continue
+            for node in ast.walk(func):
+                if isinstance(node, ast.FunctionDef):
+                    problems.append(f'{func.name}:{node.lineno}: синхронная функция {node.name} внутри обработчика')
+                elif isinstance(node, ast.Attribute) and node.attr == 'objects':
+                    problems.append(f'{func.name}:{node.lineno}: запрос ORM в цикле событий')
+                elif isinstance(node, (ast.Name, ast.Attribute)):
+                    name = node.id if isinstance(node, ast.Name) else node.attr
+                    if name in BLOCKING_CALLS:
+                        problems.append(f'{func.name}:{node.lineno}: блокирующий вызов {name}')
+
+        self.assertEqual(problems, [], 'Используйте функции из app_vocab/bot_db.py')
+
+
+class BotDatabaseThreadTest(TransactionTestCase):
+    """Запросы обработчиков бота выполняются только в потоках пула bot_db"""
+
+    TELEGRAM_ID = 777000
+
+    COMMANDS = [
+        '/start', '/words', '/delete', '/stats', '/remind', '/reminders', '/profile', '/cards', '/quiz', '/cancel',
+    ]
+
+    def setUp(self):
+        from .bot_db import db_pool
+
+        user = User.objects.create_user('bot_user', '', 'password')
+        UserProfile.objects.create(user=user, telegram_id=str(self.TELEGRAM_ID))
+        words = Word.objects.bulk_create([Word(original=f'word{i}', translation=f'слово{i}') for i in range(5)])
+        UserWord.objects.bulk_create([UserWord(user=user, word=word) for word in words])
+
+        # Новые потоки пула - новые соединения, их перехватит обработчик connection_created
+        db_pool.shutdown()
+
+    async def feed_commands(self):
+        # bot.py создает Bot при импорте - без настоящего токена подставляем тестовый
+        os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:TEST')
+
+        from aiogram import Bot
+        from aiogram.types import Update
+        from .bot import dp
+        from .management.commands.bench_webhook import FakeTelegramSession, make_update
+
+        fake_bot = Bot(token='123456:TEST', session=FakeTelegramSession())
+        for update_id, text in enumerate(self.COMMANDS, start=1):
+            await dp.feed_update(fake_bot, Update.model_validate(make_update(update_id, self.TELEGRAM_ID, text)))
+
+    def test_queries_run_in_bot_pool(self):
+        from .bot_db import BOT_DB_THREAD_PREFIX, db_pool
+
+        threads = set()
+
+        def record_thread(execute, sql, params, many, context):
+            threads.add(threading.current_thread().name)
+            return execute(sql, params, many, context)
+
+        def install_wrapper(sender, connection, **kwargs):
+            connection.execute_wrappers.append(record_thread)
+
+        connection_created.connect(install_wrapper)
+        try:
+            asyncio.run(self.feed_commands())
+        finally:
+            connection_created.disconnect(install_wrapper)
+            db_pool.shutdown()
+
+        self.assertTrue(threads)
+        self.assertTrue(all(name.startswith(BOT_DB_THREAD_PREFIX) for name in threads), threads)
+
+    def test_handler_metrics(self):
+        from .bot_db import db_pool
+        from .bot_metrics import metrics
+
+        try:
+            asyncio.run(self.feed_commands())
+        finally:
+            db_pool.shutdown()
+
+        summary = metrics.summary()
+        self.assertGreater(summary['cmd_stats']['avg_queries'], 0)
+        self.assertIn('bot_update_seconds_bucket{handler="cmd_words",le="+Inf"}', metrics.render_prometheus())
+        self.assertGreater(metrics.api_seconds.series['SendMessage']['count'], 0)
+
+
+class DatabaseStorageTest(TransactionTestCase):
+    """Состояние FSM в базе: срок жизни сессии и ограничение размера данных"""
+
+    async def roundtrip(self, storage, key):
+        await storage.set_state(key, 'CardsState:answer')
+        await storage.set_data(key, {'card': 5})
+        return await storage.get_state(key), await storage.get_data(key)
+
+    def test_ttl_expiry(self):
+        from aiogram.fsm.storage.base import StorageKey
+        from .fsm_storage import FSM_CLEANUP_INTERVAL, DatabaseStorage
+        from .models import BotSession
+
+        storage = DatabaseStorage(ttl=60)
+        key = StorageKey(bot_id=1, chat_id=2, user_id=2)
+        self.assertEqual(asyncio.run(self.roundtrip(storage, key)), ('CardsState:answer', {'card': 5}))
+
+        # Сессия без активности дольше ttl - как будто ее нет
+        BotSession.objects.update(updated_at=timezone.now() - timedelta(seconds=61))
+        self.assertEqual(asyncio.run(storage.get_state(key)), None)
+        self.assertEqual(asyncio.run(storage.get_data(key)), {})
+
+        storage.last_cleanup = time.monotonic() - FSM_CLEANUP_INTERVAL
+        storage.cleanup()
+        self.assertFalse(BotSession.objects.exists())
+
+    def test_data_size_limit(self):
+        from aiogram.fsm.storage.base import StorageKey
+        from .fsm_storage import FSM_MAX_DATA_SIZE, DatabaseStorage, dump_data
+
+        self.assertEqual(dump_data({'card': 5}), '{"card":5}')
+        # Предел в байтах UTF-8, а не в символах
+        with self.assertRaises(ValueError):
+            dump_data({'text': 'я' * (FSM_MAX_DATA_SIZE // 2)})
+
+        storage = DatabaseStorage()
+        key = StorageKey(bot_id=1, chat_id=3, user_id=3)
+        asyncio.run(self.roundtrip(storage, key))
+        with self.assertRaises(ValueError):
+            asyncio.run(storage.set_data(key, {'words': ['слово'] * FSM_MAX_DATA_SIZE}))
+        self.assertEqual(asyncio.run(storage.get_data(key)), {'card': 5})
+
+
+class ProfileCacheTest(TestCase):
+    """Кэш профилей бота сбрасывается при сохранении профиля"""
+
+    def setUp(self):
+        from .bot_db import profile_cache
+
+        self.cache = profile_cache
+        self.cache.clear()
+        user = User.objects.create_user('cached_user', '', 'password')
+        self.profile = UserProfile.objects.create(user=user, telegram_id='555')
+
+    def test_hit_and_invalidation_on_save(self):
+        self.cache.set('555', self.profile)
+        self.assertEqual(self.cache.get(555), (True, self.profile))
+
+        # Настройки изменены на сайте
+        self.profile.daily_review_limit = 30
+        self.profile.save()
+        self.assertEqual(self.cache.get(555), (False, None))
+
+    def test_relink_invalidates_old_telegram_id(self):
+        self.cache.set('555', self.profile)
+        self.profile.telegram_id = '556'
+        self.profile.save()
+        self.assertEqual(self.cache.get(555), (False, None))
+
+    def test_missing_profile_is_cached(self):
+        self.cache.set('999', None)
+        self.assertEqual(self.cache.get('999'), (True, None))
+        self.assertGreater(self.cache.stats()['hit_rate'], 0)
+
+
+class DeckPaginationTest(TestCase):
+    """Страницы словаря в боте: ключ (date_added, id) без пропусков и повторов"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('deck_user', '', 'password')
+        words = Word.objects.bulk_create([Word(original=f'deck{i}', translation=f'колода{i}') for i in range(25)])
+        UserWord.objects.bulk_create([UserWord(user=self.user, word=word) for word in words])
+        # Одинаковое время добавления - порядок определяет id
+        UserWord.objects.filter(user=self.user).update(date_added=UserWord.objects.first().date_added)
+
+        other = User.objects.create_user('other_user', '', 'password')
+        UserWord.objects.create(user=other, word=words[0])
+
+    def get_page(self, **kwargs):
+        from .bot_db import get_deck_page
+        # Синхронная функция под db_task - вызываем в транзакции теста
+        return get_deck_page.__wrapped__(self.user.id, page_size=10, **kwargs)
+
+    def test_forward_and_back(self):
+        from .bot_db import deck_cursor
+
+        seen = []
+        page, has_prev, has_next = self.get_page()
+        self.assertFalse(has_prev)
+        pages = [page]
+        while has_next:
+            page, has_prev, has_next = self.get_page(cursor=deck_cursor(page[-1]), direction='next')
+            self.assertTrue(has_prev)
+            pages.append(page)
+        for page in pages:
+            seen += [user_word.id for user_word in page]
+
+        expected = list(UserWord.objects.filter(user=self.user).order_by('-date_added', '-id').values_list('id', flat=True))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual(seen, expected)
+
+        previous, _, _ = self.get_page(cursor=deck_cursor(pages[2][0]), direction='prev')
+        self.assertEqual(previous, pages[1])
+        current, _, _ = self.get_page(cursor=deck_cursor(pages[1][0]), direction='from')
+        self.assertEqual(current, pages[1])
+
+
+class BotAddWordTest(TestCase):
+    """Слово из бота - своя запись Word с переводом пользователя, как на сайте"""
+
+    def test_own_word_and_duplicate(self):
+        from .bot_db import add_word_to_deck
+
+        user = User.objects.create_user('bot_add_user', '', 'password')
+        shared = Word.objects.create(original='cat', translation='чужой перевод')
+
+        word, result = add_word_to_deck.__wrapped__(user.id, 'cat', 'кошка')
+        self.assertEqual(result, 'success')
+        self.assertNotEqual(word.id, shared.id)
+        self.assertEqual(UserWord.objects.get(user=user).word.translation, 'кошка')
+        self.assertEqual(add_word_to_deck.__wrapped__(user.id, 'Cat', 'кот'), (None, 'duplicate'))
+
+
+class AutocompleteTest(TestCase):
+    """Подсказки при вводе слова идут из памяти и обновляются после изменения словаря"""
+
+    def setUp(self):
+        from .autocomplete_service import deck_indexes
+
+        cache.clear()
+        deck_indexes.clear()
+        self.user = User.objects.create_user('complete_user', '', 'password')
+        words = Word.objects.bulk_create([
+            Word(original=original, translation=translation)
+            for original, translation in [('Apple', 'яблоко'), ('apply', 'применять'), ('banana', 'банан')]
+        ])
+        UserWord.objects.bulk_create([UserWord(user=self.user, word=word) for word in words])
+        self.client.force_login(self.user)
+
+    def test_prefix_and_duplicate(self):
+        data = self.client.get('/my-words/autocomplete/', {'q': 'ap'}).json()
+        self.assertEqual([item['original'] for item in data['suggestions']], ['Apple', 'apply'])
+        self.assertFalse(data['exists'])
+
+        # Словарь уже в памяти - остается только запрос пользователя из сессии
+        with self.assertNumQueries(1):
+            data = self.client.get('/my-words/autocomplete/', {'q': 'banana'}).json()
+        self.assertTrue(data['exists'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            word = Word.objects.create(original='apricot', translation='абрикос')
+            UserWord.objects.create(user=self.user, word=word)
+        data = self.client.get('/my-words/autocomplete/', {'q': 'apr'}).json()
+        self.assertEqual(data['suggestions'], [{'original': 'apricot', 'translation': 'абрикос'}])
+
+
+class TrainerApiTest(TestCase):
+    """JSON API тренажера: карточки с ETag, ответы и тест с выбором по id"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('api_user', '', 'password')
+        words = Word.objects.bulk_create([Word(original=f'api{i}', translation=f'апи{i}') for i in range(5)])
+        UserWord.objects.bulk_create([UserWord(user=self.user, word=word) for word in words])
+        self.client.force_login(self.user)
+
+    def test_cards_and_answer(self):
+        response = self.client.get('/api/v1/cards/')
+        cards = response.json()['cards']
+        self.assertEqual(len(cards), 5)
+        self.assertEqual(self.client.get('/api/v1/cards/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            progress = self.client.post(
+                f"/api/v1/cards/{cards[0]['id']}/answer/", {'action': 'know'}, content_type='application/json'
+            ).json()
+        self.assertEqual(progress['repetition'], 1)
+
+        # Ответ меняет версию кэша - карточки отдаются заново, уже без отвеченной
+        response = self.client.get('/api/v1/cards/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(cards[0]['id'], [card['id'] for card in response.json()['cards']])
+
+        other = User.objects.create_user('other_api_user', '', 'password')
+        self.client.force_login(other)
+        response = self.client.post(
+            f"/api/v1/cards/{cards[1]['id']}/answer/", {'action': 'know'}, content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_cards_become_due(self):
+        # Слова еще не пора повторять: первое - через час, следующие - позже
+        now = timezone.now()
+        for i, user_word in enumerate(UserWord.objects.filter(user=self.user).order_by('id')):
+            UserWord.objects.filter(id=user_word.id).update(next_review=now + timedelta(hours=i + 1))
+        response = self.client.get('/api/v1/cards/')
+        self.assertEqual(response.json()['cards'], [])
+
+        # Прошло полтора часа, в словаре ничего не меняли - первое слово уже к повторению
+        with mock.patch('django.utils.timezone.now', return_value=now + timedelta(minutes=90)):
+            response = self.client.get('/api/v1/cards/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['cards']), 1)
+
+    def test_quiz(self):
+        question = self.client.get('/api/v1/quiz/question/').json()
+        self.assertEqual(len(question['options']), 4)
+        correct = UserWord.objects.get(id=question['card']).word_id
+        self.assertIn(correct, [option['id'] for option in question['options']])
+
+        # Проверка ответа - один запрос к словарю (плюс пользователь из сессии)
+        with self.assertNumQueries(2):
+            result = self.client.post(
+                '/api/v1/quiz/answer/', {'card': question['card'], 'option': correct}, content_type='application/json'
+            ).json()
+        self.assertEqual(result, {'correct': True, 'answer': correct})
+
+
+class GenerateAudioTest(TestCase):
+    """Озвучка на сайте - async-представление: пока gTTS ходит в сеть, поток сервера свободен"""
+
+    def setUp(self):
+        self.word = Word.objects.create(original='cat', translation='кошка')
+
+    def test_generate_audio(self):
+        tts = mock.AsyncMock(return_value={'url': '/media/audio/cat.mp3'})
+        with mock.patch('app_vocab.views.atext_to_speech', tts):
+            data = self.client.get(f'/generate-audio/{self.word.id}/').json()
+        self.assertEqual(data, {'success': True, 'audio_url': '/media/audio/cat.mp3'})
+        tts.assert_awaited_once_with('cat', lang='en')
+
+
+class MyWordsPageTest(TestCase):
+    """Страницы "Мой словарь" по ключу для каждой сортировки и поиск"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('page_user', '', 'password')
+        words = Word.objects.bulk_create([
+            Word(original=f'page{i % 3}', translation=f'стр{7 - i}') for i in range(7)
+        ])
+        UserWord.objects.bulk_create([
+            UserWord(user=self.user, word=word, repetition=i % 2) for i, word in enumerate(words)
+        ])
+
+    def test_all_sorts(self):
+        from .deck_service import DECK_SORTS, get_my_words_page
+
+        for sort, deck_sort in DECK_SORTS.items():
+            pages = [get_my_words_page(self.user, sort, page_size=3)]
+            while pages[-1].next_token:
+                pages.append(get_my_words_page(self.user, sort, after=pages[-1].next_token, page_size=3))
+
+            expected = list(UserWord.objects.filter(user=self.user)
+                            .order_by(*deck_sort.order_by()).values_list('id', flat=True))
+            self.assertEqual([uw.id for page in pages for uw in page.user_words], expected, sort)
+            self.assertIsNone(pages[0].prev_token)
+
+            previous = get_my_words_page(self.user, sort, before=pages[-1].prev_token, page_size=3)
+            self.assertEqual(previous.user_words, pages[-2].user_words, sort)
+
+    def test_sort_follows_word_change(self):
+        from .deck_service import get_my_words_page
+
+        word = Word.objects.get(original='page2', translation='стр5')
+        word.original = 'aaa'
+        word.save()
+
+        page = get_my_words_page(self.user, 'original', page_size=1)
+        self.assertEqual(page.user_words[0].word, word)
+        self.assertEqual(page.user_words[0].word_original, 'aaa')
+
+    def test_search(self):
+        from .deck_service import get_my_words_page
+
+        page = get_my_words_page(self.user, 'original', query='page1')
+        self.assertEqual([uw.word.original for uw in page.user_words], ['page1', 'page1'])
+        self.assertIsNone(page.next_token)
+
+
+class WordSearchTest(TestCase):
+    """Поиск слов: индекс обновляется при изменении слов, ранжирование и опечатки"""
+
+    def setUp(self):
+        Word.objects.bulk_create([
+            Word(original='Breakfast', translation='завтрак'),
+            Word(original='break', translation='перерыв'),
+            Word(original='outbreak', translation='вспышка'),
+            Word(original='dinner', translation='ужин'),
+        ])
+
+    def search(self, text, **kwargs):
+        from .search_service import search_words
+        return [word.original for word in search_words(text, **kwargs)]
+
+    def test_ranking(self):
+        self.assertEqual(self.search('break'), ['break', 'Breakfast', 'outbreak'])
+        self.assertEqual(self.search('ЗАВТР'), ['Breakfast'])
+        self.assertEqual(self.search('dinenr'), ['dinner'])
+        self.assertEqual(self.search('dinenr', fuzzy=False), [])
+
+    def test_short_query_ignores_case(self):
+        # Запросы короче триграммы ищутся только по точному совпадению и началу слова
+        self.assertEqual(self.search('BR'), ['break', 'Breakfast'])
+        self.assertEqual(self.search('bR', fuzzy=False), ['break', 'Breakfast'])
+        self.assertEqual(self.search('ЗА'), ['Breakfast'])
+
+        word = Word.objects.get(original='dinner')
+        word.translation = 'Обед'
+        word.save(update_fields=['translation'])
+        self.assertEqual(self.search('об'), ['dinner'])
+
+    def test_user_deck_only(self):
+        user = User.objects.create_user('search_user', '', 'password')
+        UserWord.objects.create(user=user, word=Word.objects.get(original='outbreak'))
+        UserWord.objects.create(user=user, word=Word.objects.get(original='dinner'))
+
+        self.assertEqual(self.search('break', user_id=user.id), ['outbreak'])
+        self.assertEqual(self.search('завтрак', user_id=user.id, limit=1), [])
+        self.assertEqual(self.search('dinenr', user_id=user.id), ['dinner'])
+
+    def test_index_follows_changes(self):
+        from .search_service import words_containing
+
+        word = Word.objects.get(original='dinner')
+        word.translation = 'обед'
+        word.save()
+        self.assertEqual(self.search('обед'), ['dinner'])
+        self.assertFalse(Word.objects.filter(words_containing('ужин')).exists())
+
+        word.delete()
+        self.assertEqual(self.search('обед'), [])
+
+
+class SendQueueTest(TestCase):
+    """Очередь отправки склеивает подряд идущие тексты и повторяет запрос после 429"""
+
+    async def send_burst(self):
+        os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:TEST')
+
+        from aiogram import Bot
+        from aiogram.methods import SendMessage
+        from aiogram.types import ReplyKeyboardRemove
+        from .management.commands.bench_webhook import FakeTelegramSession
+        from .send_queue import SendQueue, SendQueueMiddleware
+
+        # Второй запрос к Bot API получит RetryAfter
+        session = FakeTelegramSession(flood_every=2)
+        queue = SendQueue(chat_rate=100)
+        session.middleware(SendQueueMiddleware(queue))
+        fake_bot = Bot(token='123456:TEST', session=session)
+
+        await fake_bot.send_message(1, 'Первое')
+        await queue.post(SendMessage(chat_id=1, text='Оценка'), bot=fake_bot)
+        await queue.post(SendMessage(chat_id=1, text='Подсказка'), bot=fake_bot)
+        message = await fake_bot.send_message(1, 'Карточка', reply_markup=ReplyKeyboardRemove())
+        return message, session.calls, queue.stats()
+
+    def test_coalesce_and_retry(self):
+        message, calls, stats = asyncio.run(self.send_burst())
+
+        self.assertEqual(message.text, 'Оценка\n\nПодсказка\n\nКарточка')
+        self.assertEqual(calls, {'SendMessage': 2, 'RetryAfter': 1})
+        self.assertEqual((stats['coalesced'], stats['retries'], stats['dropped'], stats['pending']), (2, 1, 0, 0))
+
+    async def send_dropped(self, **options):
+        os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:TEST')
+
+        from aiogram import Bot
+        from .management.commands.bench_webhook import FakeTelegramSession
+        from .send_queue import SendQueue, SendQueueMiddleware
+
+        # Каждый запрос к Bot API получает RetryAfter
+        session = FakeTelegramSession(flood_every=1)
+        queue = SendQueue(chat_rate=100, **options)
+        session.middleware(SendQueueMiddleware(queue))
+        try:
+            await Bot(token='123456:TEST', session=session).send_message(1, 'Карточка')
+        finally:
+            # Задача отправки завершается и убирается из очереди
+            await asyncio.sleep(0)
+            self.assertEqual((queue.stats()['dropped'], queue.tasks), (1, set()))
+
+    def test_dropped_request_raises(self):
+        from aiogram.exceptions import TelegramRetryAfter
+        from .send_queue import SendDropped
+
+        with self.assertLogs('app_vocab.send_queue', 'WARNING'):
+            with self.assertRaises(TelegramRetryAfter):
+                asyncio.run(self.send_dropped(max_retries=0))
+            with self.assertRaises(SendDropped):
+                asyncio.run(self.send_dropped(max_delay=-1))
+
+
+class WebhookSecretTest(TestCase):
+    """Webhook принимает обновления только с секретным токеном Telegram"""
+
+    async def post_updates(self):
+        os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:TEST')
+
+        from aiogram import Bot, Dispatcher
+        from aiohttp.test_utils import TestClient, TestServer
+        from .management.commands.bench_webhook import FakeTelegramSession, make_update
+        from .webhook import WEBHOOK_PATH, create_webhook_app
+
+        fake_bot = Bot(token='123456:TEST', session=FakeTelegramSession())
+        app = create_webhook_app(bot=fake_bot, dispatcher=Dispatcher(), secret='right-secret',
+                                 handle_in_background=False)
+        statuses = []
+        async with TestClient(TestServer(app)) as client:
+            for headers in ({}, {'X-Telegram-Bot-Api-Secret-Token': 'wrong-secret'},
+                            {'X-Telegram-Bot-Api-Secret-Token': 'right-secret'}):
+                response = await client.post(WEBHOOK_PATH, json=make_update(1, 1, '/start'), headers=headers)
+                statuses.append(response.status)
+        return statuses
+
+    def test_secret_required(self):
+        self.assertEqual(asyncio.run(self.post_updates()), [401, 401, 200])
+
+        from django.core.exceptions import ImproperlyConfigured
+        from .webhook import create_webhook_app
+
+        with self.assertRaises(ImproperlyConfigured):
+            create_webhook_app(secret='')
+
+
+class ReplicaRouterTest(TestCase):
+    """Страницы читают с реплики, пока пользователь сам не изменил словарь"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('replica_user', '', 'password')
+        patcher = mock.patch('app_vocab.db_router.replica_configured', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_read_your_writes(self):
+        from .db_router import ReplicaRouter, replica_reads
+
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(UserWord))
+        with replica_reads(self.user.id):
+            self.assertEqual(router.db_for_read(UserWord), 'replica')
+            self.assertEqual(router.db_for_write(UserWord), 'default')
+
+        # Добавление слова проходит через журнал изменений и закрепляет пользователя за основной базой
+        word = Word.objects.create(original='replica', translation='реплика')
+        UserWord.objects.create(user=self.user, word=word)
+        with replica_reads(self.user.id):
+            self.assertEqual(router.db_for_read(UserWord), 'default')
+        with replica_reads():
+            self.assertEqual(router.db_for_read(UserWord), 'replica')
+
+
+class UserCacheTest(TestCase):
+    """Повторная загрузка страницы берет данные из кэша, изменение словаря его сбрасывает"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('cache_user', '', 'password')
+        words = Word.objects.bulk_create([Word(original=f'cache{i}', translation=f'кэш{i}') for i in range(3)])
+        UserWord.objects.bulk_create([UserWord(user=self.user, word=word) for word in words])
+        self.client.force_login(self.user)
+
+    def test_repeat_load_and_invalidation(self):
+        from .cache_service import cache_metrics
+
+        self.assertEqual(self.client.get('/my-words/').context['words_stats']['total'], 3)
+        # Остается только запрос пользователя из сессии
+        with self.assertNumQueries(1):
+            response = self.client.get('/my-words/')
+        self.assertEqual(response.context['words_stats']['total'], 3)
+        self.assertGreaterEqual(cache_metrics.stats()['my_words']['hits'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            word = Word.objects.create(original='cache_new', translation='новое')
+            UserWord.objects.create(user=self.user, word=word)
+        self.assertEqual(self.client.get('/my-words/').context['words_stats']['total'], 4)
+
+    def test_version_bump_from_other_process(self):
+        from django.core.cache import caches
+        from .cache_service import new_version, version_key
+
+        self.client.get('/my-words/')
+        # Слово добавил другой процесс (бот, импорт): он меняет версию через свой клиент кэша
+        word = Word.objects.create(original='cache_bot', translation='бот')
+        UserWord.objects.create(user=self.user, word=word)
+        other_process = caches.create_connection('default')
+        other_process.set(version_key(self.user.id), new_version(), None)
+
+        self.assertEqual(self.client.get('/my-words/').context['words_stats']['total'], 4)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Планы запросов SQLite')
+class QueryPlanTest(TestCase):
+    """Поиск слов и страницы словаря идут по индексам, без полного просмотра и сортировки"""
+
+    def query_plans(self, run):
+        """EXPLAIN QUERY PLAN для каждого запроса, выполненного run()"""
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        plans = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                rows = cursor.execute('EXPLAIN QUERY PLAN ' + query['sql']).fetchall()
+                plans.append('\n'.join(row[-1] for row in rows))
+        return plans
+
+    def assertIndexed(self, plans):
+        for plan in plans:
+            self.assertNotIn('TEMP B-TREE', plan)
+            self.assertNotRegex(plan, r'(?m)^SCAN app_vocab_(user)?word\b', plan)
+
+    def test_exact_and_prefix_search(self):
+        from .search_service import exact_candidates
+
+        plans = self.query_plans(lambda: exact_candidates('bre'))
+        self.assertEqual(len(plans), 3)
+        self.assertIndexed(plans)
+
+    def test_deck_sorts(self):
+        from .deck_service import DECK_SORTS, get_my_words_page
+
+        user = User.objects.create_user('plan_user', '', 'password')
+        for sort in DECK_SORTS:
+            self.assertIndexed(self.query_plans(lambda: get_my_words_page(user, sort)))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Настройки SQLite')
+class SQLiteSettingsTest(TestCase):
+    """Каждое соединение с SQLite получает настройки из settings.SQLITE_PRAGMAS"""
+
+    def test_connection_pragmas(self):
+        from django.conf import settings
+
+        options = settings.DATABASES['default']['OPTIONS']
+        with connection.cursor() as cursor:
+            values = {name: cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                      for name in ('cache_size', 'busy_timeout')}
+
+        self.assertEqual(values['cache_size'], int(settings.SQLITE_PRAGMAS['cache_size']))
+        self.assertEqual(values['busy_timeout'], int(options['timeout'] * 1000))
+
+
+# Бюджеты запросов и времени: (запросов не больше, мс не больше).
+# Число запросов проверяется всегда. Время зависит от машины и ее загрузки, поэтому
+# проверяется только по запросу: QUERY_BUDGET_TIME_FACTOR=1 - пределы как есть,
+# на медленной машине можно поднять (0 - время не проверяется).
+BUDGET_TIME_FACTOR = float(os.getenv('QUERY_BUDGET_TIME_FACTOR', 0))
+
+VIEW_BUDGETS = {
+    'my_words': (3, 300),
+    'word_list': (11, 100),
+    'register': (0, 100),
+    'statistics': (8, 100),
+    'multiple_choice_test': (4, 100),
+    'check-answer': (2, 100),
+    'add_word': (6, 100),
+    'autocomplete_word': (2, 100),
+    'remove_word': (6, 100),
+    'matching_game': (4, 100),
+    'check_matching': (1, 100),
+    'settings': (2, 100),
+    'review_now': (4, 100),
+    'export_words': (2, 100),
+    'import_words': (1, 100),
+    'import_job_status': (2, 100),
+    'generate_audio': (1, 100),
+    'telegram_bot': (2, 100),
+    'link_telegram': (0, 100),
+    'cache_stats': (1, 100),
+    'api_cards': (5, 100),
+    'api_card_answer': (5, 100),
+    'api_quiz_question': (4, 100),
+    'api_quiz_answer': (2, 100),
+    'api_matching_board': (4, 100),
+    'admin:auth_user_changelist': (5, 300),
+    'admin:app_vocab_word_changelist': (4, 500),
+    'admin:app_vocab_userword_changelist': (5, 500),
+    'admin:app_vocab_importjob_changelist': (4, 300),
+}
+
+# Запросы обработчика бота вместе с чтением и записью состояния FSM (DatabaseStorage)
+BOT_BUDGETS = {
+    'cmd_start': (1, 100),
+    'cmd_menu': (2, 100),
+    'cmd_cancel': (1, 100),
+    'cmd_words': (5, 100),
+    'cmd_add': (14, 100),
+    'process_original': (9, 100),
+    'process_translation': (15, 100),
+    'cmd_delete': (4, 100),
+    'cmd_quiz': (13, 100),
+    'handle_quiz_answer': (12, 100),
+    'cmd_cards': (13, 100),
+    'handle_card_action': (8, 100),
+    'handle_difficulty_rating': (12, 100),
+    'cmd_stats': (3, 100),
+    'cmd_say': (4, 100),
+    'cmd_audio': (4, 100),
+    'cmd_remind': (2, 100),
+    'cmd_reminders': (1, 100),
+    'cmd_link': (3, 100),
+    'cmd_profile': (2, 100),
+    'cmd_cleanup': (3, 100),
+}
+
+BUDGET_WORDS = 200
+
+
+def seed_budget_deck(user, words=BUDGET_WORDS):
+    """Словарь как у активного пользователя: часть слов выучена, часть пора повторить"""
+    now = timezone.now()
+    created = Word.objects.bulk_create([
+        Word(original=f'budget{i}', translation=f'бюджет{i}', transcription=f'[bʌdʒɪt{i}]') for i in range(words)
+    ])
+    UserWord.objects.bulk_create([
+        UserWord(user=user, word=word, repetition=i % 6, interval=1 + i % 30, correct_answers=i % 7,
+                 wrong_answers=i % 3, next_review=now + timedelta(days=i % 10 - 5))
+        for i, word in enumerate(created)
+    ])
+    return created
+
+
+@contextlib.contextmanager
+def gc_paused():
+    """
+    Замер без сборщика мусора, как в timeit: полная сборка кучи, накопленной
+    предыдущими тестами, занимает ~100 мс и попадала бы в случайный запрос.
+    """
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
+
+
+def over_budget(results, budgets):
+    """
+    Превышения бюджетов, худшие сверху. results - {название: (запросов, мс)},
+    параметры запроса после '?' в названии бюджет не меняют.
+    Время учитывается, только если задан QUERY_BUDGET_TIME_FACTOR.
+    Строка: (во сколько раз превышен бюджет, название, запросов, бюджет, мс, бюджет мс)
+    """
+    rows = []
+    for name, (queries, elapsed_ms) in results.items():
+        max_queries, max_ms = budgets[name.partition('?')[0]]
+        overrun = queries / max(max_queries, 1)
+        if BUDGET_TIME_FACTOR:
+            max_ms *= BUDGET_TIME_FACTOR
+            overrun = max(overrun, elapsed_ms / max_ms)
+        if queries > max_queries or (BUDGET_TIME_FACTOR and elapsed_ms > max_ms):
+            rows.append((overrun, name, queries, max_queries, elapsed_ms, max_ms))
+    return sorted(rows, reverse=True)
+
+
+def budget_table(rows):
+    lines = [f"{'':40} {'запросов':^11} {'мс':^17}"]
+    for overrun, name, queries, max_queries, elapsed_ms, max_ms in rows:
+        lines.append(f'{name:40} {queries:>5} / {max_queries:<3} {elapsed_ms:>8.1f} / {max_ms:<6.0f}')
+    return '\n'.join(lines)
+
+
+class ViewQueryBudgetTest(TestCase):
+    """Каждый адрес app_vocab/urls.py и списки админки укладываются в бюджет запросов и времени"""
+
+    @classmethod
+    def setUpTestData(cls):
+        from .models import ImportJob
+
+        cls.user = User.objects.create_user('budget_user', '', 'password')
+        UserProfile.objects.create(user=cls.user, telegram_id='555000')
+        cls.words = seed_budget_deck(cls.user)
+        cls.user_words = list(UserWord.objects.filter(user=cls.user).order_by('id'))
+        cls.job = ImportJob.objects.create(user=cls.user, file_path='/tmp/budget.csv', original_name='budget.csv')
+
+        cls.staff = User.objects.create_superuser('budget_admin', '', 'password')
+        # Еще пользователи - для списка пользователей и чужих слов в админке
+        for i in range(20):
+            other = User.objects.create_user(f'budget_other{i}', '', 'password')
+            UserProfile.objects.create(user=other, telegram_id=str(556000 + i))
+            UserWord.objects.bulk_create([UserWord(user=other, word=word) for word in cls.words[i::20]])
+
+    def setUp(self):
+        cache.clear()
+
+    def budget_requests(self):
+        """(название маршрута, пользователь, метод, аргументы, данные запроса)"""
+        user_word, other_user_word = self.user_words[0], self.user_words[1]
+        json_answer = {'card': user_word.id, 'option': user_word.word_id}
+        from .deck_service import DECK_SORTS
+
+        return [
+            *[('my_words', self.user, 'get', (), {'sort': sort}) for sort in DECK_SORTS],
+            ('word_list', self.user, 'get', (), {}),
+            ('register', None, 'get', (), {}),
+            ('statistics', self.user, 'get', (), {}),
+            ('multiple_choice_test', self.user, 'get', (), {}),
+            ('check-answer', self.user, 'post', (),
+             {'user_answer': str(other_user_word.word_id), 'correct_answer': str(user_word.word_id)}),
+            ('add_word', self.user, 'post', (), {'original': 'budgetnew', 'translation': 'новый бюджет'}),
+            ('autocomplete_word', self.user, 'get', (), {'q': 'budget1'}),
+            ('remove_word', self.user, 'post', (self.user_words[-1].id,), {'current_sort': 'date_added'}),
+            ('matching_game', self.user, 'get', (), {}),
+            ('check_matching', self.user, 'post', (), {'matches': 'a:b,c:d'}),
+            ('settings', self.user, 'get', (), {}),
+            ('review_now', self.user, 'get', (user_word.id,), {}),
+            ('export_words', self.user, 'get', (), {}),
+            ('import_words', self.user, 'get', (), {}),
+            ('import_job_status', self.user, 'get', (self.job.id,), {}),
+            ('generate_audio', self.user, 'get', (user_word.word_id,), {}),
+            ('telegram_bot', self.user, 'get', (), {}),
+            ('link_telegram', self.user, 'post', (), {'link_code': 'SHORT'}),
+            ('cache_stats', self.staff, 'get', (), {}),
+            ('api_cards', self.user, 'get', (), {}),
+            ('api_card_answer', self.user, 'json', (user_word.id,), {'action': 'know'}),
+            ('api_quiz_question', self.user, 'get', (), {}),
+            ('api_quiz_answer', self.user, 'json', (), json_answer),
+            ('api_matching_board', self.user, 'get', (), {}),
+            ('admin:auth_user_changelist', self.staff, 'get', (), {}),
+            ('admin:app_vocab_word_changelist', self.staff, 'get', (), {}),
+            ('admin:app_vocab_userword_changelist', self.staff, 'get', (), {}),
+            ('admin:app_vocab_importjob_changelist', self.staff, 'get', (), {}),
+        ]
+
+    def measure(self, name, user, method, args, data):
+        # Холодный кэш - худший случай для каждой страницы
+        cache.clear()
+        self.client.logout()
+        if user is not None:
+            self.client.force_login(user)
+        url = reverse(name if ':' in name else f'app_vocab:{name}', args=args)
+
+        with gc_paused(), CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            if method == 'json':
+                response = self.client.post(url, data, content_type='application/json')
+            else:
+                response = getattr(self.client, method)(url, data)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.assertLess(response.status_code, 400, name)
+        return len(queries), elapsed_ms
+
+    def test_every_url_has_budget(self):
+        from .urls import urlpatterns
+
+        names = {pattern.name for pattern in urlpatterns}
+        self.assertEqual(names - set(VIEW_BUDGETS), set())
+        self.assertEqual(names - {name for name, *_ in self.budget_requests()}, set())
+
+    def test_view_budgets(self):
+        # Озвучка ходит в сеть - подменяем gTTS
+        tts = mock.AsyncMock(return_value={'url': '/media/audio/budget0.mp3'})
+        results = {}
+        with mock.patch('app_vocab.views.atext_to_speech', tts), self.captureOnCommitCallbacks(execute=True):
+            for name, user, method, args, data in self.budget_requests():
+                label = f'{name}?{urlencode(data)}' if method == 'get' and data else name
+                results[label] = self.measure(name, user, method, args, data)
+
+        rows = over_budget(results, VIEW_BUDGETS)
+        if rows:
+            self.fail('Превышен бюджет запросов или времени:\n' + budget_table(rows))
+
+
+class BotQueryBudgetTest(TransactionTestCase):
+    """Каждая команда бота укладывается в бюджет запросов ORM и времени на обновление"""
+
+    TELEGRAM_ID = 778000
+
+    # Команды и ответы в сценариях, по порядку (состояние FSM переходит от сообщения к сообщению)
+    MESSAGES = [
+        '/start', '/menu', '/words', '/add', 'budgetbot', 'бюджетбот', '/delete', '/quiz', 'бюджет0', '⏹️ Отмена',
+        '/cards', '🔄 Показать перевод', '✅ Легко', '⏹️ Отмена', '/stats', '/say budget1', '/audio', '/remind',
+        '/reminders', '/link', '/profile', '/cleanup', '/cancel',
+    ]
+
+    def setUp(self):
+        from .bot_db import db_pool
+
+        user = User.objects.create_user('bot_budget_user', '', 'password')
+        UserProfile.objects.create(user=user, telegram_id=str(self.TELEGRAM_ID))
+        seed_budget_deck(user)
+        db_pool.shutdown()
+
+    async def feed_messages(self):
+        os.environ.setdefault('TELEGRAM_BOT_TOKEN', '123456:TEST')
+
+        from aiogram import Bot
+        from aiogram.types import Update
+        from .bot import dp
+        from .management.commands.bench_webhook import FakeTelegramSession, make_update
+
+        fake_bot = Bot(token='123456:TEST', session=FakeTelegramSession())
+        for update_id, text in enumerate(self.MESSAGES, start=1):
+            await dp.feed_update(fake_bot, Update.model_validate(make_update(update_id, self.TELEGRAM_ID, text)))
+
+    def test_every_command_is_covered(self):
+        tree = ast.parse(BOT_MODULE.read_text(encoding='utf-8'))
+        commands = {
+            node.args[0].value for node in ast.walk(tree)
+            if isinstance(node, ast.Call) and getattr(node.func, 'id', None) == 'Command'
+        }
+        sent = {text.split()[0][1:] for text in self.MESSAGES if text.startswith('/')}
+        self.assertEqual(commands - sent, set())
+
+    def test_bot_budgets(self):
+        from .bot_db import db_pool
+        from .bot_metrics import metrics
+
+        results = {}
+        record_update = metrics.record_update
+
+        def record(update, elapsed):
+            queries, elapsed_ms = results.get(update.handler, (0, 0))
+            results[update.handler] = (max(queries, update.queries), max(elapsed_ms, elapsed * 1000))
+            record_update(update, elapsed)
+
+        tts = mock.AsyncMock(return_value=None)
+        try:
+            with mock.patch.object(metrics, 'record_update', record), \
+                    mock.patch('app_vocab.tts_service.atext_to_speech', tts), gc_paused():
+                asyncio.run(self.feed_messages())
+        finally:
+            db_pool.shutdown()
+
+        self.assertEqual(set(results) - set(BOT_BUDGETS), set())
+        rows = over_budget(results, BOT_BUDGETS)
+        if rows:
+            self.fail('Превышен бюджет запросов или времени:\n' + budget_table(rows))
@@ -0,0 +1,153 @@
+# app_vocab/trainer_service.py
+import random
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Word, UserWord
+from .cache_service import cached_for_user
+from .services import get_today_words, get_words_for_games, process_user_answer
+
+
+# Сколько карточек тренажера отдаем за раз
+TRAINER_CARDS_LIMIT = 20
+# Ответы тренажера и их оценка по SM-2 (как в word_list)
+ANSWER_QUALITY = {'know': 4, 'dont_know': 2}
+# Вариантов ответа в тесте с выбором и пар в игре "Сопоставление"
+QUIZ_OPTIONS = 4
+MATCHING_PAIRS = 6
+# Сколько раз добираем случайные слова общего словаря для вариантов ответа
+RANDOM_WORD_ATTEMPTS = 3
+
+
+def card_payload(user_word):
+    """Карточка для тренажера и игр - только то, что нужно на странице"""
+    word = user_word.word
+    return {
+        'id': user_word.id,
+        'word_id': word.id,
+        'original': word.original,
+        'translation': word.translation,
+        'transcription': word.transcription,
+        'repetition': user_word.repetition,
+        'level': user_word.get_knowledge_level(),
+        'next_review': user_word.next_review.date().isoformat(),
+    }
+
+
+def next_due_at(user):
+    """
+    Когда следующее слово станет к повторению (секунды epoch, 0 - таких нет).
+    До этого момента карточки на сегодня меняются только вместе с версией кэша.
+    """
+    next_review = (
+        UserWord.objects.filter(user=user, next_review__gt=timezone.now())
+        .order_by('next_review').values_list('next_review', flat=True).first()
+    )
+    return int(next_review.timestamp()) if next_review else 0
+
+
+def get_trainer_cards(user, limit=TRAINER_CARDS_LIMIT, due_at=None):
+    """
+    Карточки на сегодня (из кэша, пока пользователь ничего не менял
+    и ни одно слово не стало к повторению)
+    """
+    if due_at is None:
+        due_at = next_due_at(user)
+    return cached_for_user(
+        user.id, 'trainer_cards',
+        lambda: [card_payload(user_word) for user_word in get_today_words(user, limit=limit)],
+        limit, due_at,
+    )
+
+
+def answer_card(user, user_word_id, quality):
+    """
+    Ответ на карточку тренажера. Возвращает новый прогресс слова
+    или None, если такого слова в словаре пользователя нет.
+    """
+    user_word = UserWord.objects.select_related('word', 'user').filter(id=user_word_id, user=user).first()
+    if user_word is None:
+        return None
+    process_user_answer(user_word, quality)
+    return {
+        'id': user_word.id,
+        'repetition': user_word.repetition,
+        'level': user_word.get_knowledge_level(),
+        'next_review': user_word.next_review.date().isoformat(),
+    }
+
+
+def get_game_cards(user, min_words):
+    """Слова для игр (get_words_for_games) из кэша пользователя"""
+    return cached_for_user(
+        user.id, 'game_cards',
+        lambda: [card_payload(user_word) for user_word in get_words_for_games(user, min_words=min_words)],
+        min_words,
+    )
+
+
+def random_words(exclude_ids, count):
+    """
+    Случайные слова общего словаря: выбираем случайные id и читаем только их,
+    а не всю таблицу слов.
+    """
+    max_id = Word.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    words = {}
+    for _ in range(RANDOM_WORD_ATTEMPTS):
+        ids = random.sample(range(1, max_id + 1), min(max_id, count * 4))
+        rows = Word.objects.filter(id__in=ids).exclude(id__in=exclude_ids).values_list('id', 'translation')
+        for word_id, translation in rows:
+            words.setdefault(word_id, translation)
+        if len(words) >= count:
+            break
+    return list(words.items())[:count]
+
+
+def next_quiz_question(user):
+    """
+    Вопрос теста с выбором: слово из слов для игр и варианты перевода.
+    Неправильные варианты берутся из тех же слов, недостающие - из общего словаря.
+    """
+    cards = get_game_cards(user, min_words=5)
+    if not cards:
+        return None
+
+    card = random.choice(cards)
+    others = [other for other in cards if other['translation'] != card['translation']]
+    options = [(other['word_id'], other['translation'])
+               for other in random.sample(others, min(QUIZ_OPTIONS - 1, len(others)))]
+    if len(options) < QUIZ_OPTIONS - 1:
+        exclude_ids = [card['word_id']] + [word_id for word_id, translation in options]
+        options += random_words(exclude_ids, QUIZ_OPTIONS - 1 - len(options))
+    options.append((card['word_id'], card['translation']))
+    random.shuffle(options)
+
+    return {
+        'card': card['id'],
+        'original': card['original'],
+        'transcription': card['transcription'],
+        'options': [{'id': word_id, 'translation': translation} for word_id, translation in options],
+    }
+
+
+def check_quiz_answer(user, user_word_id, option_id):
+    """Правильный ли вариант выбран - одним запросом. None, если слова нет в словаре"""
+    word_id = UserWord.objects.filter(id=user_word_id, user=user).values_list('word_id', flat=True).first()
+    if word_id is None:
+        return None
+    return {'correct': word_id == option_id, 'answer': word_id}
+
+
+def matching_board(user):
+    """Пары для игры "Сопоставление" (не меньше 4, иначе None)"""
+    cards = get_game_cards(user, min_words=4)
+    if len(cards) < 4:
+        return None
+    cards = random.sample(cards, min(MATCHING_PAIRS, len(cards)))
+    return {
+        'pairs': [
+            {key: card[key] for key in ('id', 'original', 'translation', 'transcription')}
+            for card in cards
+        ],
+    }
@@ -1,3 +1,4 @@
+import asyncio
 from gtts import gTTS
 import os
 from django.conf import settings
@@ -29,4 +30,13 @@ def text_to_speech(text, lang='en'):
 
     except Exception as e:
         print(f"TTS Error: {e}")
-        return None
\ No newline at end of file
+        return None
+
+
+async def atext_to_speech(text, lang='en'):
+    """
+    То же для асинхронного кода (бот, async-представления). Клиента gTTS
+    без блокировок нет, поэтому запрос в сеть идет в отдельном потоке, не занимая
+    цикл событий и поток базы данных.
+    """
+    return await asyncio.to_thread(text_to_speech, text, lang=lang)
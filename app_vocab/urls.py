@@ -1,6 +1,7 @@
 # app_vocab/urls.py
 
 from django.urls import path
+from . import api_views
 from . import views  # Импортируем наши представления (views) из текущего приложения
 
 # app_name помогает Django уникально идентифицировать URL-ы этого приложения
@@ -19,6 +20,7 @@ urlpatterns = [
     path('test/check-answer/', views.check_multiple_choice, name='check-answer'),
 
     path('my-words/add/', views.add_word, name='add_word'),
+    path('my-words/autocomplete/', views.autocomplete_word, name='autocomplete_word'),
     path('my-words/remove/<int:word_id>/', views.remove_word, name='remove_word'),
     path('test/matching/', views.matching_game, name='matching_game'),
     path('test/check-matching/', views.check_matching, name='check_matching'),
@@ -26,7 +28,16 @@ urlpatterns = [
     path('my-words/review-now/<int:word_id>/', views.review_now, name='review_now'),
     path('export-words/', views.export_words_csv, name='export_words'),
     path('import-words/', views.import_words_csv, name='import_words'),
+    path('import-words/jobs/<int:job_id>/', views.import_job_status, name='import_job_status'),
     path('generate-audio/<int:word_id>/', views.generate_audio, name='generate_audio'),
     path('telegram-bot/', views.telegram_bot, name='telegram_bot'),
     path('link-telegram/', views.link_telegram, name='link_telegram'),
+    path('cache-stats/', views.cache_stats, name='cache_stats'),
+
+    # JSON API тренажера и игр
+    path('api/v1/cards/', api_views.cards, name='api_cards'),
+    path('api/v1/cards/<int:user_word_id>/answer/', api_views.answer, name='api_card_answer'),
+    path('api/v1/quiz/question/', api_views.quiz_question, name='api_quiz_question'),
+    path('api/v1/quiz/answer/', api_views.quiz_answer, name='api_quiz_answer'),
+    path('api/v1/matching/board/', api_views.matching_game_board, name='api_matching_board'),
 ]
\ No newline at end of file
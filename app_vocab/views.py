@@ -1,28 +1,40 @@
 # app_vocab/views.py
 
-import csv
-from django.http import HttpResponse
+import tempfile
+from functools import partial
+from django.http import StreamingHttpResponse, FileResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login
 from django.urls import reverse
 from django.utils import timezone
 from django.http import JsonResponse
-from .models import Word, UserWord
+from .models import Word, UserWord, ImportJob
+from .db_router import replica_reads
 
 
 from .services import (
-    get_today_words,
     process_user_answer,
     get_user_statistics,
     get_or_create_user_profile,
-    get_words_for_games
+    get_cached_user_profile,
 )
+from .cache_service import cached_for_user, cache_metrics
+from .autocomplete_service import autocomplete, deck_indexes
+from .trainer_service import get_trainer_cards, get_game_cards, next_quiz_question, matching_board
+from .deck_service import DECK_SORTS, MY_WORDS_PAGE_SIZE, PAGE_SIZES, get_my_words_page, get_my_words_stats
 
 # Озвучка слов (TTS)
-from .tts_service import text_to_speech
+from .tts_service import atext_to_speech
+
+# Импорт и экспорт слов
+from .import_service import create_import_job
+from .export_service import stream_csv, stream_jsonl
+from .sync_service import get_sync_cursor, stream_delta
+from .anki_service import export_user_apkg
 
 
 
@@ -60,25 +72,17 @@ def word_list(request):
         redirect_url = f"{request.path}?reverse={int(is_reverse)}"
         return redirect(redirect_url)
 
-    # Получаем слова для повторения сегодня
-    today_words = get_today_words(request.user, limit=20)
+    # Карточки отдаются в шаблон как JSON, дальше страница работает через API (api_views)
+    cards = get_trainer_cards(request.user)
 
-    # Если слов нет, предлагаем добавить слова
-    if not today_words:
-        context = {
-            'words': [],
-            'is_reverse': is_reverse,
-            'no_words_message': "У вас пока нет слов для изучения. Добавьте слова в свой словарь!",
-            'statistics': get_user_statistics(request.user)
-        }
-        return render(request, 'app_vocab/word_list.html', context)
-
-    # Передаем UserWord объекты в шаблон (а не просто Word)
     context = {
-        'user_words': today_words,
+        'cards': cards,
         'is_reverse': is_reverse,
         'statistics': get_user_statistics(request.user),
     }
+    # Если слов нет, предлагаем добавить слова
+    if not cards:
+        context['no_words_message'] = "У вас пока нет слов для изучения. Добавьте слова в свой словарь!"
     return render(request, 'app_vocab/word_list.html', context)
 
 
@@ -87,8 +91,9 @@ def statistics(request):
     """
     Страница со статистикой пользователя.
     """
-    stats = get_user_statistics(request.user)
-    return render(request, 'app_vocab/statistics.html', {'statistics': stats})
+    with replica_reads(request.user.id):
+        stats = get_user_statistics(request.user)
+        return render(request, 'app_vocab/statistics.html', {'statistics': stats})
 
 
 @login_required
@@ -96,49 +101,23 @@ def multiple_choice_test(request):
     """
     Тест с множественным выбором с учетом настроек пользователя.
     """
-   #from .services import get_today_words
-    import random
-
-    profile = get_or_create_user_profile(request.user)
+    profile = get_cached_user_profile(request.user)
 
     # Проверяем, включен ли этот тип теста
     if not profile.enable_multiple_choice:
         messages.info(request, "Тест с выбором ответа отключен в настройках.")
         return redirect('app_vocab:settings')
 
-    # Получаем слова с учетом настроек
-
-    #from .services import get_words_for_games
-    today_words = get_words_for_games(request.user, min_words=5)
+    # Первый вопрос приходит вместе со страницей, следующие - через API (api_views)
+    question = next_quiz_question(request.user)
 
-    if not today_words:
+    if question is None:
         context = {
             'no_words_message': "Нет слов для тестирования. Добавьте слова или подождите следующего повторения."
         }
         return render(request, 'app_vocab/multiple_choice.html', context)
 
-    # Выбираем случайное слово для вопроса
-    question_word = random.choice(today_words)
-
-    # Создаем варианты ответов
-    all_words = list(Word.objects.exclude(id=question_word.word.id))
-    wrong_answers = random.sample(all_words, min(3, len(all_words)))
-
-    # Собираем все варианты (правильный + неправильные)
-    options = [question_word.word] + wrong_answers
-    random.shuffle(options)  # Перемешиваем варианты
-
-    # Определяем правильный ответ
-    correct_answer_id = question_word.word.id
-
-    context = {
-        'question_word': question_word,
-        'options': options,
-        'correct_answer_id': correct_answer_id,
-        'total_questions': len(today_words),
-    }
-
-    return render(request, 'app_vocab/multiple_choice.html', context)
+    return render(request, 'app_vocab/multiple_choice.html', {'question': question})
 
 
 @login_required
@@ -154,25 +133,27 @@ def check_multiple_choice(request):
 
             is_correct = (user_answer == correct_answer)
 
-            correct_word = Word.objects.get(id=correct_answer)
+            # Оба перевода одним запросом
+            translations = dict(
+                Word.objects.filter(id__in=[correct_answer, user_answer]).values_list('id', 'translation')
+            )
+            if int(correct_answer) not in translations or int(user_answer) not in translations:
+                return JsonResponse({'error': 'Word not found'})
 
             if is_correct:
                 return JsonResponse({
                     'correct': True,
                     'message': 'Правильно! Отличная работа! 🎉',
-                    'correct_answer': correct_word.translation
+                    'correct_answer': translations[int(correct_answer)]
                 })
             else:
-                user_answer_word = Word.objects.get(id=user_answer)
                 return JsonResponse({
                     'correct': False,
                     'message': 'Попробуйте еще раз! 💪',
-                    'correct_answer': correct_word.translation,
-                    'user_answer': user_answer_word.translation
+                    'correct_answer': translations[int(correct_answer)],
+                    'user_answer': translations[int(user_answer)]
                 })
 
-        except Word.DoesNotExist:
-            return JsonResponse({'error': 'Word not found'})
         except Exception as e:
             return JsonResponse({'error': str(e)})
 
@@ -182,38 +163,36 @@ def check_multiple_choice(request):
 @login_required
 def my_words(request):
     """
-    Главная Страница "Мой Словарь" - просмотр всех слов пользователя с сортировкой.
+    Главная Страница "Мой Словарь" - слова пользователя постранично, с сортировкой и поиском.
+    Страница выбирается по ключу последнего показанного слова, поэтому время
+    ответа зависит от размера страницы, а не словаря.
     """
     # Получаем параметр сортировки из GET запроса
     sort_by = request.GET.get('sort', 'date_added')  # по умолчанию по дате добавления
-
-    # ФИЛЬТРУЕМ СЛОВА ТЕКУЩЕГО ПОЛЬЗОВАТЕЛЯ - ИСПРАВЛЕННАЯ СТРОКА
-    user_words = UserWord.objects.filter(user=request.user).select_related('word')
-
-    # Применяем сортировку
-    if sort_by == 'original':
-        user_words = user_words.order_by('word__original')
-    elif sort_by == 'translation':
-        user_words = user_words.order_by('word__translation')
-    elif sort_by == 'level':
-        user_words = user_words.order_by('repetition')
-    elif sort_by == 'next_review':
-        user_words = user_words.order_by('next_review')
-    else:  # date_added (по умолчанию)
-        user_words = user_words.order_by('-date_added')
-
-    # Статистика по словам пользователя
-    words_stats = {
-        'total': user_words.count(),
-        'new': user_words.filter(repetition=0).count(),
-        'learning': user_words.filter(repetition__range=[1, 3]).count(),
-        'learned': user_words.filter(repetition__gte=4).count(),
-    }
+    if sort_by not in DECK_SORTS:
+        sort_by = 'date_added'
+    query = request.GET.get('q', '').strip()[:100]
+    page_size = request.GET.get('size', '')
+    page_size = int(page_size) if page_size.isdigit() and int(page_size) in PAGE_SIZES else MY_WORDS_PAGE_SIZE
+    after = request.GET.get('after')
+    before = request.GET.get('before')
+
+    # Повторные загрузки берут статистику и страницы без поиска из кэша пользователя
+    words_stats = cached_for_user(request.user.id, 'my_words_stats', lambda: get_my_words_stats(request.user))
+    load_page = partial(get_my_words_page, request.user, sort_by, after, before, query, page_size)
+    if query:
+        page = load_page()
+    else:
+        page = cached_for_user(request.user.id, 'my_words', load_page, sort_by, page_size, after, before)
 
     context = {
-        'user_words': user_words,
+        'user_words': page.user_words,
+        'page': page,
         'words_stats': words_stats,
         'current_sort': sort_by,
+        'query': query,
+        'page_size': page_size,
+        'page_sizes': PAGE_SIZES,
     }
     return render(request, 'app_vocab/my_words.html', context)
 
@@ -261,6 +240,15 @@ def add_word(request):
     return render(request, 'app_vocab/add_word.html')
 
 
+@login_required
+def autocomplete_word(request):
+    """
+    Подсказки при вводе слова: слова словаря с таким началом и есть ли оно уже в словаре.
+    Отвечает из словаря в памяти процесса, без запросов к словам в базе.
+    """
+    return JsonResponse(autocomplete(request.user.id, request.GET.get('q', '')[:100]))
+
+
 def remove_word(request, word_id):
     """Удаление слова из словаря пользователя"""
     if request.method == 'POST':
@@ -284,52 +272,26 @@ def matching_game(request):
     """
     Режим сопоставления с отдельной логикой подбора слов.
     """
-    #from .services import get_words_for_games
-    import random
-
-    profile = get_or_create_user_profile(request.user)
+    profile = get_cached_user_profile(request.user)
 
     # Проверяем, включен ли этот тип теста
     if not profile.enable_matching:
         messages.info(request, "Игра в сопоставление отключена в настройках.")
         return redirect('app_vocab:settings')
 
-    # Используем отдельную функцию для игр
-    game_words = get_words_for_games(request.user, min_words=4)
+    # Первая раскладка приходит вместе со страницей, новые игры - через API (api_views)
+    board = matching_board(request.user)
 
-    if len(game_words) < 4:
+    if board is None:
+        words_count = len(get_game_cards(request.user, min_words=4))
         context = {
-            'no_words_message': f"Нужно хотя бы 4 слова для игры. В вашем словаре: {len(game_words)} слов. Добавьте больше слов!"
+            'no_words_message': f"Нужно хотя бы 4 слова для игры. В вашем словаре: {words_count} слов. Добавьте больше слов!"
         }
         return render(request, 'app_vocab/matching_game.html', context)
 
-    # Создаем пары слов для игры
-    word_pairs = []
-    used_words = set()
-
-    for user_word in game_words:
-        if user_word.word.id not in used_words and len(word_pairs) < 6:  # Максимум 6 пар
-            word_pairs.append({
-                'id': user_word.id,
-                'original': user_word.word.original,
-                'translation': user_word.word.translation,
-                'transcription': user_word.word.transcription,
-            })
-            used_words.add(user_word.word.id)
-
-    # Разделяем на оригиналы и переводы
-    originals = [pair['original'] for pair in word_pairs]
-    translations = [pair['translation'] for pair in word_pairs]
-
-    # Перемешиваем
-    random.shuffle(originals)
-    random.shuffle(translations)
-
     context = {
-        'originals': originals,
-        'translations': translations,
-        'word_pairs': word_pairs,
-        'total_pairs': len(word_pairs),
+        'board': board,
+        'total_pairs': len(board['pairs']),
     }
 
     return render(request, 'app_vocab/matching_game.html', context)
@@ -373,6 +335,17 @@ def settings_page(request):
     profile = get_or_create_user_profile(request.user)
 
     if request.method == 'POST':
+        from .reminder_scheduler import is_valid_timezone, request_schedule_refresh
+
+        # Неизвестный часовой пояс не сохраняем: планировщик молча считал бы его UTC
+        reminder_timezone = request.POST.get('reminder_timezone', profile.reminder_timezone).strip() or 'Europe/Moscow'
+        if not is_valid_timezone(reminder_timezone):
+            messages.error(request, f'Неизвестный часовой пояс "{reminder_timezone}". Укажите, например, Europe/Moscow')
+            return render(request, 'app_vocab/settings.html', {'profile': profile})
+
+        reminder_settings = (profile.notification_enabled, profile.daily_goal_reminder,
+                             profile.reminder_hour, profile.reminder_timezone)
+
         # Обновляем настройки обучения
         profile.daily_new_words = request.POST.get('daily_new_words', 5)
         profile.daily_review_limit = request.POST.get('daily_review_limit', 20)
@@ -387,7 +360,22 @@ def settings_page(request):
         profile.notification_enabled = 'notification_enabled' in request.POST
         profile.daily_goal_reminder = 'daily_goal_reminder' in request.POST
 
+        # Время напоминания: при изменении планировщик пересчитает следующую отправку
+        try:
+            reminder_hour = int(request.POST.get('reminder_hour', profile.reminder_hour))
+        except ValueError:
+            reminder_hour = profile.reminder_hour
+        if (reminder_hour, reminder_timezone) != (profile.reminder_hour, profile.reminder_timezone):
+            profile.reminder_hour = min(max(reminder_hour, 0), 23)
+            profile.reminder_timezone = reminder_timezone
+            profile.next_reminder_at = None
+
         profile.save()
+        if reminder_settings != (profile.notification_enabled, profile.daily_goal_reminder,
+                                 profile.reminder_hour, profile.reminder_timezone):
+            # Планировщик в процессе бота перечитает расписание
+            request_schedule_refresh()
+
         messages.success(request, 'Настройки успешно сохранены!')
         return redirect('app_vocab:settings')
 
@@ -441,107 +429,97 @@ def register(request):
     return render(request, 'registration/register.html', {'form': form})
 
 ###
+@login_required
 def export_words_csv(request):
-    """Экспорт слов пользователя в CSV"""
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="my_dictionary.csv"'
-
-    writer = csv.writer(response)
-    writer.writerow(['Слово', 'Транскрипция', 'Перевод', 'Уровень сложности', 'Дата добавления'])
-
-    # ИСПРАВЛЕННЫЙ ЗАПРОС - через userword
-    words = Word.objects.filter(userword__user=request.user)
-
-    for word in words:
-        writer.writerow([
-            word.original,
-            word.transcription or '',
-            word.translation,
-            word.get_difficulty_level_display(),
-            word.date_added.strftime('%Y-%m-%d') if word.date_added else ''
-        ])
+    """
+    Экспорт слов пользователя в CSV, JSONL (?format=jsonl - с прогрессом SM-2)
+    или колоду Anki (?format=apkg).
+    ?format=delta&since=N - только изменения после курсора N (для синхронизации).
+    """
+    export_format = request.GET.get('format', 'csv')
+
+    # Отдаем файл потоково - память не зависит от размера словаря
+    if export_format == 'delta':
+        since = request.GET.get('since', '0')
+        since = int(since) if since.isdigit() else 0
+        cursor = get_sync_cursor(request.user)
+        response = StreamingHttpResponse(
+            stream_delta(request.user, since=since, until=cursor),
+            content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = f'attachment; filename="my_dictionary_delta_{since}_{cursor}.jsonl"'
+        response['X-Sync-Cursor'] = str(cursor)
+    elif export_format == 'apkg':
+        # Колода Anki собирается во временном файле и отдается с диска
+        apkg_file = tempfile.TemporaryFile()
+        export_user_apkg(request.user, apkg_file)
+        apkg_file.seek(0)
+        response = FileResponse(apkg_file, as_attachment=True, filename='my_dictionary.apkg',
+                                content_type='application/zip')
+    elif export_format == 'jsonl':
+        response = StreamingHttpResponse(stream_jsonl(request.user), content_type='application/x-ndjson')
+        response['Content-Disposition'] = 'attachment; filename="my_dictionary.jsonl"'
+    else:
+        response = StreamingHttpResponse(stream_csv(request.user), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="my_dictionary.csv"'
 
     return response
 
 ###
 
+@login_required
 def import_words_csv(request):
-    """Импорт слов из CSV файла"""
+    """Импорт слов из CSV файла (фоновой задачей)"""
     if request.method == 'POST' and request.FILES.get('csv_file'):
         csv_file = request.FILES['csv_file']
 
         try:
-            decoded_file = csv_file.read().decode('utf-8').splitlines()
-            reader = csv.DictReader(decoded_file)
-
-            imported_count = 0
-            duplicate_count = 0
-
-            for row in reader:
-                original = row.get('Слово', '').strip()
-                translation = row.get('Перевод', '').strip()
-
-                if not original or not translation:
-                    continue
-
-                # ПРОВЕРЯЕМ, не существует ли уже такое слово у пользователя
-                existing_word = Word.objects.filter(
-                    original=original,
-                    userword__user=request.user
-                ).first()
-
-                if existing_word:
-                    duplicate_count += 1
-                    continue
-
-                # Создаем новое слово
-                word = Word.objects.create(
-                    original=original,
-                    translation=translation,
-                    transcription=row.get('Транскрипция', '').strip(),
-                   #example_sentence=row.get('Пример', '').strip(),
-                    difficulty_level=0,
-                )
-
-                # Создаем связь с пользователем
-                UserWord.objects.create(
-                    user=request.user,
-                    word=word
-                )
-
-                imported_count += 1
-
-            if duplicate_count > 0:
-                messages.warning(request,
-                                 f'Импортировано {imported_count} слов. Пропущено {duplicate_count} дубликатов.')
-            else:
-                messages.success(request, f'Успешно импортировано {imported_count} слов!')
-
+            # Сохраняем файл на диск, импорт выполнит run_import_worker
+            job = create_import_job(request.user, csv_file)
         except Exception as e:
             messages.error(request, f'Ошибка при импорте: {str(e)}')
+            return redirect('app_vocab:import_words')
 
-        return redirect('app_vocab:my_words')
+        return redirect(f'{reverse("app_vocab:import_words")}?job={job.id}')
 
-    return render(request, 'app_vocab/import_csv.html')
+    job = None
+    job_id = request.GET.get('job')
+    if job_id and job_id.isdigit():
+        job = ImportJob.objects.filter(id=job_id, user=request.user).first()
 
+    return render(request, 'app_vocab/import_csv.html', {'job': job})
 
-from app_vocab.tts_service import text_to_speech
 
+@login_required
+def import_job_status(request, job_id):
+    """Прогресс задачи импорта (JSON для опроса со страницы импорта)"""
+    job = get_object_or_404(ImportJob, id=job_id, user=request.user)
 
-def generate_audio(request, word_id):
-    """Генерация аудио для слова"""
-    try:
-        word = Word.objects.get(id=word_id)
-        tts_result = text_to_speech(word.original, lang='en')  # ← получаем словарь
+    return JsonResponse({
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'finished': job.is_finished(),
+        'total_rows': job.total_rows,
+        'rows_processed': job.rows_processed,
+        'imported': job.imported_count,
+        'duplicates': job.duplicate_count,
+        'errors': job.error_count,
+        'error_message': job.error_message,
+    })
 
-        if tts_result and 'url' in tts_result:
-            return JsonResponse({'success': True, 'audio_url': tts_result['url']})  # ← берем только URL
-        else:
-            return JsonResponse({'success': False, 'error': 'Failed to generate audio'})
 
-    except Word.DoesNotExist:
+async def generate_audio(request, word_id):
+    """Генерация аудио для слова (пока gTTS ходит в сеть, поток не занят)"""
+    word = await Word.objects.filter(id=word_id).afirst()
+    if word is None:
         return JsonResponse({'success': False, 'error': 'Word not found'})
 
+    tts_result = await atext_to_speech(word.original, lang='en')  # ← получаем словарь
+
+    if tts_result and 'url' in tts_result:
+        return JsonResponse({'success': True, 'audio_url': tts_result['url']})  # ← берем только URL
+    else:
+        return JsonResponse({'success': False, 'error': 'Failed to generate audio'})
 
 
 def telegram_bot(request):
@@ -572,3 +550,8 @@ def link_telegram(request):
 
     return redirect('app_vocab:telegram_bot')
 
+
+@staff_member_required
+def cache_stats(request):
+    """Попадания в кэш данных пользователей в этом процессе (для администратора)"""
+    return JsonResponse(dict(cache_metrics.stats(), autocomplete=deck_indexes.stats()))
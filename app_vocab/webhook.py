@@ -0,0 +1,65 @@
+# app_vocab/webhook.py
+import os
+
+from aiohttp import web
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from django.core.exceptions import ImproperlyConfigured
+
+from .bot import bot, dp, set_bot_commands
+from .bot_metrics import metrics
+from .send_queue import send_queue
+
+
+# Публичный адрес, на который Telegram отправляет обновления (https://example.com)
+WEBHOOK_BASE_URL = os.getenv('TELEGRAM_WEBHOOK_URL', '')
+WEBHOOK_PATH = os.getenv('TELEGRAM_WEBHOOK_PATH', '/telegram/webhook/')
+# Telegram присылает его в заголовке X-Telegram-Bot-Api-Secret-Token
+WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET', '')
+WEBHOOK_HOST = os.getenv('TELEGRAM_WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('TELEGRAM_WEBHOOK_PORT', '8081'))
+# Метрики обработчиков для Prometheus (пустое значение - не публиковать)
+METRICS_PATH = os.getenv('BOT_METRICS_PATH', '/metrics')
+
+
+async def metrics_view(request):
+    """Метрики этого воркера в текстовом формате Prometheus"""
+    return web.Response(text=metrics.render_prometheus() + send_queue.render_prometheus(), content_type='text/plain')
+
+
+def create_webhook_app(bot=bot, dispatcher=dp, secret=WEBHOOK_SECRET, path=WEBHOOK_PATH,
+                       handle_in_background=True):
+    """
+    aiohttp-приложение, принимающее обновления Telegram.
+    Запросы без правильного секретного токена отклоняются (401).
+    При handle_in_background=True Telegram сразу получает ответ 200,
+    а обработка идет в фоне - долгие обработчики не вызывают повторной доставки.
+    """
+    if not secret:
+        raise ImproperlyConfigured('Для режима webhook нужен TELEGRAM_WEBHOOK_SECRET')
+
+    app = web.Application()
+    SimpleRequestHandler(
+        dispatcher=dispatcher,
+        bot=bot,
+        secret_token=secret,
+        handle_in_background=handle_in_background,
+    ).register(app, path=path)
+    if METRICS_PATH:
+        app.router.add_get(METRICS_PATH, metrics_view)
+    # События startup/shutdown диспетчера и закрытие сессии бота
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+async def set_webhook(bot=bot, dispatcher=dp):
+    """Регистрирует webhook в Telegram (выполняется один раз, а не в каждом воркере)"""
+    if not WEBHOOK_BASE_URL:
+        raise ImproperlyConfigured('Для режима webhook нужен TELEGRAM_WEBHOOK_URL')
+
+    await set_bot_commands()
+    await bot.set_webhook(
+        url=WEBHOOK_BASE_URL.rstrip('/') + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+    )
+    print(f"✅ Webhook установлен: {WEBHOOK_BASE_URL.rstrip('/') + WEBHOOK_PATH}")
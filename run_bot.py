@@ -13,21 +13,9 @@ from app_vocab.bot import main, bot
 
 
 async def schedule_reminders():
-    """Планировщик ежедневных напоминаний"""
-    while True:
-        # Ждем 60 секунд для тестирования
-      # await asyncio.sleep(60)
-        # Ждем 24 часа (86400 секунд) между напоминаниями
-        await asyncio.sleep(86400)
-
-
-        try:
-            from app_vocab.reminder_service import send_daily_reminders
-            await send_daily_reminders(bot)
-          # print("✅ Напоминания отправлены")
-            print("✅ Ежедневные напоминания отправлены")
-        except Exception as e:
-            print(f"❌ Ошибка в планировщике напоминаний: {e}")
+    """Планировщик напоминаний: каждому пользователю в его час и часовом поясе"""
+    from app_vocab.reminder_scheduler import ReminderScheduler
+    await ReminderScheduler(bot).run()
 
 
 async def run_bot_with_reminders():
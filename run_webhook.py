@@ -0,0 +1,59 @@
+# Скрипт для запуска Telegram-бота в режиме webhook
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import django
+
+# Важно: указываем путь к настройкам Django перед импортом моделей
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from aiohttp import web
+
+from app_vocab.bot import bot
+from app_vocab.webhook import WEBHOOK_HOST, WEBHOOK_PORT, create_webhook_app, set_webhook
+
+
+def serve(host, port):
+    """Воркер: принимает обновления на общем порту (SO_REUSEPORT)"""
+    web.run_app(create_webhook_app(), host=host, port=port, reuse_port=True, print=None)
+
+
+async def configure(reminders):
+    """Регистрирует webhook и запускает планировщик напоминаний (только в главном процессе)"""
+    await set_webhook()
+    if reminders:
+        from app_vocab.reminder_scheduler import ReminderScheduler
+        await ReminderScheduler(bot).run()
+    else:
+        await bot.session.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Запуск бота в режиме webhook')
+    parser.add_argument('--host', default=WEBHOOK_HOST)
+    parser.add_argument('--port', type=int, default=WEBHOOK_PORT)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Количество процессов')
+    parser.add_argument('--no-reminders', action='store_true', help='Не запускать планировщик напоминаний')
+    args = parser.parse_args()
+
+    # Воркеры создаются до первого обращения к Telegram и базе,
+    # чтобы не делить с главным процессом сетевые сессии и соединения
+    context = multiprocessing.get_context('fork')
+    workers = [
+        context.Process(target=serve, args=(args.host, args.port), daemon=True)
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    print(f"Бот запускается в режиме webhook: {args.host}:{args.port}, воркеров: {args.workers}")
+    try:
+        asyncio.run(configure(reminders=not args.no_reminders))
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.terminate()